@@ -0,0 +1,32 @@
+"""Add building coordinates index
+
+Revision ID: 3f1c9a7b2e4d
+Revises: d0a56b944ba0
+Create Date: 2026-10-18 10:12:04.118302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7b2e4d'
+down_revision: Union[str, Sequence[str], None] = 'd0a56b944ba0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_buildings_latitude_longitude',
+        'buildings',
+        ['latitude', 'longitude'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_buildings_latitude_longitude', table_name='buildings')
@@ -0,0 +1,59 @@
+"""Add activity closure table
+
+Revision ID: 8b2d4e6f1a3c
+Revises: 3f1c9a7b2e4d
+Create Date: 2026-10-18 11:02:47.530194
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2d4e6f1a3c'
+down_revision: Union[str, Sequence[str], None] = '3f1c9a7b2e4d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('activity_closure',
+    sa.Column('ancestor_id', sa.Integer(), nullable=False),
+    sa.Column('descendant_id', sa.Integer(), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['ancestor_id'], ['activities.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['descendant_id'], ['activities.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    op.create_index(
+        'ix_activity_closure_descendant_id_ancestor_id',
+        'activity_closure',
+        ['descendant_id', 'ancestor_id'],
+        unique=False,
+    )
+
+    # Populate the closure from the existing parent_id hierarchy
+    op.execute("""
+        INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE activity_tree (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0
+            FROM activities
+            UNION ALL
+            SELECT at.ancestor_id, a.id, at.depth + 1
+            FROM activities a
+            JOIN activity_tree at ON a.parent_id = at.descendant_id
+        )
+        SELECT ancestor_id, descendant_id, depth FROM activity_tree
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        'ix_activity_closure_descendant_id_ancestor_id',
+        table_name='activity_closure'
+    )
+    op.drop_table('activity_closure')
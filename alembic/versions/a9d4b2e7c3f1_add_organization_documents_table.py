@@ -0,0 +1,85 @@
+"""Add organization documents table
+
+Revision ID: a9d4b2e7c3f1
+Revises: f7a3c9e1b5d2
+Create Date: 2026-10-18 15:21:09.384512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d4b2e7c3f1'
+down_revision: Union[str, Sequence[str], None] = 'f7a3c9e1b5d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+id_list = sa.JSON().with_variant(
+    postgresql.ARRAY(sa.Integer()),
+    'postgresql'
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filled by `python -m app.cli documents rebuild`
+    op.create_table(
+        'organization_documents',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('building_id', sa.Integer(), nullable=True),
+        sa.Column('address', sa.String(), nullable=True),
+        sa.Column('latitude', sa.Float(), nullable=True),
+        sa.Column('longitude', sa.Float(), nullable=True),
+        sa.Column('phones', sa.JSON(), nullable=False),
+        sa.Column('activity_ids', id_list, nullable=False),
+        sa.Column('activity_names', sa.JSON(), nullable=False),
+        sa.Column('ancestor_activity_ids', id_list, nullable=False),
+        sa.ForeignKeyConstraint(
+            ['id'],
+            ['organizations.id'],
+            ondelete='CASCADE',
+        ),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_organization_documents_name',
+        'organization_documents',
+        ['name'],
+    )
+    op.create_index(
+        'ix_organization_documents_building_id',
+        'organization_documents',
+        ['building_id'],
+    )
+    # Trigram and array GIN indexes are PostgreSQL only
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.create_index(
+        'ix_organization_documents_name_trgm',
+        'organization_documents',
+        ['name'],
+        postgresql_using='gin',
+        postgresql_ops={'name': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'ix_organization_documents_activity_ids',
+        'organization_documents',
+        ['activity_ids'],
+        postgresql_using='gin',
+    )
+    op.create_index(
+        'ix_organization_documents_ancestor_activity_ids',
+        'organization_documents',
+        ['ancestor_activity_ids'],
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('organization_documents')
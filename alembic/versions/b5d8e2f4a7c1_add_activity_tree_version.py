@@ -0,0 +1,36 @@
+"""Add activity tree version
+
+Revision ID: b5d8e2f4a7c1
+Revises: c1e8f4a6d2b9
+Create Date: 2026-10-18 18:21:40.118372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d8e2f4a7c1'
+down_revision: Union[str, Sequence[str], None] = 'c1e8f4a6d2b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'activity_tree_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.execute(
+        'INSERT INTO activity_tree_version (id, version) VALUES (1, 0)'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('activity_tree_version')
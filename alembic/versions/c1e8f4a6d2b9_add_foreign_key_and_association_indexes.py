@@ -0,0 +1,114 @@
+"""Add foreign key and association indexes
+
+Revision ID: c1e8f4a6d2b9
+Revises: a9d4b2e7c3f1
+Create Date: 2026-10-18 16:02:47.519230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1e8f4a6d2b9'
+down_revision: Union[str, Sequence[str], None] = 'a9d4b2e7c3f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Plain indexes on primary keys, which are indexed already
+REDUNDANT_ID_INDEXES = [
+    ('ix_activities_id', 'activities'),
+    ('ix_buildings_id', 'buildings'),
+    ('ix_organizations_id', 'organizations'),
+    ('ix_phone_numbers_id', 'phone_numbers'),
+]
+
+
+def _recreate_association(primary_key: bool) -> None:
+    """
+    Copies the association table into a new one with or without the
+    (organization_id, activity_id) primary key; duplicate and
+    incomplete links are dropped on the way to the keyed table.
+    """
+    op.rename_table(
+        'organization_activity_association',
+        'organization_activity_association_old'
+    )
+    constraints = []
+    if primary_key:
+        constraints.append(
+            sa.PrimaryKeyConstraint('organization_id', 'activity_id')
+        )
+    op.create_table(
+        'organization_activity_association',
+        sa.Column('organization_id', sa.Integer(), nullable=not primary_key),
+        sa.Column('activity_id', sa.Integer(), nullable=not primary_key),
+        sa.ForeignKeyConstraint(['activity_id'], ['activities.id']),
+        sa.ForeignKeyConstraint(['organization_id'], ['organizations.id']),
+        *constraints,
+    )
+    op.execute("""
+        INSERT INTO organization_activity_association
+            (organization_id, activity_id)
+        SELECT DISTINCT organization_id, activity_id
+        FROM organization_activity_association_old
+        WHERE organization_id IS NOT NULL AND activity_id IS NOT NULL
+    """)
+    op.drop_table('organization_activity_association_old')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for index_name, table_name in REDUNDANT_ID_INDEXES:
+        op.drop_index(index_name, table_name=table_name)
+
+    op.create_index(
+        'ix_organizations_building_id_id',
+        'organizations',
+        ['building_id', 'id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_phone_numbers_organization_id',
+        'phone_numbers',
+        ['organization_id'],
+        unique=False,
+        postgresql_include=['number'],
+    )
+    op.create_index(
+        'ix_activities_parent_id',
+        'activities',
+        ['parent_id'],
+        unique=False,
+    )
+
+    _recreate_association(primary_key=True)
+    op.create_index(
+        'ix_organization_activity_association_activity_id',
+        'organization_activity_association',
+        ['activity_id', 'organization_id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        'ix_organization_activity_association_activity_id',
+        table_name='organization_activity_association'
+    )
+    _recreate_association(primary_key=False)
+
+    op.drop_index('ix_activities_parent_id', table_name='activities')
+    op.drop_index(
+        'ix_phone_numbers_organization_id',
+        table_name='phone_numbers'
+    )
+    op.drop_index(
+        'ix_organizations_building_id_id',
+        table_name='organizations'
+    )
+    for index_name, table_name in REDUNDANT_ID_INDEXES:
+        op.create_index(index_name, table_name, ['id'], unique=False)
@@ -0,0 +1,40 @@
+"""Add organization name trigram index
+
+Revision ID: c4e7a1d9f2b6
+Revises: 8b2d4e6f1a3c
+Create Date: 2026-10-18 12:20:31.904417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e7a1d9f2b6'
+down_revision: Union[str, Sequence[str], None] = '8b2d4e6f1a3c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pg_trgm is PostgreSQL only; other databases keep the plain index
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_organizations_name_trgm',
+        'organizations',
+        ['name'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'name': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_organizations_name_trgm', table_name='organizations')
@@ -0,0 +1,51 @@
+"""Add organization updated_at
+
+Revision ID: e2f5a8c1d7b3
+Revises: c4e7a1d9f2b6
+Create Date: 2026-10-18 12:52:08.317254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f5a8c1d7b3'
+down_revision: Union[str, Sequence[str], None] = 'c4e7a1d9f2b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite cannot add a column with a non-constant default, so the
+    # column is added nullable, backfilled, and tightened where possible
+    op.add_column(
+        'organizations',
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    )
+    op.execute('UPDATE organizations SET updated_at = CURRENT_TIMESTAMP')
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column(
+            'organizations',
+            'updated_at',
+            nullable=False,
+            server_default=sa.func.now(),
+        )
+    op.create_index(
+        op.f('ix_organizations_updated_at'),
+        'organizations',
+        ['updated_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        op.f('ix_organizations_updated_at'),
+        table_name='organizations',
+    )
+    op.drop_column('organizations', 'updated_at')
@@ -1,14 +1,61 @@
-from fastapi import Security, HTTPException, status
+import math
+from fastapi import Request, Security, HTTPException, status
 from fastapi.security import APIKeyHeader
+from app.api.rate_limit import check_rate_limit, key_bucket
 from app.core.config import settings
+from app.db.replicas import current_client
+from app.services.api_keys import ApiKeyInfo, api_key_store
 
 api_key_header = APIKeyHeader(name="X-API-KEY")
 
-async def get_api_key(api_key: str = Security(api_key_header)):
-    if api_key == settings.API_KEY:
-        return api_key
+
+async def get_api_key(
+    api_key: str = Security(api_key_header)
+) -> ApiKeyInfo:
+    key = await api_key_store.averify(api_key)
+    if key is not None:
+        api_key_store.record_use(key)
+        current_client.set(key.name)
+        return key
     else:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
+
+
+def require_scope(scope: str):
+    """
+    Dependency that only lets through keys with `scope`.
+    """
+    async def check_scope(
+        key: ApiKeyInfo = Security(get_api_key)
+    ) -> ApiKeyInfo:
+        if scope not in key.scopes:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"API key lacks the '{scope}' scope",
+            )
+        return key
+    return check_scope
+
+
+async def enforce_rate_limit(
+    request: Request,
+    key: ApiKeyInfo = Security(get_api_key)
+) -> ApiKeyInfo:
+    """
+    Charges the request to the API key's token bucket, at the cost
+    configured for the route, and answers 429 once it runs dry.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return key
+    route = getattr(request.scope.get("route"), "path", None)
+    retry_after = await check_rate_limit(key_bucket(key), key.name, route)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    return key
@@ -0,0 +1,185 @@
+import json
+import logging
+import random
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.instrumentation import (
+    RequestProfile,
+    track_request_statements,
+)
+from app.db.session import get_pool_statuses, replica_set
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def _pool_field(field: str):
+    def collect():
+        return [
+            ((status["name"],), status[field])
+            for status in get_pool_statuses()
+        ]
+    return collect
+
+
+for _field, _type, _help in (
+    ("checked_out", "gauge", "Connections currently checked out."),
+    ("idle", "gauge", "Idle connections in the pool."),
+    ("overflow", "gauge", "Connections opened above the pool size."),
+    ("checkouts", "counter", "Connection checkouts since start."),
+    ("timeouts", "counter", "Checkouts that timed out waiting."),
+    ("wait_seconds_total", "counter", "Time spent waiting for a connection."),
+):
+    metrics.registry.register(metrics.Collector(
+        f"db_pool_{_field}",
+        _help,
+        ("pool",),
+        _pool_field(_field),
+        _type,
+    ))
+
+metrics.registry.register(metrics.Collector(
+    "db_replica_healthy",
+    "Whether a read replica is in rotation (1) or not (0).",
+    ("replica",),
+    lambda: [
+        ((replica.name,), int(replica.healthy))
+        for replica in replica_set.replicas
+    ],
+))
+
+
+@router.get("/metrics", include_in_schema=False)
+def read_metrics():
+    return PlainTextResponse(
+        metrics.registry.render(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Path template of the matched route (e.g. /api/v1/organizations/{id}),
+    so that metrics are not labelled with raw ids.
+    """
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Set by middlewares that answer before routing (response cache hits)
+    return scope.get("route_template", "unmatched")
+
+
+def server_timing(profile: RequestProfile) -> str:
+    """
+    Server-Timing value with total SQL time and one entry per
+    repository method, e.g.
+    db;dur=4.1;desc="3 statements", OrganizationRepository.get;dur=2.5
+    """
+    entries = [
+        f'db;dur={profile.seconds * 1000:.2f};'
+        f'desc="{profile.statements} statements, {profile.rows} rows"'
+    ]
+    for operation, stats in profile.operations.items():
+        entries.append(
+            f'{operation};dur={stats.seconds * 1000:.2f};'
+            f'desc="{stats.statements} statements, {stats.rows} rows"'
+        )
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """
+    Records per-request latency, status and SQL time into the metrics
+    registry. Individual requests are logged as JSON for a sample
+    (REQUEST_LOG_SAMPLE_RATE) plus all slow and failed requests.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        label = f"{scope['method']} {scope['path']}"
+
+        with track_request_statements(label) as statements:
+            async def send_wrapper(message: Message) -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    if settings.SQL_PROFILING_ENABLED:
+                        message["headers"] = list(message["headers"]) + [(
+                            b"server-timing",
+                            server_timing(statements).encode("latin-1"),
+                        )]
+                await send(message)
+
+            started_at = time.perf_counter()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                self._record(
+                    scope,
+                    status_code,
+                    time.perf_counter() - started_at,
+                    statements
+                )
+
+    @staticmethod
+    def _record(
+        scope: Scope,
+        status_code: int,
+        duration: float,
+        statements
+    ):
+        method = scope["method"]
+        route = route_template(scope)
+        metrics.http_requests_total.inc(method, route, str(status_code))
+        metrics.http_request_duration_seconds.observe(
+            duration,
+            method,
+            route
+        )
+        metrics.http_request_db_seconds.observe(
+            statements.seconds,
+            method,
+            route
+        )
+        metrics.db_statements_total.inc(
+            method,
+            route,
+            amount=statements.statements
+        )
+
+        limit = settings.SQL_STATEMENT_LIMIT
+        over_limit = limit is not None and statements.statements > limit
+        if over_limit:
+            logger.warning(
+                f"{method} {scope['path']} issued "
+                f"{statements.statements} SQL statements (limit {limit})"
+            )
+        if (
+            status_code >= 500
+            or over_limit
+            or duration >= settings.REQUEST_LOG_SLOW_SECONDS
+            or random.random() < settings.REQUEST_LOG_SAMPLE_RATE
+        ):
+            logger.info(json.dumps({
+                "method": method,
+                "path": scope["path"],
+                "route": route,
+                "status": status_code,
+                "duration_ms": round(duration * 1000, 2),
+                "db_ms": round(statements.seconds * 1000, 2),
+                "db_statements": statements.statements,
+            }))
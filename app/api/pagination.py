@@ -0,0 +1,71 @@
+import base64
+import binascii
+import json
+from typing import Sequence, TypeVar
+
+from fastapi import HTTPException, Query, Response, status
+
+ItemType = TypeVar("ItemType")
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    payload = json.dumps({"id": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> int:
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        last_id = payload["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        last_id = None
+    if not isinstance(last_id, int):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return last_id
+
+
+class CursorPage:
+    """
+    Cursor pagination parameters for list endpoints.
+    Handlers fetch `fetch_limit` rows (one more than requested) so
+    `paginate` can tell whether another page exists; if it does, the
+    opaque cursor for it is returned in the X-Next-Cursor header.
+    """
+
+    def __init__(
+        self,
+        cursor: str | None = Query(
+            None,
+            description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header"
+        ),
+        limit: int = Query(
+            100,
+            ge=1,
+            le=1000,
+            description="Maximum number of items to return"
+        ),
+    ):
+        self.after_id = decode_cursor(cursor)
+        self.limit = limit
+
+    @property
+    def fetch_limit(self) -> int:
+        return self.limit + 1
+
+    def paginate(
+        self,
+        items: Sequence[ItemType],
+        response: Response
+    ) -> Sequence[ItemType]:
+        if len(items) > self.limit:
+            items = items[:self.limit]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(items[-1].id)
+        return items
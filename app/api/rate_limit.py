@@ -0,0 +1,154 @@
+import logging
+import time
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+rate_limited_requests_total = metrics.registry.register(metrics.Counter(
+    "rate_limited_requests_total",
+    "Requests rejected by the rate limiter by API key name and route.",
+    ("key", "route"),
+))
+
+
+class MemoryRateLimiter:
+    """
+    In-process token buckets, one per API key.
+    Every worker keeps its own buckets, so with N workers a client can
+    make up to N times the configured rate.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        # bucket -> (tokens, monotonic time of the last update)
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    async def acquire(self, bucket: str, cost: float) -> float:
+        """
+        Takes `cost` tokens from `bucket`. Returns 0 on success,
+        otherwise the number of seconds until enough tokens are back.
+        """
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(bucket, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+        if tokens >= cost:
+            self._buckets[bucket] = (tokens - cost, now)
+            return 0.0
+        self._buckets[bucket] = (tokens, now)
+        return (cost - tokens) / self.rate
+
+
+class RedisRateLimiter:
+    """
+    Shared backend for multi-worker deployments: the same token bucket,
+    updated atomically by a Lua script.
+    """
+    script = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(bucket[1]) or burst
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate)
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", tostring(now))
+redis.call("EXPIRE", KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(retry_after)
+"""
+
+    def __init__(self, url: str, rate: float, burst: float):
+        try:
+            import redis.asyncio
+        except ImportError as exc:
+            raise RuntimeError(
+                "RATE_LIMIT_BACKEND=redis requires the redis package"
+            ) from exc
+        self.rate = rate
+        self.burst = burst
+        self._client = redis.asyncio.Redis.from_url(url)
+        self._acquire = self._client.register_script(self.script)
+
+    async def acquire(self, bucket: str, cost: float) -> float:
+        retry_after = await self._acquire(
+            keys=[f"rate-limit:{bucket}"],
+            args=[self.rate, self.burst, cost, time.time()]
+        )
+        return float(retry_after)
+
+
+def create_rate_limiter():
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimiter(
+            settings.RATE_LIMIT_REDIS_URL,
+            settings.RATE_LIMIT_RATE,
+            settings.RATE_LIMIT_BURST
+        )
+    return MemoryRateLimiter(
+        settings.RATE_LIMIT_RATE,
+        settings.RATE_LIMIT_BURST
+    )
+
+
+rate_limiter = None
+
+
+def get_rate_limiter():
+    global rate_limiter
+    if rate_limiter is None:
+        rate_limiter = create_rate_limiter()
+    return rate_limiter
+
+
+def set_rate_limiter(backend) -> None:
+    """
+    Replaces the backend, e.g. with a local stand-in in tests.
+    """
+    global rate_limiter
+    rate_limiter = backend
+
+
+def key_bucket(key) -> str:
+    """
+    Token bucket of an ApiKeyInfo: its id, or its name for the
+    settings key.
+    """
+    return key.name if key.id is None else str(key.id)
+
+
+def route_cost(route: str | None) -> float:
+    cost = settings.RATE_LIMIT_ROUTE_COSTS.get(route, 1.0)
+    # A request costing more than the bucket holds could never pass
+    return min(cost, settings.RATE_LIMIT_BURST)
+
+
+async def check_rate_limit(
+    bucket: str,
+    key_name: str,
+    route: str | None
+) -> float:
+    """
+    Charges the request to `bucket` and returns the seconds to wait
+    before retrying, 0 if the request may proceed. If the backend is
+    unavailable, requests are let through rather than failed.
+    """
+    try:
+        retry_after = await get_rate_limiter().acquire(
+            bucket,
+            route_cost(route)
+        )
+    except Exception:
+        logger.exception("Rate limiter unavailable, request not limited")
+        return 0.0
+    if retry_after > 0:
+        rate_limited_requests_total.inc(key_name, route or "unmatched")
+    return retry_after
@@ -0,0 +1,383 @@
+import hashlib
+import json
+import logging
+import math
+import time
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.rate_limit import check_rate_limit, key_bucket
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.replicas import (
+    current_client,
+    reads_from_primary,
+    replica_lag_window,
+)
+from app.services.api_keys import api_key_store
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedResponse:
+    headers: list[tuple[str, str]]
+    body: bytes
+    etag: str
+    # Path template of the route that produced the response
+    route: str | None = None
+
+    def to_bytes(self) -> bytes:
+        meta = json.dumps({
+            "headers": self.headers,
+            "etag": self.etag,
+            "route": self.route,
+        })
+        return meta.encode() + b"\n" + self.body
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CachedResponse":
+        meta, body = data.split(b"\n", 1)
+        fields = json.loads(meta)
+        return cls(
+            headers=[tuple(header) for header in fields["headers"]],
+            body=body,
+            etag=fields["etag"],
+            route=fields.get("route"),
+        )
+
+
+class MemoryResponseCache:
+    """
+    In-process backend: bounded LRU with TTL, local to the worker.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.generation = 0
+        self._entries: TTLCache[str, CachedResponse] = TTLCache(
+            max_entries,
+            ttl
+        )
+
+    async def get_generation(self) -> int:
+        return self.generation
+
+    async def get(self, key: str) -> CachedResponse | None:
+        return self._entries.get(key)
+
+    async def set(self, key: str, response: CachedResponse) -> None:
+        self._entries.set(key, response)
+
+    def invalidate(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+
+
+class RedisResponseCache:
+    """
+    Shared backend for multi-worker deployments.
+    Entries expire through Redis TTLs; invalidation bumps a shared
+    generation counter that is part of every key.
+    """
+    generation_key = "response-cache:generation"
+
+    def __init__(self, url: str, ttl: int, timeout: float):
+        try:
+            import redis
+            import redis.asyncio
+        except ImportError as exc:
+            raise RuntimeError(
+                "RESPONSE_CACHE_BACKEND=redis requires the redis package"
+            ) from exc
+        self.ttl = ttl
+        self._client = redis.asyncio.Redis.from_url(
+            url,
+            socket_timeout=timeout,
+            socket_connect_timeout=timeout
+        )
+        # Used from after_commit, on whatever thread commits: a short
+        # timeout keeps a Redis outage from stalling every write
+        self._sync_client = redis.Redis.from_url(
+            url,
+            socket_timeout=timeout,
+            socket_connect_timeout=timeout
+        )
+
+    async def get_generation(self) -> int:
+        return int(await self._client.get(self.generation_key) or 0)
+
+    async def get(self, key: str) -> CachedResponse | None:
+        data = await self._client.get(f"response-cache:{key}")
+        return CachedResponse.from_bytes(data) if data else None
+
+    async def set(self, key: str, response: CachedResponse) -> None:
+        await self._client.set(
+            f"response-cache:{key}",
+            response.to_bytes(),
+            ex=self.ttl
+        )
+
+    def invalidate(self) -> None:
+        self._sync_client.incr(self.generation_key)
+
+
+def create_response_cache():
+    if settings.RESPONSE_CACHE_BACKEND == "redis":
+        return RedisResponseCache(
+            settings.RESPONSE_CACHE_REDIS_URL,
+            settings.RESPONSE_CACHE_TTL_SECONDS,
+            settings.RESPONSE_CACHE_REDIS_TIMEOUT_SECONDS
+        )
+    return MemoryResponseCache(
+        settings.RESPONSE_CACHE_MAX_ENTRIES,
+        settings.RESPONSE_CACHE_TTL_SECONDS
+    )
+
+
+response_cache = None
+# Alembic revision of the database, part of every key so that
+# a migration invalidates everything cached before it
+schema_revision = "unknown"
+
+
+def get_response_cache():
+    global response_cache
+    if response_cache is None:
+        response_cache = create_response_cache()
+    return response_cache
+
+
+def set_response_cache(backend) -> None:
+    """
+    Replaces the backend, e.g. with a local stand-in in tests.
+    """
+    global response_cache
+    response_cache = backend
+
+
+def invalidate_response_cache() -> None:
+    try:
+        get_response_cache().invalidate()
+    except Exception:
+        logger.exception("Response cache invalidation failed")
+
+
+def load_schema_revision(db: Session) -> str:
+    global schema_revision
+    try:
+        schema_revision = db.execute(
+            text("SELECT version_num FROM alembic_version")
+        ).scalar() or "none"
+    except Exception:
+        db.rollback()
+        schema_revision = "none"
+    return schema_revision
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_session_dirty(session, flush_context):
+    if session.new or session.dirty or session.deleted:
+        session.info["response_cache_dirty"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("response_cache_dirty", False):
+        invalidate_response_cache()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("response_cache_dirty", None)
+
+
+class ResponseCacheMiddleware:
+    """
+    Caches successful GET responses under `prefix`, keyed by path and
+    query parameters, and answers matching If-None-Match with 304.
+    Only requests carrying a valid API key are served from the cache;
+    everything else goes through to the application as usual, and so
+    do clients that must read their own recent writes from the primary.
+    Hits are charged to the key's rate limit like the route would be,
+    and keys with different scopes never share entries.
+    With read replicas, nothing is stored for the replica lag window
+    after each invalidation, since the replicas may not have the write.
+    Streaming responses (no Content-Length) are never buffered.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        prefix: str = "/api/v1/",
+        exclude: tuple[str, ...] = ("/api/v1/system/",),
+    ):
+        self.app = app
+        self.prefix = prefix
+        self.exclude = exclude
+        # Last generation seen by this process and when it changed
+        self._generation: int | None = None
+        self._generation_changed_at = float("-inf")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not self._is_cacheable(scope):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        api_key = await api_key_store.averify(request_headers.get("x-api-key"))
+        if api_key is None:
+            await self.app(scope, receive, send)
+            return
+        current_client.set(api_key.name)
+        if reads_from_primary():
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = request_headers.get("if-none-match")
+        backend = get_response_cache()
+        generation = await backend.get_generation()
+        store = self._note_generation(generation)
+        key = self._key(scope, generation, api_key.scopes)
+        cached = await backend.get(key)
+        if cached is not None:
+            api_key_store.record_use(api_key)
+            if cached.route is not None:
+                scope["route_template"] = cached.route
+            if settings.RATE_LIMIT_ENABLED:
+                retry_after = await check_rate_limit(
+                    key_bucket(api_key),
+                    api_key.name,
+                    cached.route
+                )
+                if retry_after > 0:
+                    await self._send_rate_limited(retry_after, send)
+                    return
+            await self._send(cached, if_none_match, "HIT", send)
+            return
+
+        start: Message | None = None
+        chunks: list[bytes] = []
+
+        async def capture(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if message["status"] == 200 and "content-length" in headers:
+                    start = message
+                    return
+            elif start is not None and message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                body = b"".join(chunks)
+                digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+                response = CachedResponse(
+                    headers=[
+                        (name.decode("latin-1"), value.decode("latin-1"))
+                        for name, value in start["headers"]
+                    ],
+                    body=body,
+                    etag=f'"{digest}"',
+                    route=getattr(scope.get("route"), "path", None),
+                )
+                if (
+                    store
+                    and len(body) <= settings.RESPONSE_CACHE_MAX_ENTRY_BYTES
+                ):
+                    await backend.set(key, response)
+                await self._send(response, if_none_match, "MISS", send)
+                return
+            await send(message)
+
+        await self.app(scope, receive, capture)
+
+    def _is_cacheable(self, scope: Scope) -> bool:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return False
+        path = scope["path"]
+        return path.startswith(self.prefix) and not path.startswith(
+            self.exclude
+        )
+
+    def _note_generation(self, generation: int) -> bool:
+        """
+        Records a generation change and returns whether responses may
+        be stored, i.e. the replica lag window since it passed.
+        """
+        now = time.monotonic()
+        if generation != self._generation:
+            if self._generation is not None:
+                self._generation_changed_at = now
+            self._generation = generation
+        return now - self._generation_changed_at >= replica_lag_window()
+
+    def _key(
+        self,
+        scope: Scope,
+        generation: int,
+        scopes: frozenset[str]
+    ) -> str:
+        query = urlencode(
+            sorted(
+                parse_qsl(
+                    scope["query_string"].decode("latin-1"),
+                    keep_blank_values=True
+                )
+            )
+        )
+        return (
+            f"{schema_revision}:{generation}:{','.join(sorted(scopes))}:"
+            f"{scope['path']}?{query}"
+        )
+
+    @staticmethod
+    async def _send_rate_limited(retry_after: float, send: Send) -> None:
+        """
+        The 429 response of enforce_rate_limit.
+        """
+        body = b'{"detail":"Rate limit exceeded"}'
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(retry_after)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    async def _send(
+        response: CachedResponse,
+        if_none_match: str | None,
+        cache_status: str,
+        send: Send
+    ) -> None:
+        etag = response.etag.encode("latin-1")
+        extra = [(b"etag", etag), (b"x-cache", cache_status.encode())]
+        if if_none_match and response.etag in [
+            tag.strip() for tag in if_none_match.split(",")
+        ]:
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": extra,
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (name.encode("latin-1"), value.encode("latin-1"))
+                for name, value in response.headers
+            ] + extra,
+        })
+        await send({"type": "http.response.body", "body": response.body})
@@ -1,8 +1,48 @@
-from typing import List
-from fastapi import APIRouter, Depends, Query
+from datetime import datetime
+import tempfile
+from typing import List, Literal
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from app.db import schemas
-from app.api.dependencies import get_api_key
+from app.api.dependencies import (
+    enforce_rate_limit,
+    get_api_key,
+    require_scope,
+)
+from app.api.pagination import CursorPage
+from app.api.serializers import (
+    render,
+    serialize_activity_tree_node,
+    serialize_building,
+    serialize_organization,
+    serialize_organization_lookup,
+)
+from app.db.instrumentation import slow_query_log
+from app.db.session import get_pool_statuses
+from app.services.activity_counts import get_activity_tree
 from app.services.buildings import BuildingService, get_building_service
+from app.services.export import (
+    MEDIA_TYPES,
+    ExportFormat,
+    export_organizations,
+    export_watermark,
+)
+from app.services.ingest import (
+    IngestError,
+    IngestFormat,
+    ingest,
+    read_lines,
+)
 from app.services.organizations import (
     OrganizationService,
     get_organization_service,
@@ -10,98 +50,205 @@ from app.services.organizations import (
 
 router = APIRouter(
     prefix="/api/v1",
-    dependencies=[Depends(get_api_key)]
+    dependencies=[Depends(get_api_key), Depends(enforce_rate_limit)]
 )
 
 
 @router.get("/buildings/", response_model=List[schemas.Building])
-def read_buildings(
-    skip: int = 0,
-    limit: int = 100,
+async def read_buildings(
+    response: Response,
+    page: CursorPage = Depends(),
+    skip: int = Query(
+        0,
+        deprecated=True,
+        description="Offset pagination, use `cursor` instead"
+    ),
     service: BuildingService = Depends(get_building_service)
 ):
     """
     Retrieve a list of buildings with their associated organizations.
     """
-    return service.get_all_buildings(skip=skip, limit=limit)
+    buildings = await service.get_all_buildings(
+        skip=skip,
+        limit=page.fetch_limit,
+        after_id=page.after_id
+    )
+    return render(
+        page.paginate(buildings, response),
+        serialize_building,
+        response
+    )
 
 
 @router.get(
     "/organizations/{organization_id}",
     response_model=schemas.Organization
 )
-def read_organization(
+async def read_organization(
     organization_id: int,
+    response: Response,
     service: OrganizationService = Depends(get_organization_service),
 ):
     """
     Retrieve a single organization by its ID.
     """
-    return service.get_organization_by_id(organization_id)
+    organization = await service.get_organization_by_id(organization_id)
+    return render(organization, serialize_organization, response)
+
+
+@router.post(
+    "/organizations/batch/",
+    response_model=List[schemas.OrganizationLookup]
+)
+async def read_organizations_batch(
+    batch: schemas.OrganizationBatchRequest,
+    response: Response,
+    service: OrganizationService = Depends(get_organization_service),
+):
+    """
+    Retrieve up to 1000 organizations by ID in one request.
+    Every requested ID gets an entry, in request order; IDs that do not
+    exist come back with `found: false` instead of failing the batch.
+    """
+    lookups = await service.get_organizations_by_ids(batch.ids)
+    return render(lookups, serialize_organization_lookup, response)
 
 
 @router.get(
     "/buildings/{building_id}/organizations/",
     response_model=List[schemas.Organization]
 )
-def read_organizations_in_building(
+async def read_organizations_in_building(
     building_id: int,
+    response: Response,
+    page: CursorPage = Depends(),
     service: OrganizationService = Depends(get_organization_service)
 ):
     """
     Retrieve all organizations located in a specific building.
     """
-    return service.get_organizations_in_building(building_id)
+    organizations = await service.get_organizations_in_building(
+        building_id,
+        page.after_id,
+        page.fetch_limit
+    )
+    return render(
+        page.paginate(organizations, response),
+        serialize_organization,
+        response
+    )
 
 
 @router.get(
     "/activities/{activity_id}/organizations/",
     response_model=List[schemas.Organization]
 )
-def read_organizations_by_activity(
+async def read_organizations_by_activity(
     activity_id: int,
+    response: Response,
+    page: CursorPage = Depends(),
     service: OrganizationService = Depends(get_organization_service)
 ):
     """
     Retrieve all organizations associated with a specific activity.
     """
-    return service.get_organizations_by_activity(activity_id)
+    organizations = await service.get_organizations_by_activity(
+        activity_id,
+        page.after_id,
+        page.fetch_limit
+    )
+    return render(
+        page.paginate(organizations, response),
+        serialize_organization,
+        response
+    )
+
+
+@router.get(
+    "/activities/tree/",
+    response_model=List[schemas.ActivityTreeNode]
+)
+async def read_activity_tree(response: Response):
+    """
+    Retrieve the whole activity hierarchy with the number of
+    organizations linked to each activity, directly and including its
+    sub-activities, e.g. for navigation menus.
+    """
+    tree = await get_activity_tree()
+    return render(tree, serialize_activity_tree_node, response)
 
 
 @router.get(
     "/organizations/search/name/",
     response_model=List[schemas.Organization]
 )
-def search_organizations_by_name(
+async def search_organizations_by_name(
     name: str,
+    response: Response,
+    page: CursorPage = Depends(),
+    mode: Literal["substring", "similarity"] = Query(
+        "substring",
+        description=(
+            "`substring` pages through partial matches in ID order; "
+            "`similarity` returns the `limit` best matches, most similar first"
+        )
+    ),
     service: OrganizationService = Depends(get_organization_service)
 ):
     """
     Search for organizations by a partial name match.
     """
-    return service.search_by_name(name)
+    if mode == "similarity":
+        organizations = await service.search_by_name_ranked(
+            name,
+            page.limit
+        )
+        return render(organizations, serialize_organization, response)
+
+    organizations = await service.search_by_name(
+        name,
+        page.after_id,
+        page.fetch_limit
+    )
+    return render(
+        page.paginate(organizations, response),
+        serialize_organization,
+        response
+    )
 
 
 @router.get(
     "/organizations/search/activity/",
     response_model=List[schemas.Organization],
 )
-def search_organizations_by_activity_tree(
+async def search_organizations_by_activity_tree(
     activity_id: int,
+    response: Response,
+    page: CursorPage = Depends(),
     service: OrganizationService = Depends(get_organization_service),
 ):
     """
     Search for organizations by a given activity,
     including all its sub-activities.
     """
-    return service.search_by_activity_tree(activity_id)
+    organizations = await service.search_by_activity_tree(
+        activity_id,
+        page.after_id,
+        page.fetch_limit
+    )
+    return render(
+        page.paginate(organizations, response),
+        serialize_organization,
+        response
+    )
 
 
 @router.get(
     "/organizations/search/location/",
     response_model=List[schemas.Organization]
 )
-def search_organizations_by_location(
+async def search_organizations_by_location(
+    response: Response,
     latitude: float = Query(
         ...,
         description="Latitude of the search center"
@@ -119,4 +266,221 @@ def search_organizations_by_location(
     """
     Search for organizations within a given radius from a central point.
     """
-    return service.search_by_location(latitude, longitude, radius)
+    organizations = await service.search_by_location(
+        latitude,
+        longitude,
+        radius
+    )
+    return render(organizations, serialize_organization, response)
+
+
+@router.get(
+    "/organizations/search/nearest/",
+    response_model=List[schemas.Organization]
+)
+async def search_nearest_organizations(
+    response: Response,
+    latitude: float = Query(
+        ...,
+        description="Latitude of the search center"
+    ),
+    longitude: float = Query(
+        ...,
+        description="Longitude of the search center"
+    ),
+    limit: int = Query(
+        10,
+        ge=1,
+        le=100,
+        description="Number of organizations to return"
+    ),
+    service: OrganizationService = Depends(get_organization_service),
+):
+    """
+    Retrieve the organizations closest to a central point, nearest first.
+    """
+    organizations = await service.search_nearest(latitude, longitude, limit)
+    return render(organizations, serialize_organization, response)
+
+
+@router.get(
+    "/organizations/search/",
+    response_model=List[schemas.Organization]
+)
+async def search_organizations(
+    response: Response,
+    name: str | None = Query(
+        None,
+        min_length=1,
+        description="Partial name match"
+    ),
+    activity_id: int | None = Query(
+        None,
+        description="Activity, including all of its descendants"
+    ),
+    latitude: float | None = Query(
+        None,
+        description="Latitude of the search center"
+    ),
+    longitude: float | None = Query(
+        None,
+        description="Longitude of the search center"
+    ),
+    radius: float | None = Query(
+        None,
+        gt=0,
+        description="Search radius in kilometers"
+    ),
+    order: Literal["id", "distance"] = Query(
+        "id",
+        description=(
+            "`id` pages through matches in ID order; `distance` returns "
+            "the `limit` matches nearest to the search center"
+        )
+    ),
+    page: CursorPage = Depends(),
+    service: OrganizationService = Depends(get_organization_service),
+):
+    """
+    Search for organizations matching all given filters at once:
+    name, activity tree and radius around a point.
+    """
+    location_params = (latitude, longitude, radius)
+    location = None
+    if all(param is not None for param in location_params):
+        location = location_params
+    elif any(param is not None for param in location_params):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="latitude, longitude and radius must be given together"
+        )
+    if name is None and activity_id is None and location is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one filter is required"
+        )
+    if order == "distance" and location is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ordering by distance requires a location"
+        )
+
+    if order == "distance":
+        organizations = await service.search(
+            name,
+            activity_id,
+            location,
+            order_by_distance=True,
+            limit=page.limit
+        )
+        return render(organizations, serialize_organization, response)
+
+    organizations = await service.search(
+        name,
+        activity_id,
+        location,
+        after_id=page.after_id,
+        limit=page.fetch_limit
+    )
+    return render(
+        page.paginate(organizations, response),
+        serialize_organization,
+        response
+    )
+
+
+@router.get("/export/organizations/", response_class=StreamingResponse)
+async def export_organization_directory(
+    format: ExportFormat = Query(
+        "ndjson",
+        description="`ndjson` (one JSON object per line) or `csv`"
+    ),
+    since: datetime | None = Query(
+        None,
+        description=(
+            "Only organizations changed at or after this time; pass the "
+            "X-Export-Timestamp of the previous export for incremental "
+            "pulls. Consecutive pulls overlap, so clients must tolerate "
+            "receiving the same organization again (upsert by id)"
+        )
+    ),
+    accept_encoding: str = Header(""),
+):
+    """
+    Stream the whole organization directory with buildings, phone
+    numbers and activities, in ID order.
+    Compressed with gzip when the client accepts it.
+    X-Export-Timestamp is taken from the database clock at the start of
+    the export, minus EXPORT_WATERMARK_OVERLAP_SECONDS, so an
+    incremental pull re-delivers the organizations changed during that
+    overlap: clients must treat records as upserts keyed by id.
+    """
+    compress = "gzip" in accept_encoding.lower()
+    watermark = await run_in_threadpool(export_watermark)
+    headers = {
+        "X-Export-Timestamp": watermark.isoformat(),
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export_organizations(format, since, compress),
+        media_type=MEDIA_TYPES[format],
+        headers=headers
+    )
+
+
+@router.post(
+    "/ingest/",
+    response_model=schemas.IngestReport,
+    dependencies=[Depends(require_scope("write"))]
+)
+async def ingest_directory(
+    request: Request,
+    format: IngestFormat = Query(
+        "ndjson",
+        description="`ndjson` records or `csv` in the export layout"
+    ),
+):
+    """
+    Bulk upsert activities, buildings and organizations from the request
+    body (optionally gzipped). Records are keyed by id, so repeating an
+    import is safe. See app/services/ingest.py for the record format.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024) as body:
+        async for chunk in request.stream():
+            body.write(chunk)
+        body.seek(0)
+        try:
+            return await run_in_threadpool(ingest, read_lines(body), format)
+        except IngestError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=str(exc)
+            )
+
+
+@router.get(
+    "/system/pool/",
+    response_model=List[schemas.PoolStatus],
+    dependencies=[Depends(require_scope("admin"))]
+)
+async def read_pool_status():
+    """
+    Report connection pool usage and checkout wait times
+    of this worker process.
+    """
+    return get_pool_statuses()
+
+
+@router.get(
+    "/system/slow-queries/",
+    response_model=List[schemas.SlowQuery],
+    dependencies=[Depends(require_scope("admin"))]
+)
+async def read_slow_queries():
+    """
+    Most recent statements slower than SQL_SLOW_QUERY_MS in this worker,
+    newest first. Empty unless SQL_PROFILING_ENABLED is set.
+    """
+    return slow_query_log.entries()[::-1]
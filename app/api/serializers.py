@@ -0,0 +1,98 @@
+from typing import Any, Callable, Sequence
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+from app.core.activity_counts import ActivityNode
+from app.core.config import settings
+from app.db import models
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+# The functions below mirror the response schemas in app.db.schemas
+# field for field and in the same order, so the JSON is identical to
+# what FastAPI produces from the response_model.
+
+def serialize_building_base(building: models.Building) -> dict:
+    return {
+        "address": building.address,
+        "latitude": float(building.latitude),
+        "longitude": float(building.longitude),
+    }
+
+
+def serialize_organization(organization: models.Organization) -> dict:
+    return {
+        "name": organization.name,
+        "id": organization.id,
+        "building": serialize_building_base(organization.building),
+        "phone_numbers": [
+            {"number": phone.number} for phone in organization.phone_numbers
+        ],
+        "activities": [
+            {"name": activity.name} for activity in organization.activities
+        ],
+    }
+
+
+def serialize_organization_lookup(lookup: dict) -> dict:
+    organization = lookup["organization"]
+    return {
+        "id": lookup["id"],
+        "found": lookup["found"],
+        "organization": organization and serialize_organization(organization),
+    }
+
+
+def serialize_activity_tree_node(node: ActivityNode) -> dict:
+    return {
+        "name": node.name,
+        "id": node.id,
+        "organization_count": node.organization_count,
+        "total_organization_count": node.total_organization_count,
+        "children": [
+            serialize_activity_tree_node(child) for child in node.children
+        ],
+    }
+
+
+def serialize_building(building: models.Building) -> dict:
+    data = serialize_building_base(building)
+    data["id"] = building.id
+    data["organizations"] = [
+        serialize_organization(organization)
+        for organization in building.organizations
+    ]
+    return data
+
+
+def render(
+    content: Any,
+    serializer: Callable[[Any], dict],
+    response: Response
+) -> Any:
+    """
+    Serializes an ORM object (or a list of them) straight to JSON,
+    skipping response_model validation. Headers set on the injected
+    `response` (e.g. X-Next-Cursor) are carried over.
+    Returns `content` unchanged when FAST_SERIALIZATION is off.
+    """
+    if not settings.FAST_SERIALIZATION:
+        return content
+    if isinstance(content, Sequence):
+        data = [serializer(item) for item in content]
+    else:
+        data = serializer(content)
+    return ORJSONResponse(
+        data,
+        headers={
+            name: value
+            for name, value in response.headers.items()
+            if name != "content-length"
+        }
+    )
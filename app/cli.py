@@ -0,0 +1,150 @@
+"""
+Command line tools.
+
+    python -m app.cli ingest organizations.ndjson.gz
+    python -m app.cli ingest organizations.csv --format csv
+    python -m app.cli api-keys create frontend --scopes write
+    python -m app.cli api-keys list
+    python -m app.cli api-keys revoke 3
+    python -m app.cli documents rebuild
+"""
+import argparse
+import json
+import logging
+import sys
+from dataclasses import asdict
+
+# Registers the commit hook that invalidates the shared response cache
+import app.api.response_cache  # noqa: F401
+from app.db.documents import rebuild_organization_documents
+from app.db.session import engine
+from app.services.api_keys import (
+    SCOPES,
+    create_api_key,
+    list_api_keys,
+    revoke_api_key,
+)
+from app.services.ingest import ingest, read_lines
+
+
+def run_ingest(args: argparse.Namespace) -> int:
+    ingest_format = args.format
+    if ingest_format is None:
+        suffixes = args.path.lower().removesuffix(".gz")
+        ingest_format = "csv" if suffixes.endswith(".csv") else "ndjson"
+    with open(args.path, "rb") as stream:
+        # Servers pick up new buildings with their periodic refresh
+        report = ingest(
+            read_lines(stream),
+            ingest_format,
+            refresh_building_index_after=False
+        )
+    print(json.dumps(asdict(report), ensure_ascii=False, indent=2))
+    return 1 if report.rejected else 0
+
+
+def run_api_keys_create(args: argparse.Namespace) -> int:
+    scopes = [scope for scope in args.scopes.split(",") if scope]
+    try:
+        api_key, api_key_id = create_api_key(args.name, scopes)
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    print(f"Created API key {api_key_id} for {args.name}: {api_key}")
+    print("Store it now, it cannot be shown again.")
+    return 0
+
+
+def run_api_keys_list(args: argparse.Namespace) -> int:
+    for api_key in list_api_keys():
+        status = "revoked" if api_key.revoked_at else "active"
+        print(
+            f"{api_key.id:<5} {api_key.name:<24} {api_key.key_prefix}... "
+            f"{status:<8} scopes={api_key.scopes or '-'}"
+        )
+    return 0
+
+
+def run_api_keys_revoke(args: argparse.Namespace) -> int:
+    if not revoke_api_key(args.id):
+        print(f"API key {args.id} not found", file=sys.stderr)
+        return 1
+    print(f"Revoked API key {args.id}")
+    return 0
+
+
+def run_documents_rebuild(args: argparse.Namespace) -> int:
+    with engine.begin() as connection:
+        written = rebuild_organization_documents(
+            connection,
+            args.batch_size
+        )
+    print(f"Rebuilt {written} organization documents")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+    )
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = commands.add_parser(
+        "ingest",
+        help="Bulk upsert the directory from an NDJSON or CSV file"
+    )
+    ingest_parser.add_argument("path", help="Input file, optionally .gz")
+    ingest_parser.add_argument(
+        "--format",
+        choices=["ndjson", "csv"],
+        help="Input format (default: from the file extension)"
+    )
+    ingest_parser.set_defaults(handler=run_ingest)
+
+    api_keys_parser = commands.add_parser("api-keys", help="Manage API keys")
+    api_keys_commands = api_keys_parser.add_subparsers(
+        dest="api_keys_command",
+        required=True
+    )
+    create_parser = api_keys_commands.add_parser("create")
+    create_parser.add_argument("name", help="Client the key is issued to")
+    create_parser.add_argument(
+        "--scopes",
+        default="",
+        help=f"Comma-separated extra scopes: {', '.join(SCOPES)}"
+    )
+    create_parser.set_defaults(handler=run_api_keys_create)
+    list_parser = api_keys_commands.add_parser("list")
+    list_parser.set_defaults(handler=run_api_keys_list)
+    revoke_parser = api_keys_commands.add_parser("revoke")
+    revoke_parser.add_argument("id", type=int)
+    revoke_parser.set_defaults(handler=run_api_keys_revoke)
+
+    documents_parser = commands.add_parser(
+        "documents",
+        help="Maintain the denormalized organization documents"
+    )
+    documents_commands = documents_parser.add_subparsers(
+        dest="documents_command",
+        required=True
+    )
+    rebuild_parser = documents_commands.add_parser(
+        "rebuild",
+        help="Recreate every document in one transaction"
+    )
+    rebuild_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="Organizations per batch"
+    )
+    rebuild_parser.set_defaults(handler=run_documents_rebuild)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
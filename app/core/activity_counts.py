@@ -0,0 +1,118 @@
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterable
+
+
+@dataclass
+class ActivityNode:
+    id: int
+    name: str
+    # Organizations linked to the activity itself
+    organization_count: int
+    # Organizations linked to the activity or any descendant, each once
+    total_organization_count: int
+    children: list["ActivityNode"] = field(default_factory=list)
+
+
+class ActivityCounts:
+    """
+    In-memory activity tree with organization counts per activity.
+    Loaded in full, then kept up to date one organization at a time:
+    when the activity links of an organization change from `old` to
+    `new`, every activity in the ancestry of only one of the two sets
+    gains or loses that organization. Every update bumps a generation
+    counter, so a load that read the database before an update cannot
+    replace the updated counts.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.generation = 0
+        # activity id -> (name, parent id)
+        self._activities: dict[int, tuple[str, int | None]] = {}
+        self._direct: Counter[int] = Counter()
+        self._total: Counter[int] = Counter()
+        self._lock = threading.Lock()
+
+    def load(
+        self,
+        activities: Iterable[tuple[int, str, int | None]],
+        direct: Iterable[tuple[int, int]],
+        total: Iterable[tuple[int, int]],
+        generation: int
+    ) -> bool:
+        """
+        Replaces the contents with (id, name, parent_id) activities and
+        (activity_id, count) pairs. Returns False, leaving the counts
+        as they are, when they changed since `generation` was read.
+        """
+        with self._lock:
+            if generation != self.generation:
+                return False
+            self._activities = {
+                activity_id: (name, parent_id)
+                for activity_id, name, parent_id in activities
+            }
+            self._direct = Counter(dict(direct))
+            self._total = Counter(dict(total))
+            self.ready = True
+            return True
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self.ready = False
+
+    def _ancestry(self, activity_ids: Iterable[int]) -> set[int]:
+        """
+        The activities and all their ancestors.
+        """
+        ancestry: set[int] = set()
+        for activity_id in activity_ids:
+            while activity_id is not None and activity_id not in ancestry:
+                ancestry.add(activity_id)
+                activity = self._activities.get(activity_id)
+                activity_id = activity[1] if activity else None
+        return ancestry
+
+    def apply(self, changes: Iterable[tuple[set[int], set[int]]]) -> None:
+        """
+        Updates the counts for (old, new) activity id sets, one pair
+        per changed organization.
+        """
+        with self._lock:
+            self.generation += 1
+            if not self.ready:
+                return
+            for old, new in changes:
+                self._direct.update(new - old)
+                self._direct.subtract(old - new)
+                old_ancestry = self._ancestry(old)
+                new_ancestry = self._ancestry(new)
+                self._total.update(new_ancestry - old_ancestry)
+                self._total.subtract(old_ancestry - new_ancestry)
+
+    def tree(self) -> list[ActivityNode]:
+        """
+        Root activities with their subtrees, children in ID order.
+        """
+        with self._lock:
+            nodes = {
+                activity_id: ActivityNode(
+                    id=activity_id,
+                    name=name,
+                    organization_count=self._direct[activity_id],
+                    total_organization_count=self._total[activity_id],
+                )
+                for activity_id, (name, _) in self._activities.items()
+            }
+            roots = []
+            for activity_id in sorted(self._activities):
+                parent_id = self._activities[activity_id][1]
+                parent = nodes.get(parent_id)
+                if parent is None:
+                    roots.append(nodes[activity_id])
+                else:
+                    parent.children.append(nodes[activity_id])
+            return roots
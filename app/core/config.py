@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from pathlib import Path
+from typing import Literal
 
 # Build an absolute path to the project's root directory
 # BASE_DIR is .../test_aplication/
@@ -10,6 +11,133 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     API_KEY: str = "your_default_api_key"
 
+    # Keys from the api_keys table are cached per process by hash.
+    # API_KEY above stays valid (with every scope) unless set to "".
+    API_KEY_CACHE_TTL_SECONDS: int = 60
+    API_KEY_NEGATIVE_CACHE_TTL_SECONDS: int = 10
+    API_KEY_CACHE_MAX_ENTRIES: int = 10_000
+
+    # Production server (python -m app.server): gunicorn with uvicorn
+    # workers. SERVER_WORKERS defaults to the number of CPUs.
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int | None = None
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    SERVER_TIMEOUT_SECONDS: int = 60
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: int = 30
+    # Restart workers after this many requests (0 never), with jitter
+    SERVER_MAX_REQUESTS: int = 0
+    SERVER_MAX_REQUESTS_JITTER: int = 0
+    # Open pooled connections and fill caches before serving traffic
+    STARTUP_WARMUP: bool = True
+
+    # Token bucket per API key: RATE_LIMIT_RATE tokens per second, at
+    # most RATE_LIMIT_BURST at once. A request costs 1 token unless its
+    # route template is listed in RATE_LIMIT_ROUTE_COSTS. The memory
+    # backend keeps separate buckets in every worker process.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal["memory", "redis"] = "memory"
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    RATE_LIMIT_RATE: float = 20.0
+    RATE_LIMIT_BURST: float = 100.0
+    RATE_LIMIT_ROUTE_COSTS: dict[str, float] = {
+        "/api/v1/organizations/batch/": 5.0,
+        "/api/v1/organizations/search/": 10.0,
+        "/api/v1/organizations/search/activity/": 5.0,
+        "/api/v1/organizations/search/location/": 10.0,
+        "/api/v1/organizations/search/nearest/": 5.0,
+        "/api/v1/export/organizations/": 50.0,
+        "/api/v1/ingest/": 50.0,
+    }
+
+    # Read replicas: SELECTs are spread round-robin over the healthy
+    # ones, writes go to DATABASE_URL. Replicas that fail a check or lag
+    # more than DB_REPLICA_MAX_LAG_SECONDS (PostgreSQL) are skipped.
+    # With DB_READ_YOUR_WRITES, an API key that wrote reads from the
+    # primary for DB_READ_YOUR_WRITES_SECONDS (tracked per process).
+    DATABASE_REPLICA_URLS: list[str] = []
+    DB_REPLICA_HEALTH_CHECK_SECONDS: float = 10.0
+    DB_REPLICA_MAX_LAG_SECONDS: float = 30.0
+    DB_READ_YOUR_WRITES: bool = False
+    DB_READ_YOUR_WRITES_SECONDS: float = 10.0
+
+    # Use AsyncSession (asyncpg, or aiosqlite for SQLite) instead of the
+    # threadpool-bound sync engine.
+    # ASYNC_DATABASE_URL defaults to DATABASE_URL with the async driver.
+    DB_ASYNC: bool = False
+    ASYNC_DATABASE_URL: str | None = None
+
+    # Connection pool (per worker process)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds, -1 disables
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int | None = None  # PostgreSQL only
+
+    # Per-request SQL statement budget (None disables). With RAISE the
+    # offending statement fails, which makes N+1 regressions fail tests;
+    # otherwise requests over the budget are only logged.
+    SQL_STATEMENT_LIMIT: int | None = None
+    SQL_STATEMENT_LIMIT_RAISE: bool = False
+
+    # Per-request SQL time by repository method (Server-Timing header)
+    # and a log of the last SQL_SLOW_QUERY_LOG_SIZE statements slower
+    # than SQL_SLOW_QUERY_MS, with EXPLAIN output for SELECTs.
+    SQL_PROFILING_ENABLED: bool = False
+    SQL_SLOW_QUERY_MS: float = 200.0
+    SQL_SLOW_QUERY_LOG_SIZE: int = 100
+    SQL_SLOW_QUERY_EXPLAIN: bool = True
+
+    # Request metrics (/metrics) and sampled per-request JSON logs.
+    # Slow (>= REQUEST_LOG_SLOW_SECONDS) and failed requests are always
+    # logged.
+    METRICS_ENABLED: bool = True
+    REQUEST_LOG_SAMPLE_RATE: float = 0.01
+    REQUEST_LOG_SLOW_SECONDS: float = 1.0
+
+    # Build response JSON directly from ORM objects with orjson instead
+    # of validating them through the Pydantic response models
+    FAST_SERIALIZATION: bool = True
+
+    # Serve organization reads from the denormalized organization_documents
+    # table (kept in sync on every write; fill it once with
+    # `python -m app.cli documents rebuild` before turning this on)
+    ORGANIZATION_DOCUMENTS_READS: bool = False
+
+    # Reload interval of the in-memory activity tree counts, which pick
+    # up changes made by other processes only on reload
+    ACTIVITY_COUNTS_REFRESH_SECONDS: int = 60
+    # How often cached activity descendants are checked against the
+    # shared activity_tree_version, which other processes bump
+    DESCENDANT_CACHE_CHECK_SECONDS: float = 1.0
+
+    # Organizations fetched per server-side cursor batch in exports
+    EXPORT_BATCH_SIZE: int = 1000
+    # Exports hand out a watermark this far before their start, so that
+    # writes still running during the export are picked up by the next
+    # incremental export (at the cost of re-delivering their rows)
+    EXPORT_WATERMARK_OVERLAP_SECONDS: int = 300
+    # Rows per COPY/executemany batch when staging bulk imports
+    INGEST_BATCH_SIZE: int = 10_000
+
+    # Cache of serialized GET responses under /api/v1/
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_BACKEND: Literal["memory", "redis"] = "memory"
+    RESPONSE_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    RESPONSE_CACHE_REDIS_TIMEOUT_SECONDS: float = 0.5
+    RESPONSE_CACHE_TTL_SECONDS: int = 60
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_MAX_ENTRY_BYTES: int = 1_000_000
+
+    # In-memory building coordinates index
+    SPATIAL_INDEX_ENABLED: bool = True
+    SPATIAL_INDEX_CELL_SIZE: float = 0.1  # degrees
+    SPATIAL_INDEX_REFRESH_SECONDS: int = 60
+    # Every Nth refresh reloads the whole index, picking up coordinates
+    # edited by other processes
+    SPATIAL_INDEX_FULL_REFRESH_EVERY: int = 10
+
     class Config:
         env_file = BASE_DIR / ".env"
 
@@ -0,0 +1,58 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(
+    lat1: float,
+    lon1: float,
+    lat2: float,
+    lon2: float
+) -> float:
+    """
+    Great-circle distance in kilometers between two points.
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+def bounding_box(
+    latitude: float,
+    longitude: float,
+    radius: float
+) -> tuple[float, float, float, float]:
+    """
+    Returns (min_lat, max_lat, min_lon, max_lon) of a box that contains
+    every point within `radius` kilometers of the center.
+    When the circle reaches a pole or crosses the antimeridian the
+    longitude range is widened to the whole globe.
+    """
+    angular_radius = radius / EARTH_RADIUS_KM
+    lat = math.radians(latitude)
+    min_lat = lat - angular_radius
+    max_lat = lat + angular_radius
+
+    if min_lat <= -math.pi / 2 or max_lat >= math.pi / 2:
+        return (
+            max(math.degrees(min_lat), -90.0),
+            min(math.degrees(max_lat), 90.0),
+            -180.0,
+            180.0,
+        )
+
+    d_lon = math.degrees(
+        math.asin(math.sin(angular_radius) / math.cos(lat))
+    )
+    min_lon = longitude - d_lon
+    max_lon = longitude + d_lon
+    if min_lon < -180.0 or max_lon > 180.0:
+        min_lon, max_lon = -180.0, 180.0
+
+    return math.degrees(min_lat), math.degrees(max_lat), min_lon, max_lon
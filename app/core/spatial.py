@@ -0,0 +1,177 @@
+import heapq
+import math
+import threading
+from collections import defaultdict
+from typing import Iterable
+
+from app.core.geo import bounding_box, haversine_km
+
+
+class SpatialIndex:
+    """
+    In-memory uniform grid over (latitude, longitude) points.
+    Points are bucketed into square cells of `cell_size` degrees, so
+    radius and nearest-neighbour lookups only check the points of the
+    cells that overlap the search area.
+    """
+
+    def __init__(self, cell_size: float = 0.1):
+        self.cell_size = cell_size
+        self.ready = False
+        self.max_id = 0
+        self._points: dict[int, tuple[float, float]] = {}
+        self._cells: dict[tuple[int, int], set[int]] = defaultdict(set)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _cell(self, latitude: float, longitude: float) -> tuple[int, int]:
+        return (
+            math.floor(latitude / self.cell_size),
+            math.floor(longitude / self.cell_size),
+        )
+
+    def load(self, points: Iterable[tuple[int, float, float]]) -> None:
+        """
+        Replaces the index contents with the given (id, lat, lon) points.
+        """
+        with self._lock:
+            self._points.clear()
+            self._cells.clear()
+            self.max_id = 0
+            for point_id, latitude, longitude in points:
+                self.upsert(point_id, latitude, longitude)
+            self.ready = True
+
+    def upsert(self, point_id: int, latitude: float, longitude: float):
+        if latitude is None or longitude is None:
+            self.remove(point_id)
+            return
+        with self._lock:
+            self.remove(point_id)
+            self._points[point_id] = (latitude, longitude)
+            self._cells[self._cell(latitude, longitude)].add(point_id)
+            self.max_id = max(self.max_id, point_id)
+
+    def remove(self, point_id: int) -> None:
+        with self._lock:
+            coordinates = self._points.pop(point_id, None)
+            if coordinates is None:
+                return
+            cell = self._cell(*coordinates)
+            self._cells[cell].discard(point_id)
+            if not self._cells[cell]:
+                del self._cells[cell]
+
+    def within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius: float
+    ) -> list[tuple[int, float]]:
+        """
+        Returns (id, distance_km) pairs within `radius` kilometers,
+        nearest first.
+        """
+        min_lat, max_lat, min_lon, max_lon = bounding_box(
+            latitude,
+            longitude,
+            radius
+        )
+        low_row, low_col = self._cell(min_lat, min_lon)
+        high_row, high_col = self._cell(max_lat, max_lon)
+        box_cells = (high_row - low_row + 1) * (high_col - low_col + 1)
+
+        matches = []
+        with self._lock:
+            if box_cells > len(self._cells):
+                cells = [
+                    cell for cell in self._cells
+                    if low_row <= cell[0] <= high_row
+                    and low_col <= cell[1] <= high_col
+                ]
+            else:
+                cells = [
+                    (row, col)
+                    for row in range(low_row, high_row + 1)
+                    for col in range(low_col, high_col + 1)
+                    if (row, col) in self._cells
+                ]
+            for cell in cells:
+                for point_id in self._cells[cell]:
+                    lat, lon = self._points[point_id]
+                    distance = haversine_km(latitude, longitude, lat, lon)
+                    if distance <= radius:
+                        matches.append((point_id, distance))
+
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        limit: int
+    ) -> list[tuple[int, float]]:
+        """
+        Returns the `limit` points closest to the center as
+        (id, distance_km) pairs, nearest first.
+        Grid rings around the center cell are scanned until enough
+        candidates are found; the distance to the farthest of them then
+        bounds an exact radius lookup.
+        """
+        if limit <= 0:
+            return []
+
+        with self._lock:
+            if limit >= len(self._points):
+                return self._nearest_by_scan(latitude, longitude, limit)
+
+            center_row, center_col = self._cell(latitude, longitude)
+            candidates: list[int] = []
+            probed = 0
+            ring = 0
+            while len(candidates) < limit:
+                if probed > len(self._cells):
+                    return self._nearest_by_scan(latitude, longitude, limit)
+                for cell in self._ring(center_row, center_col, ring):
+                    probed += 1
+                    candidates.extend(self._cells.get(cell, ()))
+                ring += 1
+
+            bound = heapq.nsmallest(
+                limit,
+                (
+                    haversine_km(latitude, longitude, *self._points[point_id])
+                    for point_id in candidates
+                )
+            )[-1]
+            return self.within_radius(latitude, longitude, bound)[:limit]
+
+    def _nearest_by_scan(
+        self,
+        latitude: float,
+        longitude: float,
+        limit: int
+    ) -> list[tuple[int, float]]:
+        return heapq.nsmallest(
+            limit,
+            (
+                (point_id, haversine_km(latitude, longitude, lat, lon))
+                for point_id, (lat, lon) in self._points.items()
+            ),
+            key=lambda match: (match[1], match[0])
+        )
+
+    @staticmethod
+    def _ring(row: int, col: int, ring: int):
+        if ring == 0:
+            yield row, col
+            return
+        for offset in range(-ring, ring + 1):
+            yield row - ring, col + offset
+            yield row + ring, col + offset
+        for offset in range(-ring + 1, ring):
+            yield row + offset, col - ring
+            yield row + offset, col + ring
@@ -0,0 +1,188 @@
+import threading
+import time
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.db import models
+from app.db.replicas import replica_lag_window
+
+REBUILD_CLOSURE_SQL = text("""
+    INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+    WITH RECURSIVE activity_tree (ancestor_id, descendant_id, depth) AS (
+        SELECT id, id, 0
+        FROM activities
+        UNION ALL
+        SELECT at.ancestor_id, a.id, at.depth + 1
+        FROM activities a
+        JOIN activity_tree at ON a.parent_id = at.descendant_id
+    )
+    SELECT ancestor_id, descendant_id, depth FROM activity_tree
+""")
+
+INSERT_NODE_SQL = text("""
+    INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+    SELECT ancestor_id, :activity_id, depth + 1
+    FROM activity_closure
+    WHERE descendant_id = :parent_id
+    UNION ALL
+    SELECT :activity_id, :activity_id, 0
+""")
+
+DETACH_SUBTREE_SQL = text("""
+    DELETE FROM activity_closure
+    WHERE descendant_id IN (
+        SELECT descendant_id FROM activity_closure
+        WHERE ancestor_id = :activity_id
+    )
+    AND ancestor_id NOT IN (
+        SELECT descendant_id FROM activity_closure
+        WHERE ancestor_id = :activity_id
+    )
+""")
+
+ATTACH_SUBTREE_SQL = text("""
+    INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+    SELECT above.ancestor_id, below.descendant_id,
+           above.depth + below.depth + 1
+    FROM activity_closure above
+    CROSS JOIN activity_closure below
+    WHERE above.descendant_id = :parent_id
+    AND below.ancestor_id = :activity_id
+""")
+
+DELETE_NODE_SQL = text("""
+    DELETE FROM activity_closure
+    WHERE ancestor_id = :activity_id OR descendant_id = :activity_id
+""")
+
+BUMP_VERSION_SQL = text("""
+    UPDATE activity_tree_version SET version = version + 1 WHERE id = 1
+""")
+
+
+class DescendantCache:
+    """
+    Process-wide cache of descendant-id sets keyed by activity id.
+    Every invalidation bumps a generation counter, so a lookup that
+    started before a change cannot store its stale result.
+    Changes committed by other processes show up as a new shared
+    activity_tree_version, which callers compare through
+    check_version() at most every `check_interval` seconds.
+    Nothing is stored for `settle_seconds` after a change, while
+    lagging replicas may still return the tree from before it.
+    """
+
+    def __init__(self, check_interval: float, settle_seconds: float):
+        self.generation = 0
+        self.version: int | None = None
+        self.check_interval = check_interval
+        self.settle_seconds = settle_seconds
+        self._checked_at = float("-inf")
+        self._changed_at = float("-inf")
+        self._entries: dict[int, tuple[int, ...]] = {}
+        self._lock = threading.Lock()
+
+    def needs_version_check(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.check_interval
+
+    def check_version(self, version: int | None) -> None:
+        """
+        Drops the entries when the shared version moved since the
+        previous check.
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if version != self.version:
+                if self.version is not None:
+                    self._changed_at = self._checked_at
+                self.version = version
+                self.generation += 1
+                self._entries.clear()
+
+    def get(self, activity_id: int) -> tuple[int, ...] | None:
+        return self._entries.get(activity_id)
+
+    def set(
+        self,
+        activity_id: int,
+        descendant_ids: tuple[int, ...],
+        generation: int
+    ) -> None:
+        with self._lock:
+            settled = (
+                time.monotonic() - self._changed_at >= self.settle_seconds
+            )
+            if generation == self.generation and settled:
+                self._entries[activity_id] = descendant_ids
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._changed_at = time.monotonic()
+            self.generation += 1
+            self._entries.clear()
+
+
+descendant_cache = DescendantCache(
+    settings.DESCENDANT_CACHE_CHECK_SECONDS,
+    replica_lag_window()
+)
+
+
+def rebuild_activity_closure(connection: Connection) -> None:
+    """
+    Recomputes the whole closure table from activities.parent_id.
+    """
+    connection.execute(text("DELETE FROM activity_closure"))
+    connection.execute(REBUILD_CLOSURE_SQL)
+    connection.execute(BUMP_VERSION_SQL)
+    descendant_cache.invalidate()
+
+
+def _mark_changed(
+    connection: Connection,
+    target: models.Activity
+) -> None:
+    connection.execute(BUMP_VERSION_SQL)
+    session = object_session(target)
+    if session is not None:
+        session.info["activities_changed"] = True
+
+
+@event.listens_for(models.Activity, "after_insert")
+def _activity_inserted(mapper, connection, target):
+    connection.execute(
+        INSERT_NODE_SQL,
+        {"activity_id": target.id, "parent_id": target.parent_id}
+    )
+    _mark_changed(connection, target)
+
+
+@event.listens_for(models.Activity, "after_update")
+def _activity_updated(mapper, connection, target):
+    if not inspect(target).attrs.parent_id.history.has_changes():
+        return
+    params = {"activity_id": target.id, "parent_id": target.parent_id}
+    connection.execute(DETACH_SUBTREE_SQL, params)
+    if target.parent_id is not None:
+        connection.execute(ATTACH_SUBTREE_SQL, params)
+    _mark_changed(connection, target)
+
+
+@event.listens_for(models.Activity, "before_delete")
+def _activity_deleted(mapper, connection, target):
+    connection.execute(DELETE_NODE_SQL, {"activity_id": target.id})
+    _mark_changed(connection, target)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("activities_changed", False):
+        descendant_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("activities_changed", None)
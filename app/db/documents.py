@@ -0,0 +1,265 @@
+"""
+Maintenance of the denormalized organization_documents table.
+
+Every write path keeps the documents in sync in the same transaction:
+ORM flushes through the after_flush hook below, the bulk ingest by
+calling refresh_organization_documents itself. An empty or suspect
+table is rebuilt with `python -m app.cli documents rebuild`.
+"""
+import json
+from itertools import chain, islice
+from typing import Iterable, Iterator
+
+from sqlalchemy import (
+    Integer,
+    any_,
+    bindparam,
+    delete,
+    event,
+    func,
+    inspect,
+    select,
+    type_coerce,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.db import models
+
+# Organizations per delete/insert round trip
+REFRESH_BATCH_SIZE = 1000
+# Longest id list bound as one variable per id; SQLite caps the
+# variables of a statement (999 before 3.32)
+MAX_IN_LIST = 500
+
+organizations = models.Organization.__table__
+buildings = models.Building.__table__
+phone_numbers = models.PhoneNumber.__table__
+activities = models.Activity.__table__
+closure = models.ActivityClosure.__table__
+association = models.organization_activity_association
+documents = models.OrganizationDocument.__table__
+
+
+def any_of(column, ids: list[int], dialect_name: str):
+    """
+    Criterion: the id list in `column` shares an element with `ids`.
+    An array overlap (served by the GIN index) on PostgreSQL, a scan
+    of the JSON list elsewhere.
+    """
+    if dialect_name == "postgresql":
+        return type_coerce(column, postgresql.ARRAY(Integer)).overlap(ids)
+    values = func.json_each(column).table_valued("value")
+    return select(values.c.value).where(values.c.value.in_(ids)).exists()
+
+
+def one_of(column, ids: list[int], dialect_name: str):
+    """
+    Criterion: `column` equals one of `ids`. Lists longer than
+    MAX_IN_LIST are bound as a single parameter, an array on PostgreSQL
+    and a JSON list read by json_each elsewhere, which the planner
+    joins like a table instead of checking thousands of variables.
+    """
+    if len(ids) <= MAX_IN_LIST:
+        return column.in_(ids)
+    if dialect_name == "postgresql":
+        return column == any_(
+            bindparam(None, ids, type_=postgresql.ARRAY(Integer))
+        )
+    values = func.json_each(json.dumps(ids)).table_valued("value")
+    return column.in_(select(values.c.value))
+
+
+def _batches(ids: Iterable[int], size: int) -> Iterator[list[int]]:
+    ids = iter(ids)
+    while batch := list(islice(ids, size)):
+        yield batch
+
+
+def build_documents(
+    connection: Connection,
+    organization_ids: list[int]
+) -> list[dict]:
+    """
+    Document rows for the given organizations, four queries whatever
+    their number. Ids without an organization are skipped.
+    """
+    rows = connection.execute(
+        select(
+            organizations.c.id,
+            organizations.c.name,
+            organizations.c.building_id,
+            buildings.c.address,
+            buildings.c.latitude,
+            buildings.c.longitude,
+        )
+        .select_from(organizations.outerjoin(
+            buildings,
+            buildings.c.id == organizations.c.building_id
+        ))
+        .where(organizations.c.id.in_(organization_ids))
+    ).all()
+    by_id = {
+        row.id: dict(
+            row._mapping,
+            phones=[],
+            activity_ids=[],
+            activity_names=[],
+            ancestor_activity_ids=[],
+        )
+        for row in rows
+    }
+    if not by_id:
+        return []
+
+    ids = list(by_id)
+    for organization_id, number in connection.execute(
+        select(phone_numbers.c.organization_id, phone_numbers.c.number)
+        .where(phone_numbers.c.organization_id.in_(ids))
+        .order_by(phone_numbers.c.id)
+    ):
+        by_id[organization_id]["phones"].append(number)
+    for organization_id, activity_id, name in connection.execute(
+        select(
+            association.c.organization_id,
+            activities.c.id,
+            activities.c.name
+        )
+        .join(activities, activities.c.id == association.c.activity_id)
+        .where(association.c.organization_id.in_(ids))
+        .distinct()
+        .order_by(association.c.organization_id, activities.c.id)
+    ):
+        by_id[organization_id]["activity_ids"].append(activity_id)
+        by_id[organization_id]["activity_names"].append(name)
+    # The closure includes every activity itself at depth 0
+    for organization_id, ancestor_id in connection.execute(
+        select(association.c.organization_id, closure.c.ancestor_id)
+        .join(closure, closure.c.descendant_id == association.c.activity_id)
+        .where(association.c.organization_id.in_(ids))
+        .distinct()
+        .order_by(association.c.organization_id, closure.c.ancestor_id)
+    ):
+        by_id[organization_id]["ancestor_activity_ids"].append(ancestor_id)
+    return list(by_id.values())
+
+
+def refresh_organization_documents(
+    connection: Connection,
+    organization_ids: Iterable[int]
+) -> int:
+    """
+    Rewrites the documents of the given organizations from the
+    normalized tables; documents of deleted organizations are removed.
+    Returns the number of documents written.
+    """
+    written = 0
+    for batch in _batches(organization_ids, REFRESH_BATCH_SIZE):
+        connection.execute(delete(documents).where(documents.c.id.in_(batch)))
+        rows = build_documents(connection, batch)
+        if rows:
+            connection.execute(documents.insert(), rows)
+            written += len(rows)
+    return written
+
+
+def rebuild_organization_documents(
+    connection: Connection,
+    batch_size: int = REFRESH_BATCH_SIZE
+) -> int:
+    """
+    Recreates every document. Returns the number written.
+    """
+    connection.execute(delete(documents))
+    written = 0
+    after_id = 0
+    while True:
+        batch = connection.execute(
+            select(organizations.c.id)
+            .where(organizations.c.id > after_id)
+            .order_by(organizations.c.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not batch:
+            break
+        rows = build_documents(connection, batch)
+        if rows:
+            connection.execute(documents.insert(), rows)
+            written += len(rows)
+        after_id = batch[-1]
+    return written
+
+
+def _affected_organizations(
+    connection: Connection,
+    session: Session
+) -> set[int]:
+    organization_ids: set[int] = set()
+    building_ids: set[int] = set()
+    activity_ids: set[int] = set()
+    for instance in chain(session.new, session.dirty, session.deleted):
+        if isinstance(instance, models.Organization):
+            organization_ids.add(instance.id)
+        elif isinstance(instance, models.PhoneNumber):
+            # A phone moved to another organization changes both
+            history = inspect(instance).attrs.organization_id.history
+            organization_ids.update(
+                organization_id
+                for organization_id in chain(
+                    [instance.organization_id],
+                    history.deleted
+                )
+                if organization_id is not None
+            )
+        elif isinstance(instance, models.Building):
+            building_ids.add(instance.id)
+        elif isinstance(instance, models.Activity):
+            activity_ids.add(instance.id)
+    if building_ids:
+        organization_ids.update(connection.execute(
+            select(organizations.c.id)
+            .where(organizations.c.building_id.in_(building_ids))
+        ).scalars())
+    if activity_ids:
+        # Organizations under the new position of a changed activity
+        # come from the (already updated) closure, those under its old
+        # position or under a deleted activity from their documents
+        organization_ids.update(connection.execute(
+            select(association.c.organization_id)
+            .join(
+                closure,
+                closure.c.descendant_id == association.c.activity_id
+            )
+            .where(closure.c.ancestor_id.in_(activity_ids))
+        ).scalars())
+        organization_ids.update(connection.execute(
+            select(documents.c.id).where(any_of(
+                documents.c.ancestor_activity_ids,
+                list(activity_ids),
+                connection.dialect.name
+            ))
+        ).scalars())
+    return organization_ids
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_after_flush(session, flush_context):
+    if not any(
+        isinstance(
+            instance,
+            (
+                models.Organization,
+                models.PhoneNumber,
+                models.Building,
+                models.Activity,
+            )
+        )
+        for instance in chain(session.new, session.dirty, session.deleted)
+    ):
+        return
+    connection = session.connection()
+    refresh_organization_documents(
+        connection,
+        sorted(_affected_organizations(connection, session))
+    )
@@ -0,0 +1,246 @@
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+FunctionType = TypeVar("FunctionType", bound=Callable[..., Any])
+
+
+@dataclass
+class StatementCount:
+    statements: int = 0
+    # Rows reported by the driver; drivers that do not report
+    # rowcount for SELECT (e.g. sqlite3) contribute nothing.
+    rows: int = 0
+    # Wall time spent in cursor.execute, filled in by instrument_engine.
+    seconds: float = 0.0
+
+
+@contextmanager
+def count_statements(engine: Engine) -> Iterator[StatementCount]:
+    """
+    Counts SQL statements (and rows, where the driver reports them)
+    executed on `engine` inside the block.
+    """
+    count = StatementCount()
+
+    def after_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        count.statements += 1
+        if cursor.rowcount and cursor.rowcount > 0:
+            count.rows += cursor.rowcount
+
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    try:
+        yield count
+    finally:
+        event.remove(engine, "after_cursor_execute", after_cursor_execute)
+
+
+class StatementLimitExceeded(RuntimeError):
+    pass
+
+
+# Execution option for connections that legitimately issue an unbounded
+# number of statements within one request (e.g. streaming exports)
+STATEMENT_LIMIT_EXEMPT = "statement_limit_exempt"
+
+
+@dataclass
+class RequestProfile(StatementCount):
+    # "METHOD /path" of the request, for the slow query log
+    label: str | None = None
+    # Per repository method, filled in when SQL_PROFILING_ENABLED is set
+    operations: dict[str, StatementCount] = field(default_factory=dict)
+
+
+@dataclass
+class SlowQuery:
+    recorded_at: datetime
+    duration_ms: float
+    statement: str
+    parameters: str
+    operation: str | None
+    request: str | None
+    plan: list[str] | None
+
+
+class SlowQueryLog:
+    """
+    The most recent statements slower than SQL_SLOW_QUERY_MS,
+    with their query plans, newest last.
+    """
+
+    def __init__(self, max_entries: int):
+        self._entries: deque[SlowQuery] = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    def record(self, entry: SlowQuery) -> None:
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self) -> list[SlowQuery]:
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+slow_query_log = SlowQueryLog(settings.SQL_SLOW_QUERY_LOG_SIZE)
+
+_request_count: ContextVar[RequestProfile | None] = ContextVar(
+    "request_statement_count",
+    default=None
+)
+_current_operation: ContextVar[str | None] = ContextVar(
+    "current_sql_operation",
+    default=None
+)
+
+
+@contextmanager
+def track_request_statements(
+    label: str | None = None
+) -> Iterator[RequestProfile]:
+    """
+    Counts statements issued by the current request on instrumented
+    engines. The counter is shared with threadpool and run_sync calls
+    through the copied context.
+    """
+    count = RequestProfile(label=label)
+    token = _request_count.set(count)
+    try:
+        yield count
+    finally:
+        _request_count.reset(token)
+
+
+def profiled(operation: str) -> Callable[[FunctionType], FunctionType]:
+    """
+    Attributes statements executed inside the decorated function to
+    `operation`. The innermost profiled call wins.
+    """
+    def decorator(function: FunctionType) -> FunctionType:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            token = _current_operation.set(operation)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _current_operation.reset(token)
+        return wrapper
+    return decorator
+
+
+def _before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    count = _request_count.get()
+    if count is not None:
+        count.statements += 1
+        limit = settings.SQL_STATEMENT_LIMIT
+        if limit is not None and count.statements > limit:
+            exempt = context is not None and context.execution_options.get(
+                STATEMENT_LIMIT_EXEMPT
+            )
+            if settings.SQL_STATEMENT_LIMIT_RAISE and not exempt:
+                raise StatementLimitExceeded(
+                    f"Request issued more than {limit} SQL statements"
+                )
+    elif not settings.SQL_PROFILING_ENABLED:
+        return
+    if context is not None:
+        context._request_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    started_at = getattr(context, "_request_started_at", None)
+    if started_at is None:
+        return
+    elapsed = time.perf_counter() - started_at
+    rows = max(cursor.rowcount or 0, 0)
+
+    count = _request_count.get()
+    if count is not None:
+        count.seconds += elapsed
+        count.rows += rows
+    if not settings.SQL_PROFILING_ENABLED:
+        return
+
+    operation = _current_operation.get()
+    if count is not None:
+        stats = count.operations.setdefault(
+            operation or "other",
+            StatementCount()
+        )
+        stats.statements += 1
+        stats.seconds += elapsed
+        stats.rows += rows
+    if elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS:
+        slow_query_log.record(SlowQuery(
+            recorded_at=datetime.now(timezone.utc),
+            duration_ms=round(elapsed * 1000, 3),
+            statement=statement,
+            parameters=repr(parameters)[:500],
+            operation=operation,
+            request=count.label if count is not None else None,
+            plan=(
+                None if executemany
+                else _explain(conn, statement, parameters)
+            ),
+        ))
+
+
+def query_plan(conn, statement, parameters) -> list[str] | None:
+    """
+    EXPLAIN output of a SELECT, one line per plan node; None for other
+    statements. Runs on a separate cursor of the same connection so
+    that a pending result is kept.
+    """
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    prefix = (
+        "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    )
+    explain_cursor = conn.connection.cursor()
+    try:
+        explain_cursor.execute(prefix + statement, parameters)
+        return [str(row[-1]) for row in explain_cursor.fetchall()]
+    finally:
+        explain_cursor.close()
+
+
+def _explain(conn, statement, parameters) -> list[str] | None:
+    """
+    Plan of an already executed SELECT for the slow query log.
+    """
+    if not settings.SQL_SLOW_QUERY_EXPLAIN:
+        return None
+    try:
+        return query_plan(conn, statement, parameters)
+    except Exception as exc:
+        logger.debug(f"EXPLAIN failed: {exc}")
+        return None
+
+
+def instrument_engine(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
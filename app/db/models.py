@@ -1,40 +1,82 @@
+from dataclasses import dataclass
+from itertools import chain
+
 from sqlalchemy import (
+    JSON,
     Column,
+    DateTime,
     Integer,
     String,
     Float,
     ForeignKey,
+    Index,
     Table,
+    event,
+    func,
+    inspect,
+    or_,
+    select,
 )
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session, relationship, declarative_base
 
 Base = declarative_base()
 
 organization_activity_association = Table(
     "organization_activity_association",
     Base.metadata,
-    Column("organization_id", Integer, ForeignKey("organizations.id")),
-    Column("activity_id", Integer, ForeignKey("activities.id")),
+    Column(
+        "organization_id",
+        Integer,
+        ForeignKey("organizations.id"),
+        primary_key=True,
+    ),
+    Column(
+        "activity_id",
+        Integer,
+        ForeignKey("activities.id"),
+        primary_key=True,
+    ),
+    # The primary key serves organization -> activities lookups, this
+    # index the reverse direction; both cover the whole row
+    Index(
+        "ix_organization_activity_association_activity_id",
+        "activity_id",
+        "organization_id",
+    ),
 )
 
 
 class Building(Base):
     __tablename__ = "buildings"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     address = Column(String, index=True)
     latitude = Column(Float)
     longitude = Column(Float)
 
     organizations = relationship("Organization", back_populates="building")
 
+    __table_args__ = (
+        Index("ix_buildings_latitude_longitude", "latitude", "longitude"),
+    )
+
 
 class Organization(Base):
     __tablename__ = "organizations"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String, index=True)
     building_id = Column(Integer, ForeignKey("buildings.id"))
+    # Last change to anything exported with the organization: itself,
+    # its phones, its activities, their names and its building
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=func.now(),
+        server_default=func.now(),
+        index=True,
+    )
 
     building = relationship("Building", back_populates="organizations")
     phone_numbers = relationship("PhoneNumber", back_populates="organization")
@@ -44,23 +86,50 @@ class Organization(Base):
         back_populates="organizations",
     )
 
+    __table_args__ = (
+        # Organizations of a building in keyset (id) order
+        Index("ix_organizations_building_id_id", "building_id", "id"),
+        # Trigram index for substring/similarity search (PostgreSQL)
+        Index(
+            "ix_organizations_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
+
 
 class PhoneNumber(Base):
     __tablename__ = "phone_numbers"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     number = Column(String)
     organization_id = Column(Integer, ForeignKey("organizations.id"))
 
     organization = relationship("Organization", back_populates="phone_numbers")
 
+    __table_args__ = (
+        # Phones of an organization without visiting the table
+        # (index-only on PostgreSQL)
+        Index(
+            "ix_phone_numbers_organization_id",
+            "organization_id",
+            postgresql_include=["number"],
+        ),
+    )
+
 
 class Activity(Base):
     __tablename__ = "activities"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String, index=True)
-    parent_id = Column(Integer, ForeignKey("activities.id"), nullable=True)
+    parent_id = Column(
+        Integer,
+        ForeignKey("activities.id"),
+        nullable=True,
+        index=True,
+    )
 
     parent = relationship(
         "Activity", remote_side=[id],
@@ -72,3 +141,214 @@ class Activity(Base):
         secondary=organization_activity_association,
         back_populates="activities",
     )
+
+
+class ActivityClosure(Base):
+    """
+    Materialized ancestor/descendant pairs of the activity tree,
+    including a (id, id, 0) row for every activity.
+    """
+    __tablename__ = "activity_closure"
+
+    ancestor_id = Column(
+        Integer,
+        ForeignKey("activities.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    descendant_id = Column(
+        Integer,
+        ForeignKey("activities.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_activity_closure_descendant_id_ancestor_id",
+            "descendant_id",
+            "ancestor_id",
+        ),
+    )
+
+
+class ActivityTreeVersion(Base):
+    """
+    Single-row counter bumped by every transaction that changes the
+    activity tree, so that processes caching the tree notice changes
+    committed elsewhere.
+    """
+    __tablename__ = "activity_tree_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# Integer lists: arrays with GIN indexes on PostgreSQL, JSON elsewhere
+IdList = JSON().with_variant(postgresql.ARRAY(Integer), "postgresql")
+
+
+@dataclass(frozen=True)
+class DocumentPhone:
+    number: str
+
+
+@dataclass(frozen=True)
+class DocumentActivity:
+    id: int
+    name: str
+
+
+class OrganizationDocument(Base):
+    """
+    Denormalized read model: one row per organization with its
+    building, phone numbers and activities, plus the ids of those
+    activities and of all their ancestors to filter on. Kept in sync
+    by app.db.documents. Attribute names match Organization, so a
+    document serializes like one (`building` is the document itself).
+    """
+    __tablename__ = "organization_documents"
+
+    id = Column(
+        Integer,
+        ForeignKey("organizations.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    name = Column(String, index=True)
+    building_id = Column(Integer, index=True)
+    address = Column(String)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    phones = Column(JSON, nullable=False, default=list)
+    activity_ids = Column(IdList, nullable=False, default=list)
+    activity_names = Column(JSON, nullable=False, default=list)
+    ancestor_activity_ids = Column(IdList, nullable=False, default=list)
+
+    __table_args__ = (
+        Index(
+            "ix_organization_documents_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_organization_documents_activity_ids",
+            "activity_ids",
+            postgresql_using="gin",
+        ),
+        Index(
+            "ix_organization_documents_ancestor_activity_ids",
+            "ancestor_activity_ids",
+            postgresql_using="gin",
+        ),
+    )
+
+    @property
+    def building(self) -> "OrganizationDocument | None":
+        return None if self.building_id is None else self
+
+    @property
+    def phone_numbers(self) -> list[DocumentPhone]:
+        return [DocumentPhone(number) for number in self.phones]
+
+    @property
+    def activities(self) -> list[DocumentActivity]:
+        return [
+            DocumentActivity(activity_id, name)
+            for activity_id, name in zip(
+                self.activity_ids,
+                self.activity_names
+            )
+        ]
+
+
+class ApiKey(Base):
+    """
+    Client API key. Only the SHA-256 of the key is stored; the first
+    characters are kept to tell keys apart in listings.
+    """
+    __tablename__ = "api_keys"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    key_prefix = Column(String(8), nullable=False)
+    key_hash = Column(String(64), nullable=False, unique=True)
+    # Space-separated extra permissions ("write", "admin");
+    # every active key can read
+    scopes = Column(String, nullable=False, default="", server_default="")
+    created_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=func.now(),
+        server_default=func.now(),
+    )
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+
+
+@event.listens_for(Session, "before_flush")
+def _touch_organizations(session, flush_context, instances):
+    """
+    Bumps Organization.updated_at when anything exported with it
+    changes, for incremental exports: the organization, its phone
+    numbers (including the previous owner of a moved phone), its
+    activities, its building, and the names of its activities.
+    Organizations that are not loaded are updated with one statement.
+    """
+    touched: set = set()
+    touched_ids: set[int] = set()
+    building_ids: set[int] = set()
+    activity_ids: set[int] = set()
+    for instance in chain(session.new, session.dirty, session.deleted):
+        if isinstance(instance, PhoneNumber):
+            state = inspect(instance)
+            touched.add(instance.organization)
+            touched.update(state.attrs.organization.history.deleted)
+            touched_ids.update(state.attrs.organization_id.history.deleted)
+            if instance not in session.new:
+                # Still the old owner when moved through the relationship
+                touched_ids.add(instance.organization_id)
+        elif isinstance(instance, Organization):
+            if session.is_modified(instance):
+                touched.add(instance)
+        elif instance in session.new:
+            continue
+        elif isinstance(instance, Building):
+            state = inspect(instance)
+            if instance in session.deleted or any(
+                state.attrs[name].history.has_changes()
+                for name in ("address", "latitude", "longitude")
+            ):
+                building_ids.add(instance.id)
+        elif isinstance(instance, Activity):
+            if (
+                instance in session.deleted
+                or inspect(instance).attrs.name.history.has_changes()
+            ):
+                activity_ids.add(instance.id)
+
+    for organization in touched:
+        if (
+            organization is not None
+            and organization not in session.new
+            and organization not in session.deleted
+        ):
+            organization.updated_at = func.now()
+
+    organizations = Organization.__table__
+    criteria = []
+    if touched_ids - {None}:
+        criteria.append(organizations.c.id.in_(touched_ids - {None}))
+    if building_ids:
+        criteria.append(organizations.c.building_id.in_(building_ids))
+    if activity_ids:
+        association = organization_activity_association
+        criteria.append(organizations.c.id.in_(
+            select(association.c.organization_id).where(
+                association.c.activity_id.in_(activity_ids)
+            )
+        ))
+    if criteria:
+        session.connection().execute(
+            organizations.update()
+            .where(or_(*criteria))
+            .values(updated_at=func.now())
+        )
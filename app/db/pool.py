@@ -0,0 +1,88 @@
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+@dataclass
+class PoolWaitStats:
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+
+_wait_stats: dict[str, PoolWaitStats] = {}
+_lock = threading.Lock()
+
+
+def _record_wait(name: str, seconds: float, timed_out: bool) -> None:
+    with _lock:
+        stats = _wait_stats.setdefault(name, PoolWaitStats())
+        if timed_out:
+            stats.timeouts += 1
+        else:
+            stats.checkouts += 1
+        stats.wait_seconds_total += seconds
+        stats.wait_seconds_max = max(stats.wait_seconds_max, seconds)
+
+
+class _TimedCheckoutMixin:
+    """
+    Measures how long each checkout waits for a free connection,
+    keyed by the pool's logging name.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            _record_wait(
+                self._orig_logging_name or "default",
+                time.perf_counter() - start,
+                timed_out,
+            )
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(name: str, pool: Pool) -> dict:
+    """
+    Snapshot of a pool's connections and checkout wait statistics.
+    """
+    status = {
+        "name": name,
+        "size": None,
+        "checked_out": None,
+        "idle": None,
+        "overflow": None,
+    }
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+        )
+    with _lock:
+        stats = _wait_stats.get(name, PoolWaitStats())
+        status.update(
+            checkouts=stats.checkouts,
+            timeouts=stats.timeouts,
+            wait_seconds_total=stats.wait_seconds_total,
+            wait_seconds_max=stats.wait_seconds_max,
+        )
+    return status
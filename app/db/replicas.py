@@ -0,0 +1,168 @@
+import asyncio
+import itertools
+import logging
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL standby lag; 0 when everything received has been replayed,
+# NULL on a server that is not a standby
+REPLICATION_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+# API key name of the current request, set by the auth dependency
+current_client: ContextVar[str | None] = ContextVar(
+    "current_client",
+    default=None
+)
+
+# Clients that committed a write recently, whose reads go to the primary
+_recent_writers: TTLCache[str, bool] = TTLCache(
+    10_000,
+    settings.DB_READ_YOUR_WRITES_SECONDS
+)
+
+
+def record_write() -> None:
+    client = current_client.get()
+    if settings.DB_READ_YOUR_WRITES and client is not None:
+        _recent_writers.set(client, True)
+
+
+def reads_from_primary() -> bool:
+    """
+    Whether the current request must read its own recent writes.
+    """
+    if not settings.DB_READ_YOUR_WRITES:
+        return False
+    client = current_client.get()
+    return client is not None and _recent_writers.get(client, False)
+
+
+def replica_lag_window() -> float:
+    """
+    Seconds after a write during which replicas may still miss it, so
+    that reads must not fill caches; 0 without replicas.
+    """
+    if not settings.DATABASE_REPLICA_URLS:
+        return 0.0
+    return settings.DB_REPLICA_MAX_LAG_SECONDS
+
+
+def _first_line(exc: BaseException) -> str:
+    lines = str(exc).splitlines()
+    return lines[0] if lines else type(exc).__name__
+
+
+@dataclass(eq=False)
+class Replica:
+    name: str
+    engine: Engine
+    async_engine: AsyncEngine | None = None
+    healthy: bool = True
+    lag_seconds: float | None = None
+
+
+class ReplicaSet:
+    """
+    Read replicas picked round-robin among the healthy ones.
+    A replica is taken out when a connection to it breaks or a health
+    check fails (unreachable or lagging more than `max_lag_seconds`),
+    and put back by the next successful check.
+    """
+
+    def __init__(self, replicas: list[Replica], max_lag_seconds: float):
+        self.replicas = replicas
+        self.max_lag_seconds = max_lag_seconds
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        for replica in replicas:
+            engines = [replica.engine]
+            if replica.async_engine is not None:
+                engines.append(replica.async_engine.sync_engine)
+            for replica_engine in engines:
+                event.listen(
+                    replica_engine,
+                    "handle_error",
+                    self._disconnect_handler(replica)
+                )
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self) -> Replica | None:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def set_health(self, replica: Replica, healthy: bool, reason: str = ""):
+        with self._lock:
+            changed = replica.healthy != healthy
+            replica.healthy = healthy
+        if changed and healthy:
+            logger.info(f"Replica {replica.name} is back in rotation")
+        elif changed:
+            logger.warning(
+                f"Replica {replica.name} taken out of rotation: {reason}"
+            )
+
+    def check(self) -> None:
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as connection:
+                    lag = self._replication_lag(connection)
+            except Exception as exc:
+                self.set_health(replica, False, _first_line(exc))
+                continue
+            replica.lag_seconds = lag
+            if lag is not None and lag > self.max_lag_seconds:
+                self.set_health(replica, False, f"{lag:.1f}s behind")
+            else:
+                self.set_health(replica, True)
+
+    @staticmethod
+    def _replication_lag(connection: Connection) -> float | None:
+        if connection.dialect.name != "postgresql":
+            connection.execute(text("SELECT 1"))
+            return None
+        lag = connection.execute(REPLICATION_LAG_SQL).scalar()
+        return None if lag is None else float(lag)
+
+    def _disconnect_handler(self, replica: Replica):
+        def handle_error(context):
+            # No connection means connecting itself failed
+            if context.is_disconnect or context.connection is None:
+                self.set_health(
+                    replica,
+                    False,
+                    _first_line(context.original_exception)
+                )
+        return handle_error
+
+
+async def run_replica_health_checks(replica_set: ReplicaSet) -> None:
+    """
+    Checks the replicas periodically until cancelled.
+    """
+    while True:
+        await asyncio.sleep(settings.DB_REPLICA_HEALTH_CHECK_SECONDS)
+        try:
+            await run_in_threadpool(replica_set.check)
+        except Exception:
+            logger.exception("Replica health check failed")
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from datetime import datetime
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 
@@ -40,6 +41,21 @@ class Activity(ActivityBase):
 Activity.update_forward_refs()
 
 
+class ActivityTreeNode(ActivityBase):
+    id: int
+    # Organizations linked to the activity itself
+    organization_count: int
+    # Organizations linked to the activity or any sub-activity
+    total_organization_count: int
+    children: List["ActivityTreeNode"] = []
+
+    class Config:
+        orm_mode = True
+
+
+ActivityTreeNode.update_forward_refs()
+
+
 # Building Schemas
 class BuildingBase(BaseModel):
     address: str
@@ -79,3 +95,55 @@ class Organization(OrganizationBase):
 
 
 Building.update_forward_refs()
+
+
+class OrganizationBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+
+class OrganizationLookup(BaseModel):
+    id: int
+    found: bool
+    organization: Optional[Organization] = None
+
+
+# Ingest Schemas
+class IngestReport(BaseModel):
+    lines: int
+    activities: int
+    buildings: int
+    organizations: int
+    phone_numbers: int
+    activity_links: int
+    rejected: int
+    unresolved: int
+    errors: List[str] = []
+
+    class Config:
+        orm_mode = True
+
+
+# System Schemas
+class PoolStatus(BaseModel):
+    name: str
+    size: Optional[int] = None
+    checked_out: Optional[int] = None
+    idle: Optional[int] = None
+    overflow: Optional[int] = None
+    checkouts: int
+    timeouts: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+
+
+class SlowQuery(BaseModel):
+    recorded_at: datetime
+    duration_ms: float
+    statement: str
+    parameters: str
+    operation: Optional[str] = None
+    request: Optional[str] = None
+    plan: Optional[List[str]] = None
+
+    class Config:
+        orm_mode = True
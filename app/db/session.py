@@ -1,10 +1,240 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import Select, create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 from app.core.config import settings
+from app.db.instrumentation import instrument_engine
+from app.db.pool import (
+    TimedAsyncAdaptedQueuePool,
+    TimedQueuePool,
+    pool_status,
+)
+from app.db.replicas import (
+    Replica,
+    ReplicaSet,
+    reads_from_primary,
+    record_write,
+)
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Async drivers for the sync URLs in DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def engine_options(url: str, name: str, is_async: bool = False) -> dict:
+    """
+    Pool and connection options from settings for an engine URL.
+    SQLite keeps SQLAlchemy's default pool for its driver.
+    """
+    backend = make_url(url).get_backend_name()
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_logging_name": name,
+    }
+    if backend == "sqlite":
+        return options
+
+    options.update(
+        poolclass=TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    if backend == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS:
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if is_async:
+            options["connect_args"] = {
+                "server_settings": {"statement_timeout": timeout}
+            }
+        else:
+            options["connect_args"] = {
+                "options": f"-c statement_timeout={timeout}"
+            }
+    return options
+
+
+def to_async_url(database_url: str) -> str:
+    url = make_url(database_url)
+    return url.set(
+        drivername=ASYNC_DRIVERS[url.get_backend_name()]
+    ).render_as_string(hide_password=False)
+
+
+def get_async_database_url() -> str:
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    return to_async_url(settings.DATABASE_URL)
+
+
+engine = create_engine(
+    settings.DATABASE_URL,
+    **engine_options(settings.DATABASE_URL, "primary")
+)
+instrument_engine(engine)
+
+async_engine = None
+if settings.DB_ASYNC:
+    async_database_url = get_async_database_url()
+    async_engine = create_async_engine(
+        async_database_url,
+        **engine_options(async_database_url, "primary_async", is_async=True)
+    )
+    instrument_engine(async_engine.sync_engine)
+
+
+def create_replica(index: int, url: str) -> Replica:
+    name = f"replica{index}"
+    replica = Replica(
+        name=name,
+        engine=create_engine(url, **engine_options(url, name))
+    )
+    instrument_engine(replica.engine)
+    if settings.DB_ASYNC:
+        async_url = to_async_url(url)
+        replica.async_engine = create_async_engine(
+            async_url,
+            **engine_options(async_url, f"{name}_async", is_async=True)
+        )
+        instrument_engine(replica.async_engine.sync_engine)
+    return replica
+
+
+replica_set = ReplicaSet(
+    [
+        create_replica(index, url)
+        for index, url in enumerate(settings.DATABASE_REPLICA_URLS, 1)
+    ],
+    settings.DB_REPLICA_MAX_LAG_SECONDS
+)
+
+
+class RoutingSession(Session):
+    """
+    Sends plain SELECTs to a healthy replica and everything else to
+    the primary. Once a session has flushed, its remaining reads stay
+    on the primary, as do those of clients that wrote within the
+    read-your-writes window. Sessions bound to another engine (such as
+    the statement-limit exempt one) are never routed.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            replica_set
+            and isinstance(clause, Select)
+            and not self._flushing
+            and not self.info.get("wrote")
+            and not reads_from_primary()
+        ):
+            is_async = (
+                async_engine is not None
+                and self.bind is async_engine.sync_engine
+            )
+            if self.bind is engine or is_async:
+                replica = replica_set.choose()
+                if replica is not None and is_async:
+                    return replica.async_engine.sync_engine
+                if replica is not None:
+                    return replica.engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _pin_to_primary(session, flush_context):
+    if session.new or session.dirty or session.deleted:
+        session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _record_write(session):
+    if session.info.get("wrote"):
+        record_write()
+
+
+SessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    class_=RoutingSession
+)
+AsyncSessionLocal = None
+if async_engine is not None:
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+        sync_session_class=RoutingSession,
+    )
+
+
+def _warm_connection_count(pool_engine) -> int:
+    # SQLite keeps its driver's default pool, nothing to open ahead
+    if not isinstance(pool_engine.pool, QueuePool):
+        return 0
+    return pool_engine.pool.size()
+
+
+def warm_pools() -> int:
+    """
+    Fills the pools of the primary and healthy replica engines up to
+    DB_POOL_SIZE. Returns the number of connections opened.
+    """
+    engines = [engine] + [
+        replica.engine for replica in replica_set.replicas if replica.healthy
+    ]
+    opened = 0
+    for pool_engine in engines:
+        connections = []
+        try:
+            for _ in range(_warm_connection_count(pool_engine)):
+                connections.append(pool_engine.connect())
+        finally:
+            for connection in connections:
+                connection.close()
+        opened += len(connections)
+    return opened
+
+
+async def warm_async_pools() -> int:
+    """
+    Like warm_pools, for the async engines.
+    """
+    if async_engine is None:
+        return 0
+    engines = [async_engine] + [
+        replica.async_engine
+        for replica in replica_set.replicas
+        if replica.healthy and replica.async_engine is not None
+    ]
+    opened = 0
+    for pool_engine in engines:
+        connections = []
+        try:
+            for _ in range(_warm_connection_count(pool_engine.sync_engine)):
+                connections.append(await pool_engine.connect())
+        finally:
+            for connection in connections:
+                await connection.close()
+        opened += len(connections)
+    return opened
+
+
+def dispose_pools() -> None:
+    """
+    Drops pooled connections inherited from a parent process without
+    closing them, for use right after forking a worker.
+    """
+    engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+    for replica in replica_set.replicas:
+        replica.engine.dispose(close=False)
+        if replica.async_engine is not None:
+            replica.async_engine.sync_engine.dispose(close=False)
 
 
 def get_db():
@@ -13,3 +243,28 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Session dependency used by the API, selected by settings.DB_ASYNC
+get_session = get_async_db if settings.DB_ASYNC else get_db
+
+
+def get_pool_statuses() -> list[dict]:
+    statuses = [pool_status("primary", engine.pool)]
+    if async_engine is not None:
+        statuses.append(
+            pool_status("primary_async", async_engine.sync_engine.pool)
+        )
+    for replica in replica_set.replicas:
+        statuses.append(pool_status(replica.name, replica.engine.pool))
+        if replica.async_engine is not None:
+            statuses.append(pool_status(
+                f"{replica.name}_async",
+                replica.async_engine.sync_engine.pool
+            ))
+    return statuses
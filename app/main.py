@@ -1,10 +1,33 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+import asyncio
 import logging
-import time
 
-from app.api import routers
+from app.api import metrics, routers
+from app.api.response_cache import (
+    ResponseCacheMiddleware,
+    load_schema_revision,
+)
+from app.core.config import settings
+from app.db.replicas import run_replica_health_checks
+from app.db.session import (
+    SessionLocal,
+    async_engine,
+    replica_set,
+    warm_async_pools,
+    warm_pools,
+)
+from app.repositories.activities import ActivityRepository
+from app.services.activity_counts import (
+    refresh_activity_counts,
+    run_activity_counts_refresh,
+)
+from app.services.spatial import (
+    refresh_building_index,
+    run_building_index_refresh,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -14,17 +37,80 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        logger.info(f"Request: {request.method} {request.url.path}")
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        logger.info(
-            f"Response status: {response.status_code} | "
-            f"Process time: {process_time:.4f}s"
+async def warm_up() -> None:
+    """
+    Opens the pooled connections and fills the activity tree cache,
+    so that the first requests do not pay for either.
+    """
+    connections = await run_in_threadpool(warm_pools)
+    connections += await warm_async_pools()
+
+    def load_activity_tree():
+        with SessionLocal() as db:
+            return ActivityRepository(db).warm_descendant_cache()
+    activities = await run_in_threadpool(load_activity_tree)
+    logger.info(
+        f"Warm-up done: {connections} connections opened, "
+        f"{activities} activity subtrees cached"
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Application startup")
+    if replica_set:
+        # Before anything else reads, so that a dead replica is skipped
+        await run_in_threadpool(replica_set.check)
+        app.state.replica_health_task = asyncio.create_task(
+            run_replica_health_checks(replica_set)
+        )
+    if settings.RESPONSE_CACHE_ENABLED:
+        def read_revision():
+            with SessionLocal() as db:
+                return load_schema_revision(db)
+        revision = await run_in_threadpool(read_revision)
+        logger.info(f"Response cache keyed by schema revision {revision}")
+    if settings.SPATIAL_INDEX_ENABLED:
+        try:
+            count = await run_in_threadpool(refresh_building_index, True)
+            logger.info(f"Building index loaded: {count} buildings")
+        except Exception:
+            logger.exception(
+                "Building index load failed, "
+                "falling back to database geo queries"
+            )
+        app.state.building_index_task = asyncio.create_task(
+            run_building_index_refresh()
         )
-        return response
+    try:
+        count = await run_in_threadpool(refresh_activity_counts)
+        logger.info(f"Activity counts loaded: {count} activities")
+    except Exception:
+        logger.exception("Activity counts load failed, loading on demand")
+    app.state.activity_counts_task = asyncio.create_task(
+        run_activity_counts_refresh()
+    )
+    if settings.STARTUP_WARMUP:
+        try:
+            await warm_up()
+        except Exception:
+            logger.exception("Warm-up failed, starting cold")
+
+    yield
+
+    for name in (
+        "building_index_task",
+        "activity_counts_task",
+        "replica_health_task",
+    ):
+        task = getattr(app.state, name, None)
+        if task:
+            task.cancel()
+    if async_engine is not None:
+        await async_engine.dispose()
+    for replica in replica_set.replicas:
+        if replica.async_engine is not None:
+            await replica.async_engine.dispose()
 
 
 app = FastAPI(
@@ -34,10 +120,20 @@ app = FastAPI(
         "organizations, and their activities."
     ),
     version="1.0.0",
+    lifespan=lifespan,
 )
 
-# Add middlewares
-app.add_middleware(LoggingMiddleware)
+# Add middlewares (the last one added runs first)
+if settings.RESPONSE_CACHE_ENABLED:
+    app.add_middleware(ResponseCacheMiddleware)
+# Also counts the statements of each request for the SQL statement
+# budget and the Server-Timing profile
+if (
+    settings.METRICS_ENABLED
+    or settings.SQL_PROFILING_ENABLED
+    or settings.SQL_STATEMENT_LIMIT is not None
+):
+    app.add_middleware(metrics.MetricsMiddleware)
 
 
 # Custom exception handler for unexpected errors
@@ -53,11 +149,8 @@ async def generic_exception_handler(request: Request, exc: Exception):
     )
 
 app.include_router(routers.router)
-
-
-@app.on_event("startup")
-async def startup_event():
-    logger.info("Application startup")
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
 
 
 @app.get("/")
@@ -1,7 +1,8 @@
+from sqlalchemy import distinct, func
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from app.db import models
-from app.repositories.base import BaseRepository
+from app.db.activity_tree import descendant_cache
+from app.repositories.base import AsyncRepository, BaseRepository
 
 
 class ActivityRepository(BaseRepository[models.Activity]):
@@ -10,24 +11,124 @@ class ActivityRepository(BaseRepository[models.Activity]):
 
     def get_descendant_ids(self, activity_id: int) -> list[int]:
         """
-        Performs a recursive CTE query to find all descendant activity IDs
-        for a given parent activity.
-        """
-        cte_query = text("""
-            WITH RECURSIVE activity_tree AS (
-                SELECT id
-                FROM activities
-                WHERE id = :activity_id
-                UNION ALL
-                SELECT a.id
-                FROM activities a
-                JOIN activity_tree at ON a.parent_id = at.id
+        Returns the IDs of an activity and all of its descendants
+        from the materialized closure table.
+        Results are cached in-process until the activity tree changes.
+        """
+        self.check_descendant_cache()
+        cached = descendant_cache.get(activity_id)
+        if cached is not None:
+            return list(cached)
+
+        generation = descendant_cache.generation
+        descendant_ids = tuple(
+            row[0]
+            for row in (
+                self.db.query(models.ActivityClosure.descendant_id)
+                .filter(models.ActivityClosure.ancestor_id == activity_id)
+                .all()
+            )
+        )
+        descendant_cache.set(activity_id, descendant_ids, generation)
+        return list(descendant_ids)
+
+    def warm_descendant_cache(self) -> int:
+        """
+        Caches the descendant ids of every activity with one query.
+        Returns the number of activities cached.
+        """
+        self.check_descendant_cache(force=True)
+        generation = descendant_cache.generation
+        descendants: dict[int, list[int]] = {}
+        for ancestor_id, descendant_id in (
+            self.db.query(
+                models.ActivityClosure.ancestor_id,
+                models.ActivityClosure.descendant_id
+            )
+            .order_by(
+                models.ActivityClosure.ancestor_id,
+                models.ActivityClosure.descendant_id
+            )
+            .all()
+        ):
+            descendants.setdefault(ancestor_id, []).append(descendant_id)
+        for activity_id, descendant_ids in descendants.items():
+            descendant_cache.set(
+                activity_id,
+                tuple(descendant_ids),
+                generation
+            )
+        return len(descendants)
+
+    def check_descendant_cache(self, force: bool = False) -> None:
+        """
+        Clears the descendant cache when another process changed the
+        activity tree since the last check. The version is read before
+        any closure rows, so entries never outdate the version they
+        are stored under.
+        """
+        if force or descendant_cache.needs_version_check():
+            descendant_cache.check_version(
+                self.db.query(models.ActivityTreeVersion.version)
+                .filter(models.ActivityTreeVersion.id == 1)
+                .scalar()
             )
-            SELECT id FROM activity_tree
-        """)
-
-        result = self.db.execute(
-            cte_query,
-            {"activity_id": activity_id}
-        ).fetchall()
-        return [row[0] for row in result]
+
+    def get_tree(self) -> list[tuple[int, str, int | None]]:
+        """
+        (id, name, parent_id) of every activity.
+        """
+        return [
+            tuple(row)
+            for row in self.db.query(
+                self.model.id,
+                self.model.name,
+                self.model.parent_id
+            ).all()
+        ]
+
+    def get_organization_counts(
+        self
+    ) -> tuple[list[tuple[int, int]], list[tuple[int, int]]]:
+        """
+        (activity_id, count) pairs of organizations linked to each
+        activity directly, and to it or any descendant (each
+        organization once), with one aggregate query each.
+        """
+        association = models.organization_activity_association
+        direct = (
+            self.db.query(association.c.activity_id, func.count())
+            .group_by(association.c.activity_id)
+            .all()
+        )
+        total = (
+            self.db.query(
+                models.ActivityClosure.ancestor_id,
+                func.count(distinct(association.c.organization_id))
+            )
+            .join(
+                association,
+                association.c.activity_id
+                == models.ActivityClosure.descendant_id
+            )
+            .group_by(models.ActivityClosure.ancestor_id)
+            .all()
+        )
+        return (
+            [tuple(row) for row in direct],
+            [tuple(row) for row in total]
+        )
+
+
+class AsyncActivityRepository(AsyncRepository[ActivityRepository]):
+    repository_class = ActivityRepository
+
+    async def get_descendant_ids(self, activity_id: int):
+        if not descendant_cache.needs_version_check():
+            cached = descendant_cache.get(activity_id)
+            if cached is not None:
+                return list(cached)
+        return await self.run(
+            ActivityRepository.get_descendant_ids,
+            activity_id
+        )
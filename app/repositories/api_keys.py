@@ -0,0 +1,45 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.db import models
+from app.repositories.base import BaseRepository
+
+
+class ApiKeyRepository(BaseRepository[models.ApiKey]):
+    def __init__(self, db: Session):
+        super().__init__(models.ApiKey, db)
+
+    def get_active_by_hash(self, key_hash: str) -> models.ApiKey | None:
+        return (
+            self.db.query(self.model)
+            .filter(
+                self.model.key_hash == key_hash,
+                self.model.revoked_at.is_(None)
+            )
+            .first()
+        )
+
+    def create(
+        self,
+        name: str,
+        key_prefix: str,
+        key_hash: str,
+        scopes: list[str]
+    ) -> models.ApiKey:
+        api_key = self.model(
+            name=name,
+            key_prefix=key_prefix,
+            key_hash=key_hash,
+            scopes=" ".join(sorted(set(scopes))),
+        )
+        self.db.add(api_key)
+        self.db.commit()
+        self.db.refresh(api_key)
+        return api_key
+
+    def revoke(self, api_key_id: int) -> models.ApiKey | None:
+        api_key = self.get(api_key_id)
+        if api_key is not None and api_key.revoked_at is None:
+            api_key.revoked_at = func.now()
+            self.db.commit()
+            self.db.refresh(api_key)
+        return api_key
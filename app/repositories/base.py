@@ -1,5 +1,10 @@
-from typing import Generic, Type, TypeVar
-from sqlalchemy.orm import Session
+import inspect
+from typing import Any, Callable, Generic, Type, TypeVar
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query, Session
+from app.core.config import settings
+from app.db.instrumentation import profiled
 from app.db.models import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
@@ -10,10 +15,81 @@ class BaseRepository(Generic[ModelType]):
         self.model = model
         self.db = db
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not settings.SQL_PROFILING_ENABLED:
+            return
+        # Attribute SQL to "<Repository>.<method>", inherited methods
+        # included, for the per-request profile and slow query log
+        for name, method in inspect.getmembers(cls, inspect.isfunction):
+            if not name.startswith("_"):
+                setattr(cls, name, profiled(f"{cls.__name__}.{name}")(method))
+
     def get(self, id: int) -> ModelType | None:
         return self.db.query(self.model).filter(self.model.id == id).first()
 
-    def get_all(self, skip: int = 0, limit: int = 100) -> list[ModelType]:
-        return self.db.query(self.model).offset(skip).limit(limit).all()
+    def get_all(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: int = 0
+    ) -> list[ModelType]:
+        return (
+            self.paginate(self.db.query(self.model), after_id, limit)
+            .offset(skip)
+            .all()
+        )
+
+    def paginate(self, query: Query, after_id: int, limit: int | None):
+        """
+        Keyset pagination: rows with an ID greater than `after_id`,
+        in ID order, so any page costs the same as the first one.
+        """
+        query = query.filter(self.model.id > after_id).order_by(self.model.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
 
     # We can add create, update, delete methods here later
+
+
+RepositoryType = TypeVar("RepositoryType", bound=BaseRepository)
+
+
+class AsyncRepository(Generic[RepositoryType]):
+    """
+    Awaitable facade over a repository.
+    With an AsyncSession the repository queries run on the event loop
+    through `AsyncSession.run_sync`; with a sync Session they run in the
+    threadpool. Either way the query code itself lives in one place.
+    Everything a response needs must be eager loaded, since lazy loads
+    are not possible once the call returns.
+    """
+    repository_class: Type[RepositoryType]
+
+    def __init__(self, db: Session | AsyncSession):
+        self.db = db
+
+    async def run(self, method: Callable[..., Any], *args, **kwargs) -> Any:
+        def call(session: Session):
+            return method(self.repository_class(session), *args, **kwargs)
+
+        if isinstance(self.db, AsyncSession):
+            return await self.db.run_sync(call)
+        return await run_in_threadpool(call, self.db)
+
+    async def get(self, id: int):
+        return await self.run(self.repository_class.get, id)
+
+    async def get_all(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: int = 0
+    ):
+        return await self.run(
+            self.repository_class.get_all,
+            skip,
+            limit,
+            after_id
+        )
@@ -1,7 +1,11 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import text
+import heapq
+import math
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func
+from app.core.geo import EARTH_RADIUS_KM, bounding_box, haversine_km
 from app.db import models
-from app.repositories.base import BaseRepository
+from app.repositories.base import AsyncRepository, BaseRepository
+from app.repositories.organizations import organization_details
 
 
 class BuildingRepository(BaseRepository[models.Building]):
@@ -11,14 +15,54 @@ class BuildingRepository(BaseRepository[models.Building]):
     def get_all_with_organizations(
         self,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        after_id: int = 0
     ) -> list[models.Building]:
+        """
+        Returns a page of buildings with their organizations.
+        Organizations are loaded by a separate IN query, so LIMIT counts
+        buildings rather than joined rows.
+        """
+        query = self.db.query(self.model).options(
+            selectinload(self.model.organizations).options(
+                *organization_details()
+            )
+        )
+        return self.paginate(query, after_id, limit).offset(skip).all()
+
+    def get_coordinates(
+        self,
+        after_id: int = 0
+    ) -> list[tuple[int, float, float]]:
+        """
+        Returns (id, latitude, longitude) for buildings with an ID greater
+        than `after_id`, used to build and refresh the in-memory index.
+        """
+        return [
+            tuple(row)
+            for row in (
+                self.db.query(
+                    self.model.id,
+                    self.model.latitude,
+                    self.model.longitude
+                )
+                .filter(self.model.id > after_id)
+                .order_by(self.model.id)
+                .all()
+            )
+        ]
+
+    def count_with_coordinates(self) -> int:
+        """
+        Number of buildings the in-memory index should hold.
+        """
         return (
-            self.db.query(self.model)
-            .options(joinedload(self.model.organizations))
-            .offset(skip)
-            .limit(limit)
-            .all()
+            self.db.query(func.count(self.model.id))
+            .filter(
+                self.model.latitude.isnot(None),
+                self.model.longitude.isnot(None)
+            )
+            .scalar()
         )
 
     def get_ids_within_radius(
@@ -28,26 +72,173 @@ class BuildingRepository(BaseRepository[models.Building]):
         radius: float
     ) -> list[int]:
         """
-        Calculates and finds building IDs within a given radius
-        from a central point.
-        Uses the Haversine formula.
+        Finds building IDs within a given radius from a central point,
+        ordered by distance.
+        """
+        return [
+            building_id
+            for building_id, _ in self.get_within_radius(
+                latitude,
+                longitude,
+                radius
+            )
+        ]
+
+    def get_within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius: float
+    ) -> list[tuple[int, float]]:
+        """
+        Returns (building_id, distance_km) pairs within a given radius
+        from a central point, nearest first.
+        A bounding box on the indexed latitude/longitude columns narrows
+        the candidates before the exact Haversine check. Dialects without
+        trigonometric SQL functions (SQLite) get the exact check in Python.
+        """
+        min_lat, max_lat, min_lon, max_lon = bounding_box(
+            latitude,
+            longitude,
+            radius
+        )
+        in_box = (
+            self.model.latitude.between(min_lat, max_lat),
+            self.model.longitude.between(min_lon, max_lon),
+        )
+
+        if self.db.get_bind().dialect.name != "postgresql":
+            candidates = (
+                self.db.query(
+                    self.model.id,
+                    self.model.latitude,
+                    self.model.longitude
+                )
+                .filter(*in_box)
+                .all()
+            )
+            matches = [
+                (building_id, haversine_km(latitude, longitude, lat, lon))
+                for building_id, lat, lon in candidates
+            ]
+            matches = [match for match in matches if match[1] <= radius]
+            return sorted(matches, key=lambda match: (match[1], match[0]))
+
+        distance = self._distance_expression(latitude, longitude)
+        return [
+            (building_id, building_distance)
+            for building_id, building_distance in (
+                self.db.query(self.model.id, distance)
+                .filter(*in_box)
+                .filter(distance <= radius)
+                .order_by(distance, self.model.id)
+                .all()
+            )
+        ]
+
+    def get_nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        limit: int
+    ) -> list[tuple[int, float]]:
+        """
+        Returns the `limit` buildings closest to a point as
+        (building_id, distance_km) pairs, nearest first.
         """
-        distance_sql = text("""
-            6371 * acos(
-                cos(radians(:lat)) * cos(radians(latitude)) *
-                cos(radians(longitude) - radians(:lon)) +
-                sin(radians(:lat)) * sin(radians(latitude))
+        if self.db.get_bind().dialect.name != "postgresql":
+            return heapq.nsmallest(
+                limit,
+                (
+                    (building_id, haversine_km(latitude, longitude, lat, lon))
+                    for building_id, lat, lon in self.get_coordinates()
+                    if lat is not None and lon is not None
+                ),
+                key=lambda match: (match[1], match[0])
             )
-        """)
 
-        buildings_within_radius = (
-            self.db.query(self.model.id)
-            .from_statement(
-                text(
-                    "SELECT id FROM buildings WHERE (:distance_sql) < :radius"
-                ).bindparams(distance_sql=distance_sql)
+        distance = self._distance_expression(latitude, longitude)
+        return [
+            (building_id, building_distance)
+            for building_id, building_distance in (
+                self.db.query(self.model.id, distance)
+                .filter(self.model.latitude.isnot(None))
+                .filter(self.model.longitude.isnot(None))
+                .order_by(distance, self.model.id)
+                .limit(limit)
+                .all()
             )
-            .params(lat=latitude, lon=longitude, radius=radius)
-            .all(),
+        ]
+
+    def _distance_expression(self, latitude: float, longitude: float):
+        """
+        Haversine distance in kilometers as a SQL expression.
+        """
+        d_lat = func.radians(self.model.latitude - latitude) * 0.5
+        d_lon = func.radians(self.model.longitude - longitude) * 0.5
+        a = (
+            func.power(func.sin(d_lat), 2.0)
+            + math.cos(math.radians(latitude))
+            * func.cos(func.radians(self.model.latitude))
+            * func.power(func.sin(d_lon), 2.0)
+        )
+        return 2 * EARTH_RADIUS_KM * func.asin(func.sqrt(func.least(1.0, a)))
+
+
+class AsyncBuildingRepository(AsyncRepository[BuildingRepository]):
+    repository_class = BuildingRepository
+
+    async def get_all_with_organizations(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: int = 0
+    ):
+        return await self.run(
+            BuildingRepository.get_all_with_organizations,
+            skip,
+            limit,
+            after_id
+        )
+
+    async def get_coordinates(self, after_id: int = 0):
+        return await self.run(BuildingRepository.get_coordinates, after_id)
+
+    async def get_ids_within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius: float
+    ):
+        return await self.run(
+            BuildingRepository.get_ids_within_radius,
+            latitude,
+            longitude,
+            radius
+        )
+
+    async def get_within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius: float
+    ):
+        return await self.run(
+            BuildingRepository.get_within_radius,
+            latitude,
+            longitude,
+            radius
+        )
+
+    async def get_nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        limit: int
+    ):
+        return await self.run(
+            BuildingRepository.get_nearest,
+            latitude,
+            longitude,
+            limit
         )
-        return [row[0] for row in buildings_within_radius]
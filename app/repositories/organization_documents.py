@@ -0,0 +1,209 @@
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from app.db import models
+from app.db.documents import any_of, one_of
+from app.repositories.base import BaseRepository
+from app.repositories.organizations import AsyncOrganizationRepository
+
+
+class OrganizationDocumentRepository(
+    BaseRepository[models.OrganizationDocument]
+):
+    """
+    The read methods of OrganizationRepository served from the
+    denormalized organization_documents table: one row per
+    organization, no joins and no extra loader queries.
+    """
+
+    def __init__(self, db: Session):
+        super().__init__(models.OrganizationDocument, db)
+
+    def _dialect_name(self) -> str:
+        return self.db.get_bind().dialect.name
+
+    def _with_activities(self, column, activity_ids: list[int]):
+        return any_of(column, activity_ids, self._dialect_name())
+
+    def get_by_id_with_details(
+        self,
+        organization_id: int
+    ) -> models.OrganizationDocument | None:
+        return self.get(organization_id)
+
+    def get_by_ids(
+        self,
+        organization_ids: list[int]
+    ) -> list[models.OrganizationDocument]:
+        return (
+            self.db.query(self.model)
+            .filter(self.model.id.in_(organization_ids))
+            .all()
+        )
+
+    def get_by_building_id(
+        self,
+        building_id: int,
+        after_id: int = 0,
+        limit: int | None = None
+    ) -> list[models.OrganizationDocument]:
+        query = self.db.query(self.model).filter(
+            self.model.building_id == building_id
+        )
+        return self.paginate(query, after_id, limit).all()
+
+    def search_by_name(
+        self,
+        name: str,
+        after_id: int = 0,
+        limit: int | None = None
+    ) -> list[models.OrganizationDocument]:
+        query = self.db.query(self.model).filter(
+            self.model.name.ilike(f"%{name}%")
+        )
+        return self.paginate(query, after_id, limit).all()
+
+    def search_by_name_ranked(
+        self,
+        name: str,
+        limit: int
+    ) -> list[models.OrganizationDocument]:
+        """
+        Same ranking as OrganizationRepository.search_by_name_ranked.
+        """
+        query = self.db.query(self.model)
+        if self._dialect_name() != "postgresql":
+            return (
+                query.filter(self.model.name.ilike(f"%{name}%"))
+                .order_by(self.model.id)
+                .limit(limit)
+                .all()
+            )
+
+        return (
+            query.filter(
+                or_(
+                    self.model.name.ilike(f"%{name}%"),
+                    self.model.name.op("%")(name),
+                )
+            )
+            .order_by(func.similarity(self.model.name, name).desc())
+            .order_by(self.model.id)
+            .limit(limit)
+            .all()
+        )
+
+    def get_by_activity_ids(
+        self,
+        activity_ids: list[int]
+    ) -> list[models.OrganizationDocument]:
+        return (
+            self.db.query(self.model)
+            .filter(
+                self._with_activities(self.model.activity_ids, activity_ids)
+            )
+            .all()
+        )
+
+    def get_by_activity_id(
+        self,
+        activity_id: int,
+        after_id: int = 0,
+        limit: int | None = None
+    ) -> list[models.OrganizationDocument]:
+        """
+        Returns organizations linked directly to an activity.
+        """
+        query = self.db.query(self.model).filter(
+            self._with_activities(self.model.activity_ids, [activity_id])
+        )
+        return self.paginate(query, after_id, limit).all()
+
+    def get_by_activity_tree(
+        self,
+        activity_id: int,
+        after_id: int = 0,
+        limit: int | None = None
+    ) -> list[models.OrganizationDocument]:
+        """
+        Returns organizations linked to an activity or any of its
+        descendants: those listing it among their ancestor activities.
+        """
+        query = self.db.query(self.model).filter(
+            self._with_activities(
+                self.model.ancestor_activity_ids,
+                [activity_id]
+            )
+        )
+        return self.paginate(query, after_id, limit).all()
+
+    def get_by_building_ids(
+        self,
+        building_ids: list[int]
+    ) -> list[models.OrganizationDocument]:
+        return (
+            self.db.query(self.model)
+            .filter(one_of(
+                self.model.building_id,
+                building_ids,
+                self._dialect_name()
+            ))
+            .all()
+        )
+
+    def _search_filters(
+        self,
+        building_ids: list[int] | None,
+        activity_ids: list[int] | None,
+        name: str | None
+    ) -> list:
+        criteria = []
+        if building_ids is not None:
+            criteria.append(one_of(
+                self.model.building_id,
+                building_ids,
+                self._dialect_name()
+            ))
+        if activity_ids is not None:
+            criteria.append(
+                self._with_activities(self.model.activity_ids, activity_ids)
+            )
+        if name is not None:
+            criteria.append(self.model.name.ilike(f"%{name}%"))
+        return criteria
+
+    def search(
+        self,
+        building_ids: list[int] | None = None,
+        activity_ids: list[int] | None = None,
+        name: str | None = None,
+        after_id: int = 0,
+        limit: int | None = None
+    ) -> list[models.OrganizationDocument]:
+        """
+        Documents matching every given filter, in ID order.
+        """
+        query = self.db.query(self.model).filter(
+            *self._search_filters(building_ids, activity_ids, name)
+        )
+        return self.paginate(query, after_id, limit).all()
+
+    def search_building_ids(
+        self,
+        building_ids: list[int] | None = None,
+        activity_ids: list[int] | None = None,
+        name: str | None = None
+    ) -> list[tuple[int, int]]:
+        return [
+            tuple(row)
+            for row in (
+                self.db.query(self.model.id, self.model.building_id)
+                .filter(
+                    *self._search_filters(building_ids, activity_ids, name)
+                )
+                .all()
+            )
+        ]
+
+
+class AsyncOrganizationDocumentRepository(AsyncOrganizationRepository):
+    repository_class = OrganizationDocumentRepository
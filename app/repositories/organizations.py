@@ -1,6 +1,24 @@
-from sqlalchemy.orm import Session, joinedload
+from datetime import datetime
+from typing import Iterator
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session, joinedload, selectinload
 from app.db import models
-from app.repositories.base import BaseRepository
+from app.db.documents import one_of
+from app.repositories.base import AsyncRepository, BaseRepository
+
+
+def organization_details():
+    """
+    Loader options for everything schemas.Organization reads.
+    The many-to-one building is joined; each collection is fetched with
+    one extra IN query, so row counts stay linear in organizations
+    instead of multiplying phones by activities.
+    """
+    return (
+        joinedload(models.Organization.building),
+        selectinload(models.Organization.phone_numbers),
+        selectinload(models.Organization.activities),
+    )
 
 
 class OrganizationRepository(BaseRepository[models.Organization]):
@@ -13,38 +31,78 @@ class OrganizationRepository(BaseRepository[models.Organization]):
     ) -> models.Organization | None:
         return (
             self.db.query(self.model)
-            .options(
-                joinedload(self.model.building),
-                joinedload(self.model.phone_numbers),
-                joinedload(self.model.activities),
-            )
+            .options(*organization_details())
             .filter(self.model.id == organization_id)
             .first()
         )
 
-    def get_by_building_id(
+    def get_by_ids(
         self,
-        building_id: int
+        organization_ids: list[int]
     ) -> list[models.Organization]:
         return (
             self.db.query(self.model)
-            .filter(self.model.building_id == building_id)
-            .options(
-                joinedload(self.model.phone_numbers),
-                joinedload(self.model.activities)
-            )
+            .filter(self.model.id.in_(organization_ids))
+            .options(*organization_details())
             .all()
         )
 
-    def search_by_name(self, name: str) -> list[models.Organization]:
-        return (
+    def get_by_building_id(
+        self,
+        building_id: int,
+        after_id: int = 0,
+        limit: int | None = None
+    ) -> list[models.Organization]:
+        query = (
+            self.db.query(self.model)
+            .filter(self.model.building_id == building_id)
+            .options(*organization_details())
+        )
+        return self.paginate(query, after_id, limit).all()
+
+    def search_by_name(
+        self,
+        name: str,
+        after_id: int = 0,
+        limit: int | None = None
+    ) -> list[models.Organization]:
+        query = (
             self.db.query(self.model)
             .filter(self.model.name.ilike(f"%{name}%"))
-            .options(
-                joinedload(self.model.building),
-                joinedload(self.model.phone_numbers),
-                joinedload(self.model.activities),
+            .options(*organization_details())
+        )
+        return self.paginate(query, after_id, limit).all()
+
+    def search_by_name_ranked(
+        self,
+        name: str,
+        limit: int
+    ) -> list[models.Organization]:
+        """
+        Returns the `limit` organizations whose names best match `name`.
+        On PostgreSQL substring and trigram matches are served by the
+        pg_trgm index and ranked by similarity; other databases fall back
+        to the substring match in ID order.
+        """
+        query = self.db.query(self.model).options(*organization_details())
+        if self.db.get_bind().dialect.name != "postgresql":
+            return (
+                query.filter(self.model.name.ilike(f"%{name}%"))
+                .order_by(self.model.id)
+                .limit(limit)
+                .all()
+            )
+
+        return (
+            query.filter(
+                or_(
+                    self.model.name.ilike(f"%{name}%"),
+                    self.model.name.op("%")(name),
+                )
             )
+            .order_by(func.similarity(self.model.name, name).desc())
+            .order_by(self.model.id)
+            .limit(limit)
             .all()
         )
 
@@ -52,34 +110,278 @@ class OrganizationRepository(BaseRepository[models.Organization]):
         self,
         activity_ids: list[int]
     ) -> list[models.Organization]:
+        association = models.organization_activity_association
+        organization_ids = select(association.c.organization_id).where(
+            association.c.activity_id.in_(activity_ids)
+        )
         return (
             self.db.query(self.model)
-            .join(models.organization_activity_association)
-            .filter(
-                models.organization_activity_association.c.activity_id.in_(
-                    activity_ids
-                )
-            )
-            .options(
-                joinedload(self.model.building),
-                joinedload(self.model.phone_numbers),
-                joinedload(self.model.activities),
-            )
-            .distinct()
+            .filter(self.model.id.in_(organization_ids))
+            .options(*organization_details())
             .all()
         )
 
+    def get_by_activity_id(
+        self,
+        activity_id: int,
+        after_id: int = 0,
+        limit: int | None = None
+    ) -> list[models.Organization]:
+        """
+        Returns organizations linked directly to an activity.
+        """
+        association = models.organization_activity_association
+        organization_ids = select(association.c.organization_id).where(
+            association.c.activity_id == activity_id
+        )
+        query = (
+            self.db.query(self.model)
+            .filter(self.model.id.in_(organization_ids))
+            .options(*organization_details())
+        )
+        return self.paginate(query, after_id, limit).all()
+
+    def get_by_activity_tree(
+        self,
+        activity_id: int,
+        after_id: int = 0,
+        limit: int | None = None
+    ) -> list[models.Organization]:
+        """
+        Returns organizations linked to an activity or any of its
+        descendants, resolved through the activity closure table.
+        """
+        association = models.organization_activity_association
+        organization_ids = (
+            select(association.c.organization_id)
+            .join(
+                models.ActivityClosure,
+                models.ActivityClosure.descendant_id
+                == association.c.activity_id,
+            )
+            .where(models.ActivityClosure.ancestor_id == activity_id)
+        )
+        query = (
+            self.db.query(self.model)
+            .filter(self.model.id.in_(organization_ids))
+            .options(*organization_details())
+        )
+        return self.paginate(query, after_id, limit).all()
+
     def get_by_building_ids(
         self,
         building_ids: list[int]
     ) -> list[models.Organization]:
         return (
             self.db.query(self.model)
-            .filter(self.model.building_id.in_(building_ids))
-            .options(
-                joinedload(self.model.building),
-                joinedload(self.model.phone_numbers),
-                joinedload(self.model.activities),
-            )
+            .filter(one_of(
+                self.model.building_id,
+                building_ids,
+                self.db.get_bind().dialect.name
+            ))
+            .options(*organization_details())
             .all()
         )
+
+    def _search_filters(
+        self,
+        building_ids: list[int] | None,
+        activity_ids: list[int] | None,
+        name: str | None
+    ) -> list:
+        """
+        Criteria for the combined search, most selective first: the
+        spatial and activity prefilters arrive already resolved to ID
+        sets, the name match is left to the (trigram) index. Long ID
+        sets are bound as one list parameter (see one_of).
+        """
+        dialect_name = self.db.get_bind().dialect.name
+        criteria = []
+        if building_ids is not None:
+            criteria.append(
+                one_of(self.model.building_id, building_ids, dialect_name)
+            )
+        if activity_ids is not None:
+            association = models.organization_activity_association
+            criteria.append(self.model.id.in_(
+                select(association.c.organization_id).where(
+                    one_of(
+                        association.c.activity_id,
+                        activity_ids,
+                        dialect_name
+                    )
+                )
+            ))
+        if name is not None:
+            criteria.append(self.model.name.ilike(f"%{name}%"))
+        return criteria
+
+    def search(
+        self,
+        building_ids: list[int] | None = None,
+        activity_ids: list[int] | None = None,
+        name: str | None = None,
+        after_id: int = 0,
+        limit: int | None = None
+    ) -> list[models.Organization]:
+        """
+        Organizations matching every given filter, in ID order.
+        """
+        query = (
+            self.db.query(self.model)
+            .filter(*self._search_filters(building_ids, activity_ids, name))
+            .options(*organization_details())
+        )
+        return self.paginate(query, after_id, limit).all()
+
+    def search_building_ids(
+        self,
+        building_ids: list[int] | None = None,
+        activity_ids: list[int] | None = None,
+        name: str | None = None
+    ) -> list[tuple[int, int]]:
+        """
+        (organization_id, building_id) pairs matching every given
+        filter, without details, for ordering in the caller.
+        """
+        return [
+            tuple(row)
+            for row in (
+                self.db.query(self.model.id, self.model.building_id)
+                .filter(
+                    *self._search_filters(building_ids, activity_ids, name)
+                )
+                .all()
+            )
+        ]
+
+    def iter_for_export(
+        self,
+        since: datetime | None = None,
+        batch_size: int = 1000
+    ) -> Iterator[models.Organization]:
+        """
+        Organizations with their details in ID order, fetched from a
+        server-side cursor `batch_size` rows at a time.
+        """
+        query = self.db.query(self.model).options(*organization_details())
+        if since is not None:
+            query = query.filter(self.model.updated_at >= since)
+        return iter(query.order_by(self.model.id).yield_per(batch_size))
+
+
+class AsyncOrganizationRepository(AsyncRepository[OrganizationRepository]):
+    repository_class = OrganizationRepository
+
+    async def get_by_id_with_details(self, organization_id: int):
+        return await self.run(
+            self.repository_class.get_by_id_with_details,
+            organization_id
+        )
+
+    async def get_by_ids(self, organization_ids: list[int]):
+        return await self.run(
+            self.repository_class.get_by_ids,
+            organization_ids
+        )
+
+    async def get_by_building_id(
+        self,
+        building_id: int,
+        after_id: int = 0,
+        limit: int | None = None
+    ):
+        return await self.run(
+            self.repository_class.get_by_building_id,
+            building_id,
+            after_id,
+            limit
+        )
+
+    async def search_by_name(
+        self,
+        name: str,
+        after_id: int = 0,
+        limit: int | None = None
+    ):
+        return await self.run(
+            self.repository_class.search_by_name,
+            name,
+            after_id,
+            limit
+        )
+
+    async def search_by_name_ranked(self, name: str, limit: int):
+        return await self.run(
+            self.repository_class.search_by_name_ranked,
+            name,
+            limit
+        )
+
+    async def get_by_activity_ids(self, activity_ids: list[int]):
+        return await self.run(
+            self.repository_class.get_by_activity_ids,
+            activity_ids
+        )
+
+    async def get_by_activity_id(
+        self,
+        activity_id: int,
+        after_id: int = 0,
+        limit: int | None = None
+    ):
+        return await self.run(
+            self.repository_class.get_by_activity_id,
+            activity_id,
+            after_id,
+            limit
+        )
+
+    async def get_by_activity_tree(
+        self,
+        activity_id: int,
+        after_id: int = 0,
+        limit: int | None = None
+    ):
+        return await self.run(
+            self.repository_class.get_by_activity_tree,
+            activity_id,
+            after_id,
+            limit
+        )
+
+    async def search(
+        self,
+        building_ids: list[int] | None = None,
+        activity_ids: list[int] | None = None,
+        name: str | None = None,
+        after_id: int = 0,
+        limit: int | None = None
+    ):
+        return await self.run(
+            self.repository_class.search,
+            building_ids,
+            activity_ids,
+            name,
+            after_id,
+            limit
+        )
+
+    async def search_building_ids(
+        self,
+        building_ids: list[int] | None = None,
+        activity_ids: list[int] | None = None,
+        name: str | None = None
+    ):
+        return await self.run(
+            self.repository_class.search_building_ids,
+            building_ids,
+            activity_ids,
+            name
+        )
+
+    async def get_by_building_ids(self, building_ids: list[int]):
+        return await self.run(
+            self.repository_class.get_by_building_ids,
+            building_ids
+        )
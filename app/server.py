@@ -0,0 +1,100 @@
+"""
+Production server: gunicorn managing uvicorn workers (uvloop, httptools).
+
+    python -m app.server
+
+The application is imported once in the master and forked into
+SERVER_WORKERS workers. Each worker runs the lifespan startup (building
+index, connection pool and cache warm-up) before it accepts requests.
+With more than one worker, set RATE_LIMIT_BACKEND and
+RESPONSE_CACHE_BACKEND to redis (docker-compose.yml does).
+"""
+import logging
+import os
+
+from gunicorn.app.base import BaseApplication
+from uvicorn_worker import UvicornWorker
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProductionWorker(UvicornWorker):
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+
+def warn_about_memory_backends(workers: int) -> None:
+    """
+    Logs a warning when several workers would each keep their own
+    rate limit buckets or response cache.
+    """
+    if workers < 2:
+        return
+    problems = [
+        problem
+        for enabled, backend, problem in [
+            (settings.RATE_LIMIT_ENABLED,
+             settings.RATE_LIMIT_BACKEND,
+             f"RATE_LIMIT_BACKEND=memory multiplies rate limits by "
+             f"{workers}"),
+            (settings.RESPONSE_CACHE_ENABLED,
+             settings.RESPONSE_CACHE_BACKEND,
+             "RESPONSE_CACHE_BACKEND=memory lets workers serve responses "
+             "cached before writes made through other workers"),
+        ]
+        if enabled and backend == "memory"
+    ]
+    if problems:
+        logger.warning(
+            f"{workers} workers with per-worker state: "
+            f"{'; '.join(problems)}. Use redis or SERVER_WORKERS=1."
+        )
+
+
+def post_fork(server, worker) -> None:
+    # Connections must never be shared between processes
+    from app.db.session import dispose_pools
+
+    dispose_pools()
+
+
+class Server(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for name, value in self.options.items():
+            self.cfg.set(name, value)
+
+    def load(self):
+        from app.main import app
+
+        warn_about_memory_backends(self.cfg.workers)
+        return app
+
+
+def server_options() -> dict:
+    return {
+        "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+        "workers": settings.SERVER_WORKERS or os.cpu_count() or 1,
+        "worker_class": ProductionWorker,
+        "keepalive": settings.SERVER_KEEPALIVE_SECONDS,
+        "timeout": settings.SERVER_TIMEOUT_SECONDS,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+        "preload_app": True,
+        "post_fork": post_fork,
+        # Requests are logged (sampled) by MetricsMiddleware
+        "errorlog": "-",
+    }
+
+
+def main() -> None:
+    Server(server_options()).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from itertools import chain
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.activity_counts import ActivityCounts, ActivityNode
+from app.core.config import settings
+from app.db import models
+from app.db.session import SessionLocal
+from app.repositories.activities import ActivityRepository
+
+logger = logging.getLogger(__name__)
+
+activity_counts = ActivityCounts()
+
+# Session.info keys picked up by the commit hooks below: (old, new)
+# activity id sets of organizations whose links changed, and whether
+# the tree itself (names, parents, activities) changed
+LINK_CHANGES = "activity_link_changes"
+TREE_CHANGED = "activity_counts_stale"
+
+
+def refresh_activity_counts() -> int:
+    """
+    Reloads the activity tree and its organization counts.
+    Returns the number of activities loaded.
+    """
+    generation = activity_counts.generation
+    db = SessionLocal()
+    try:
+        repo = ActivityRepository(db)
+        activities = repo.get_tree()
+        direct, total = repo.get_organization_counts()
+    finally:
+        db.close()
+    activity_counts.load(activities, direct, total, generation)
+    return len(activities)
+
+
+async def run_activity_counts_refresh() -> None:
+    """
+    Periodically reloads the counts, picking up changes committed by
+    other processes, until cancelled.
+    """
+    while True:
+        await asyncio.sleep(settings.ACTIVITY_COUNTS_REFRESH_SECONDS)
+        try:
+            await run_in_threadpool(refresh_activity_counts)
+        except Exception:
+            logger.exception("Activity counts refresh failed")
+
+
+async def get_activity_tree() -> list[ActivityNode]:
+    if not activity_counts.ready:
+        await run_in_threadpool(refresh_activity_counts)
+    return activity_counts.tree()
+
+
+def link_changes(
+    old_links: dict[int, set[int]],
+    new_links: dict[int, set[int]]
+) -> list[tuple[set[int], set[int]]]:
+    """
+    (old, new) activity id sets of the organizations whose links
+    differ between two organization id -> activity ids snapshots.
+    """
+    return [
+        (old_links.get(organization_id, set()),
+         new_links.get(organization_id, set()))
+        for organization_id in old_links.keys() | new_links.keys()
+        if old_links.get(organization_id) != new_links.get(organization_id)
+    ]
+
+
+def _activity_ids(activities) -> set[int]:
+    return {activity.id for activity in activities}
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_link_changes(session, flush_context, instances):
+    if session.info.get(TREE_CHANGED):
+        return
+    changes = session.info.setdefault(LINK_CHANGES, [])
+    for instance in chain(session.new, session.dirty, session.deleted):
+        if isinstance(instance, models.Activity):
+            state = inspect(instance)
+            if (
+                instance in session.new
+                or instance in session.deleted
+                or state.attrs.name.history.has_changes()
+                or state.attrs.parent_id.history.has_changes()
+            ):
+                session.info[TREE_CHANGED] = True
+                return
+        elif isinstance(instance, models.Organization):
+            if instance in session.deleted:
+                changes.append((_activity_ids(instance.activities), set()))
+                continue
+            history = inspect(instance).attrs.activities.load_history()
+            if not history.has_changes():
+                continue
+            old = _activity_ids(chain(history.unchanged, history.deleted))
+            new = _activity_ids(chain(history.unchanged, history.added))
+            if None in new:
+                # Linked to an activity that is not flushed yet
+                session.info[TREE_CHANGED] = True
+                return
+            changes.append((old, new))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session):
+    changes = session.info.pop(LINK_CHANGES, None)
+    if session.info.pop(TREE_CHANGED, False):
+        activity_counts.invalidate()
+    elif changes:
+        activity_counts.apply(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(LINK_CHANGES, None)
+    session.info.pop(TREE_CHANGED, None)
@@ -0,0 +1,156 @@
+import hashlib
+import hmac
+import secrets
+from dataclasses import dataclass
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.repositories.api_keys import ApiKeyRepository
+
+SCOPES = ("write", "admin")
+
+api_key_requests_total = metrics.registry.register(metrics.Counter(
+    "api_key_requests_total",
+    "Authenticated requests by API key name.",
+    ("key",),
+))
+
+
+@dataclass(frozen=True)
+class ApiKeyInfo:
+    id: int | None
+    name: str
+    scopes: frozenset[str]
+
+
+# settings.API_KEY keeps working as a key with every scope
+SETTINGS_KEY = ApiKeyInfo(id=None, name="settings", scopes=frozenset(SCOPES))
+
+_MISSING = object()
+
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def generate_api_key() -> str:
+    return secrets.token_urlsafe(32)
+
+
+class ApiKeyStore:
+    """
+    Verifies API keys against the api_keys table.
+    Lookups are cached in-process by key hash, valid and unknown keys in
+    separate bounded caches so that a flood of bad keys cannot evict
+    the good ones. Revocations take effect within the cache TTL (at
+    once in the process that revokes).
+    """
+
+    def __init__(self, max_entries: int, ttl: float, negative_ttl: float):
+        self._valid: TTLCache[str, ApiKeyInfo] = TTLCache(max_entries, ttl)
+        self._invalid: TTLCache[str, bool] = TTLCache(
+            max_entries,
+            negative_ttl
+        )
+
+    def _check_settings_key(self, api_key: str) -> bool:
+        return bool(settings.API_KEY) and hmac.compare_digest(
+            api_key.encode(),
+            settings.API_KEY.encode()
+        )
+
+    def _cached(self, key_hash: str):
+        if self._invalid.get(key_hash):
+            return None
+        return self._valid.get(key_hash, _MISSING)
+
+    def _load(self, key_hash: str) -> ApiKeyInfo | None:
+        with SessionLocal() as db:
+            row = ApiKeyRepository(db).get_active_by_hash(key_hash)
+            # The lookup is by hash already; compare again in constant
+            # time so that the result never depends on a plain ==
+            if row is None or not hmac.compare_digest(row.key_hash, key_hash):
+                self._invalid.set(key_hash, True)
+                return None
+            info = ApiKeyInfo(
+                id=row.id,
+                name=row.name,
+                scopes=frozenset(row.scopes.split()),
+            )
+        self._valid.set(key_hash, info)
+        return info
+
+    def verify(self, api_key: str | None) -> ApiKeyInfo | None:
+        if not api_key:
+            return None
+        if self._check_settings_key(api_key):
+            return SETTINGS_KEY
+        key_hash = hash_api_key(api_key)
+        cached = self._cached(key_hash)
+        if cached is not _MISSING:
+            return cached
+        return self._load(key_hash)
+
+    async def averify(self, api_key: str | None) -> ApiKeyInfo | None:
+        """
+        Like verify, but a cache miss queries the database in the
+        threadpool instead of blocking the event loop.
+        """
+        if not api_key:
+            return None
+        if self._check_settings_key(api_key):
+            return SETTINGS_KEY
+        key_hash = hash_api_key(api_key)
+        cached = self._cached(key_hash)
+        if cached is not _MISSING:
+            return cached
+        return await run_in_threadpool(self._load, key_hash)
+
+    def record_use(self, api_key: ApiKeyInfo) -> None:
+        api_key_requests_total.inc(api_key.name)
+
+    def invalidate(self) -> None:
+        self._valid.clear()
+        self._invalid.clear()
+
+
+api_key_store = ApiKeyStore(
+    settings.API_KEY_CACHE_MAX_ENTRIES,
+    settings.API_KEY_CACHE_TTL_SECONDS,
+    settings.API_KEY_NEGATIVE_CACHE_TTL_SECONDS
+)
+
+
+def create_api_key(name: str, scopes: list[str]) -> tuple[str, int]:
+    """
+    Creates a key and returns it with its id. The key itself is not
+    stored and cannot be shown again.
+    """
+    unknown = set(scopes) - set(SCOPES)
+    if unknown:
+        raise ValueError(f"Unknown scopes: {', '.join(sorted(unknown))}")
+    api_key = generate_api_key()
+    with SessionLocal() as db:
+        row = ApiKeyRepository(db).create(
+            name,
+            api_key[:8],
+            hash_api_key(api_key),
+            scopes
+        )
+        return api_key, row.id
+
+
+def revoke_api_key(api_key_id: int) -> bool:
+    with SessionLocal() as db:
+        row = ApiKeyRepository(db).revoke(api_key_id)
+    api_key_store.invalidate()
+    return row is not None
+
+
+def list_api_keys() -> list:
+    with SessionLocal() as db:
+        return ApiKeyRepository(db).get_all(limit=None)
@@ -1,20 +1,29 @@
 from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.repositories.buildings import BuildingRepository
+from app.db.session import get_session
+from app.repositories.buildings import AsyncBuildingRepository
 
 
 class BuildingService:
-    def __init__(self, building_repo: BuildingRepository):
+    def __init__(self, building_repo: AsyncBuildingRepository):
         self.building_repo = building_repo
 
-    def get_all_buildings(self, skip: int = 0, limit: int = 100):
-        return self.building_repo.get_all_with_organizations(
+    async def get_all_buildings(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after_id: int = 0
+    ):
+        return await self.building_repo.get_all_with_organizations(
             skip=skip,
-            limit=limit
+            limit=limit,
+            after_id=after_id
         )
 
 
-def get_building_service(db: Session = Depends(get_db)) -> BuildingService:
-    repo = BuildingRepository(db)
+def get_building_service(
+    db: Session | AsyncSession = Depends(get_session)
+) -> BuildingService:
+    repo = AsyncBuildingRepository(db)
     return BuildingService(repo)
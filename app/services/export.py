@@ -0,0 +1,159 @@
+import csv
+import io
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, Literal
+
+import orjson
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.db import models
+from app.db.instrumentation import STATEMENT_LIMIT_EXEMPT
+from app.db.session import SessionLocal, engine
+from app.repositories.organizations import OrganizationRepository
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+CSV_COLUMNS = [
+    "id",
+    "name",
+    "updated_at",
+    "building_id",
+    "address",
+    "latitude",
+    "longitude",
+    "phone_numbers",
+    "activity_ids",
+    "activities",
+]
+
+
+def export_record(organization: models.Organization) -> dict:
+    building = organization.building
+    return {
+        "id": organization.id,
+        "name": organization.name,
+        "updated_at": organization.updated_at,
+        "building": building and {
+            "id": building.id,
+            "address": building.address,
+            "latitude": building.latitude,
+            "longitude": building.longitude,
+        },
+        "phone_numbers": [
+            phone.number for phone in organization.phone_numbers
+        ],
+        "activities": [
+            {"id": activity.id, "name": activity.name}
+            for activity in organization.activities
+        ],
+    }
+
+
+def csv_row(organization: models.Organization) -> list:
+    """
+    Flat row for CSV_COLUMNS; lists are joined with "|".
+    """
+    building = organization.building
+    return [
+        organization.id,
+        organization.name,
+        organization.updated_at and organization.updated_at.isoformat(),
+        organization.building_id,
+        building and building.address,
+        building and building.latitude,
+        building and building.longitude,
+        "|".join(phone.number for phone in organization.phone_numbers),
+        "|".join(str(activity.id) for activity in organization.activities),
+        "|".join(activity.name for activity in organization.activities),
+    ]
+
+
+def _encode(
+    organizations: Iterable[models.Organization],
+    export_format: ExportFormat,
+    batch_size: int
+) -> Iterator[bytes]:
+    """
+    Encoded output in chunks of up to `batch_size` organizations.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == "csv":
+        writer.writerow(CSV_COLUMNS)
+    lines: list[bytes] = []
+    for organization in organizations:
+        if export_format == "ndjson":
+            lines.append(orjson.dumps(export_record(organization)))
+        else:
+            writer.writerow(csv_row(organization))
+        if len(lines) >= batch_size or buffer.tell() >= 1 << 16:
+            yield _flush(lines, buffer)
+    yield _flush(lines, buffer)
+
+
+def _flush(lines: list[bytes], buffer: io.StringIO) -> bytes:
+    if lines:
+        chunk = b"\n".join(lines) + b"\n"
+        lines.clear()
+        return chunk
+    chunk = buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+    return chunk
+
+
+def export_watermark() -> datetime:
+    """
+    Value for the next incremental export's `since`: the database
+    time at the start of this export, minus
+    EXPORT_WATERMARK_OVERLAP_SECONDS. updated_at is the database time
+    at the start of the writing transaction, so a write still running
+    when the export reads commits rows stamped earlier than the export;
+    the overlap re-delivers them next time instead of missing them.
+    """
+    with engine.connect() as connection:
+        now = connection.execute(select(func.now())).scalar()
+    if now.tzinfo is None:
+        # SQLite CURRENT_TIMESTAMP is UTC without an offset
+        now = now.replace(tzinfo=timezone.utc)
+    return now - timedelta(
+        seconds=settings.EXPORT_WATERMARK_OVERLAP_SECONDS
+    )
+
+
+def export_organizations(
+    export_format: ExportFormat = "ndjson",
+    since: datetime | None = None,
+    compress: bool = False
+) -> Iterator[bytes]:
+    """
+    Streams the organization directory with constant memory.
+    Runs on its own session (not the request's) and a server-side
+    cursor, so it can be handed to a StreamingResponse as is.
+    """
+    batch_size = settings.EXPORT_BATCH_SIZE
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    db = SessionLocal(
+        bind=engine.execution_options(**{STATEMENT_LIMIT_EXEMPT: True})
+    )
+    try:
+        organizations = OrganizationRepository(db).iter_for_export(
+            since,
+            batch_size
+        )
+        for chunk in _encode(organizations, export_format, batch_size):
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+        if compressor is not None:
+            yield compressor.flush()
+    finally:
+        db.close()
@@ -0,0 +1,615 @@
+import csv
+import gzip
+import io
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import IO, Iterable, Iterator, Literal
+
+from sqlalchemy import (
+    Column,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    text,
+)
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.db.activity_tree import rebuild_activity_closure
+from app.db.documents import refresh_organization_documents
+from app.db.instrumentation import STATEMENT_LIMIT_EXEMPT
+from app.db.session import SessionLocal, engine
+from app.services.activity_counts import (
+    LINK_CHANGES,
+    TREE_CHANGED,
+    activity_counts,
+    link_changes,
+)
+from app.services.spatial import refresh_building_index
+
+logger = logging.getLogger(__name__)
+
+IngestFormat = Literal["ndjson", "csv"]
+
+# Errors kept in the report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+class IngestError(ValueError):
+    pass
+
+
+# Staging tables, created per run as temporary tables. Every row keeps
+# the input line number (seq) so that the last occurrence of an id wins.
+# The (id, seq) indexes serve the max(seq) per id lookups of the merge,
+# which are otherwise quadratic on SQLite.
+staging = MetaData()
+
+staging_activities = Table(
+    "ingest_activities",
+    staging,
+    Column("seq", Integer),
+    Column("id", Integer),
+    Column("name", String),
+    Column("parent_id", Integer),
+    Index("ix_ingest_activities_id_seq", "id", "seq"),
+    prefixes=["TEMPORARY"],
+)
+staging_buildings = Table(
+    "ingest_buildings",
+    staging,
+    Column("seq", Integer),
+    Column("id", Integer),
+    Column("address", String),
+    Column("latitude", Float),
+    Column("longitude", Float),
+    Index("ix_ingest_buildings_id_seq", "id", "seq"),
+    prefixes=["TEMPORARY"],
+)
+staging_organizations = Table(
+    "ingest_organizations",
+    staging,
+    Column("seq", Integer),
+    Column("id", Integer),
+    Column("name", String),
+    Column("building_id", Integer),
+    Index("ix_ingest_organizations_id_seq", "id", "seq"),
+    prefixes=["TEMPORARY"],
+)
+staging_phones = Table(
+    "ingest_phones",
+    staging,
+    Column("seq", Integer),
+    Column("organization_id", Integer),
+    Column("number", String),
+    Index("ix_ingest_phones_organization_id_seq", "organization_id", "seq"),
+    prefixes=["TEMPORARY"],
+)
+staging_links = Table(
+    "ingest_organization_activities",
+    staging,
+    Column("seq", Integer),
+    Column("organization_id", Integer),
+    Column("activity_id", Integer),
+    Index(
+        "ix_ingest_organization_activities_organization_id_seq",
+        "organization_id",
+        "seq"
+    ),
+    prefixes=["TEMPORARY"],
+)
+
+
+def _latest(table: str) -> str:
+    """
+    Join clause keeping only the last staged row per id.
+    """
+    return f"""
+        JOIN (
+            SELECT id, max(seq) AS seq FROM {table} GROUP BY id
+        ) latest ON latest.id = s.id AND latest.seq = s.seq
+    """
+
+
+PRUNE_ACTIVITIES_SQL = text("""
+    DELETE FROM ingest_activities
+    WHERE parent_id IS NOT NULL
+    AND parent_id NOT IN (SELECT id FROM activities)
+    AND parent_id NOT IN (SELECT id FROM ingest_activities)
+""")
+
+PRUNE_ORGANIZATIONS_SQL = text("""
+    DELETE FROM ingest_organizations
+    WHERE building_id IS NOT NULL
+    AND building_id NOT IN (SELECT id FROM buildings)
+""")
+
+PRUNE_LINKS_SQL = text("""
+    DELETE FROM ingest_organization_activities
+    WHERE activity_id NOT IN (SELECT id FROM activities)
+""")
+
+# INSERT ... SELECT ... WHERE ... ON CONFLICT works on PostgreSQL and
+# SQLite alike; the WHERE keeps SQLite from reading ON as a join clause.
+MERGE_ACTIVITIES_SQL = text(f"""
+    INSERT INTO activities (id, name, parent_id)
+    SELECT s.id, s.name, s.parent_id
+    FROM ingest_activities s {_latest("ingest_activities")}
+    WHERE true
+    ON CONFLICT (id) DO UPDATE
+    SET name = excluded.name, parent_id = excluded.parent_id
+""")
+
+MERGE_BUILDINGS_SQL = text(f"""
+    INSERT INTO buildings (id, address, latitude, longitude)
+    SELECT s.id, s.address, s.latitude, s.longitude
+    FROM ingest_buildings s {_latest("ingest_buildings")}
+    WHERE true
+    ON CONFLICT (id) DO UPDATE
+    SET address = excluded.address,
+        latitude = excluded.latitude,
+        longitude = excluded.longitude
+""")
+
+MERGE_ORGANIZATIONS_SQL = text(f"""
+    INSERT INTO organizations (id, name, building_id, updated_at)
+    SELECT s.id, s.name, s.building_id, CURRENT_TIMESTAMP
+    FROM ingest_organizations s {_latest("ingest_organizations")}
+    WHERE true
+    ON CONFLICT (id) DO UPDATE
+    SET name = excluded.name,
+        building_id = excluded.building_id,
+        updated_at = excluded.updated_at
+""")
+
+# Phones and activity links of an ingested organization are replaced
+# by the ones in its last record, which keeps re-runs idempotent.
+DELETE_PHONES_SQL = text("""
+    DELETE FROM phone_numbers
+    WHERE organization_id IN (SELECT id FROM ingest_organizations)
+""")
+
+INSERT_PHONES_SQL = text("""
+    INSERT INTO phone_numbers (number, organization_id)
+    SELECT DISTINCT p.number, p.organization_id
+    FROM ingest_phones p
+    JOIN (
+        SELECT id, max(seq) AS seq FROM ingest_organizations GROUP BY id
+    ) latest ON latest.id = p.organization_id AND latest.seq = p.seq
+""")
+
+DELETE_LINKS_SQL = text("""
+    DELETE FROM organization_activity_association
+    WHERE organization_id IN (SELECT id FROM ingest_organizations)
+""")
+
+INSERT_LINKS_SQL = text("""
+    INSERT INTO organization_activity_association
+        (organization_id, activity_id)
+    SELECT DISTINCT l.organization_id, l.activity_id
+    FROM ingest_organization_activities l
+    JOIN (
+        SELECT id, max(seq) AS seq FROM ingest_organizations GROUP BY id
+    ) latest ON latest.id = l.organization_id AND latest.seq = l.seq
+""")
+
+# Exports embed building addresses and activity names, so organizations
+# in ingested buildings or linked to ingested activities changed too
+TOUCH_ORGANIZATIONS_SQL = text("""
+    UPDATE organizations SET updated_at = CURRENT_TIMESTAMP
+    WHERE building_id IN (SELECT id FROM ingest_buildings)
+    OR id IN (
+        SELECT organization_id FROM organization_activity_association
+        WHERE activity_id IN (SELECT id FROM ingest_activities)
+    )
+""")
+
+# Organizations whose documents the staged rows change: the ingested
+# ones, those in ingested buildings and those under ingested activities
+AFFECTED_ORGANIZATIONS_SQL = text("""
+    SELECT id FROM ingest_organizations
+    UNION
+    SELECT id FROM organizations
+    WHERE building_id IN (SELECT id FROM ingest_buildings)
+    UNION
+    SELECT l.organization_id
+    FROM organization_activity_association l
+    JOIN activity_closure c ON c.descendant_id = l.activity_id
+    WHERE c.ancestor_id IN (SELECT id FROM ingest_activities)
+""")
+
+STAGED_LINKS_SQL = text("""
+    SELECT organization_id, activity_id
+    FROM organization_activity_association
+    WHERE organization_id IN (SELECT id FROM ingest_organizations)
+""")
+
+# Explicit ids leave PostgreSQL serial sequences behind the data
+SYNC_SEQUENCE_SQL = """
+    SELECT setval(
+        pg_get_serial_sequence('{table}', 'id'),
+        coalesce(max(id), 0) + 1,
+        false
+    )
+    FROM {table}
+"""
+
+
+@dataclass
+class IngestReport:
+    lines: int = 0
+    # Rows written to the directory tables
+    activities: int = 0
+    buildings: int = 0
+    organizations: int = 0
+    phone_numbers: int = 0
+    activity_links: int = 0
+    # Input lines that could not be parsed
+    rejected: int = 0
+    # Staged rows dropped because a referenced building, parent
+    # activity or linked activity does not exist
+    unresolved: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    def add_error(self, message: str) -> None:
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+
+def _int(value, name: str) -> int:
+    if isinstance(value, bool) or value in (None, ""):
+        raise IngestError(f"{name} is required")
+    return int(value)
+
+
+def _optional_int(value) -> int | None:
+    return None if value in (None, "") else int(value)
+
+
+def _text(value, name: str) -> str:
+    if not isinstance(value, str) or not value.strip():
+        raise IngestError(f"{name} must be a non-empty string")
+    return value
+
+
+def _building_row(seq: int, building: dict) -> tuple[Table, dict]:
+    return staging_buildings, {
+        "seq": seq,
+        "id": _int(building.get("id"), "building id"),
+        "address": _text(building.get("address"), "address"),
+        "latitude": float(building["latitude"]),
+        "longitude": float(building["longitude"]),
+    }
+
+
+def record_rows(seq: int, record: dict) -> list[tuple[Table, dict]]:
+    """
+    Staging rows for one input record. Record types:
+    - {"type": "activity", "id", "name", "parent_id"}
+    - {"type": "building", "id", "address", "latitude", "longitude"}
+    - organizations (the default), in the export format: "id", "name",
+      "building" (object, upserted) or "building_id", "phone_numbers"
+      (strings) and "activities" (ids or objects with an "id").
+    """
+    if not isinstance(record, dict):
+        raise IngestError("record must be a JSON object")
+    record_type = record.get("type", "organization")
+    if record_type == "activity":
+        return [(staging_activities, {
+            "seq": seq,
+            "id": _int(record.get("id"), "id"),
+            "name": _text(record.get("name"), "name"),
+            "parent_id": _optional_int(record.get("parent_id")),
+        })]
+    if record_type == "building":
+        return [_building_row(seq, record)]
+    if record_type != "organization":
+        raise IngestError(f"unknown record type {record_type!r}")
+
+    rows = []
+    organization_id = _int(record.get("id"), "id")
+    building_id = _optional_int(record.get("building_id"))
+    building = record.get("building")
+    if isinstance(building, dict):
+        rows.append(_building_row(seq, building))
+        building_id = rows[-1][1]["id"]
+    rows.append((staging_organizations, {
+        "seq": seq,
+        "id": organization_id,
+        "name": _text(record.get("name"), "name"),
+        "building_id": building_id,
+    }))
+    for phone in record.get("phone_numbers") or []:
+        if isinstance(phone, dict):
+            phone = phone.get("number")
+        rows.append((staging_phones, {
+            "seq": seq,
+            "organization_id": organization_id,
+            "number": _text(phone, "phone number"),
+        }))
+    for activity in record.get("activities") or []:
+        if isinstance(activity, dict):
+            activity = activity.get("id")
+        rows.append((staging_links, {
+            "seq": seq,
+            "organization_id": organization_id,
+            "activity_id": _int(activity, "activity id"),
+        }))
+    return rows
+
+
+def _split(value: str | None) -> list[str]:
+    return [item for item in (value or "").split("|") if item]
+
+
+def csv_record(row: dict) -> dict:
+    """
+    Organization record from a row in the export CSV layout.
+    Address and coordinates, when present, upsert the building.
+    """
+    record = {
+        "id": row.get("id"),
+        "name": row.get("name"),
+        "building_id": row.get("building_id"),
+        "phone_numbers": _split(row.get("phone_numbers")),
+        "activities": _split(row.get("activity_ids")),
+    }
+    if row.get("address"):
+        record["building"] = {
+            "id": row.get("building_id"),
+            "address": row["address"],
+            "latitude": row.get("latitude"),
+            "longitude": row.get("longitude"),
+        }
+    return record
+
+
+def parse(
+    lines: Iterable[str],
+    ingest_format: IngestFormat,
+    report: IngestReport
+) -> Iterator[tuple[Table, dict]]:
+    """
+    Staging rows from NDJSON or CSV input. Invalid records are counted
+    in the report and skipped as a whole.
+    """
+    if ingest_format == "csv":
+        records = _csv_records(lines)
+    else:
+        records = _ndjson_records(lines, report)
+    for seq, record in records:
+        report.lines += 1
+        try:
+            rows = record_rows(seq, record)
+        except (IngestError, KeyError, TypeError, ValueError) as exc:
+            report.rejected += 1
+            report.add_error(f"line {seq}: {exc}")
+            continue
+        yield from rows
+
+
+def _csv_records(lines: Iterable[str]) -> Iterator[tuple[int, dict]]:
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, csv_record(row)
+
+
+def _ndjson_records(
+    lines: Iterable[str],
+    report: IngestReport
+) -> Iterator[tuple[int, dict]]:
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as exc:
+            report.lines += 1
+            report.rejected += 1
+            report.add_error(f"line {number}: invalid JSON ({exc})")
+
+
+class StagingWriter:
+    """
+    Buffers staging rows and writes them in batches: COPY on psycopg2,
+    executemany elsewhere.
+    """
+
+    def __init__(self, connection: Connection, batch_size: int):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.use_copy = connection.dialect.driver == "psycopg2"
+        self._buffers: dict[Table, list[dict]] = {
+            table: [] for table in staging.sorted_tables
+        }
+
+    def add(self, table: Table, row: dict) -> None:
+        buffer = self._buffers[table]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self._write(table, buffer)
+
+    def flush(self) -> None:
+        for table, buffer in self._buffers.items():
+            if buffer:
+                self._write(table, buffer)
+
+    def _write(self, table: Table, rows: list[dict]) -> None:
+        if self.use_copy:
+            self._copy(table, rows)
+        else:
+            self.connection.execute(table.insert(), rows)
+        rows.clear()
+
+    def _copy(self, table: Table, rows: list[dict]) -> None:
+        columns = [column.name for column in table.columns]
+        data = io.StringIO()
+        writer = csv.writer(data)
+        for row in rows:
+            writer.writerow([row[name] for name in columns])
+        data.seek(0)
+        cursor = self.connection.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) "
+                "FROM STDIN WITH (FORMAT csv)",
+                data
+            )
+        finally:
+            cursor.close()
+
+
+def _sync_sequences(connection: Connection, tables: Iterable[str]) -> None:
+    if connection.dialect.name != "postgresql":
+        return
+    for table in tables:
+        connection.execute(text(SYNC_SEQUENCE_SQL.format(table=table)))
+
+
+def _check_activity_tree(connection: Connection) -> None:
+    parents = dict(
+        connection.execute(
+            text("SELECT id, parent_id FROM activities")
+        ).all()
+    )
+    checked: set[int] = set()
+    for activity_id in parents:
+        path = set()
+        node = activity_id
+        while node is not None and node not in checked:
+            if node in path:
+                raise IngestError(
+                    f"activity {node} is its own ancestor"
+                )
+            path.add(node)
+            node = parents.get(node)
+        checked |= path
+
+
+def _prune(connection: Connection, statement) -> int:
+    pruned = 0
+    while True:
+        deleted = connection.execute(statement).rowcount
+        if not deleted:
+            return pruned
+        pruned += deleted
+
+
+def _staged_links(connection: Connection) -> dict[int, set[int]]:
+    links: dict[int, set[int]] = {}
+    for organization_id, activity_id in connection.execute(
+        STAGED_LINKS_SQL
+    ):
+        links.setdefault(organization_id, set()).add(activity_id)
+    return links
+
+
+def merge(connection: Connection, report: IngestReport) -> bool:
+    """
+    Upserts the staged rows into the directory tables in reference
+    order, then refreshes the affected organization documents.
+    Returns whether any activity changed.
+    """
+    report.unresolved += _prune(connection, PRUNE_ACTIVITIES_SQL)
+    report.activities = connection.execute(MERGE_ACTIVITIES_SQL).rowcount
+    report.buildings = connection.execute(MERGE_BUILDINGS_SQL).rowcount
+    report.unresolved += _prune(connection, PRUNE_ORGANIZATIONS_SQL)
+    report.organizations = connection.execute(
+        MERGE_ORGANIZATIONS_SQL
+    ).rowcount
+
+    _sync_sequences(connection, ["phone_numbers"])
+    connection.execute(DELETE_PHONES_SQL)
+    report.phone_numbers = connection.execute(INSERT_PHONES_SQL).rowcount
+    connection.execute(DELETE_LINKS_SQL)
+    report.unresolved += connection.execute(PRUNE_LINKS_SQL).rowcount
+    report.activity_links = connection.execute(INSERT_LINKS_SQL).rowcount
+    connection.execute(TOUCH_ORGANIZATIONS_SQL)
+    _sync_sequences(connection, ["activities", "buildings", "organizations"])
+
+    if report.activities:
+        _check_activity_tree(connection)
+        rebuild_activity_closure(connection)
+    refresh_organization_documents(
+        connection,
+        connection.execute(AFFECTED_ORGANIZATIONS_SQL).scalars().all()
+    )
+    return bool(report.activities)
+
+
+def ingest(
+    lines: Iterable[str],
+    ingest_format: IngestFormat = "ndjson",
+    refresh_building_index_after: bool = True
+) -> IngestReport:
+    """
+    Loads activities, buildings, organizations, phone numbers and
+    activity links in one transaction: rows are staged in temporary
+    tables, then merged with set-based upserts keyed by id.
+    Caches derived from the directory are refreshed afterwards.
+    """
+    report = IngestReport()
+    db = SessionLocal(
+        bind=engine.execution_options(**{STATEMENT_LIMIT_EXEMPT: True})
+    )
+    try:
+        connection = db.connection()
+        staging.drop_all(connection, checkfirst=True)
+        staging.create_all(connection)
+        writer = StagingWriter(connection, settings.INGEST_BATCH_SIZE)
+        for table, row in parse(lines, ingest_format, report):
+            writer.add(table, row)
+        writer.flush()
+
+        # Loaded activity counts are updated by the links that changed,
+        # and reloaded when the tree did
+        track_links = activity_counts.ready
+        old_links = _staged_links(connection) if track_links else {}
+        activities_changed = merge(connection, report)
+        if track_links and not activities_changed:
+            db.info[LINK_CHANGES] = link_changes(
+                old_links,
+                _staged_links(connection)
+            )
+        else:
+            db.info[TREE_CHANGED] = True
+        staging.drop_all(connection)
+        # Picked up by the after_commit hooks of the descendant, count
+        # and response caches and of read-your-writes routing
+        db.info["activities_changed"] = activities_changed
+        db.info["response_cache_dirty"] = True
+        db.info["wrote"] = True
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    if (
+        refresh_building_index_after
+        and report.buildings
+        and settings.SPATIAL_INDEX_ENABLED
+    ):
+        refresh_building_index(full=True)
+    logger.info(
+        f"Ingested {report.organizations} organizations, "
+        f"{report.buildings} buildings, {report.activities} activities "
+        f"({report.rejected} rejected, {report.unresolved} unresolved)"
+    )
+    return report
+
+
+def read_lines(stream: IO[bytes]) -> Iterator[str]:
+    """
+    Text lines of a seekable binary file, gunzipped when needed.
+    """
+    magic = stream.read(2)
+    stream.seek(0)
+    if magic == b"\x1f\x8b":
+        stream = gzip.GzipFile(fileobj=stream, mode="rb")
+    return io.TextIOWrapper(stream, encoding="utf-8", newline="")
@@ -1,25 +1,34 @@
 from fastapi import Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.repositories.organizations import OrganizationRepository
-from app.repositories.activities import ActivityRepository
-from app.repositories.buildings import BuildingRepository
+from app.core.config import settings
+from app.db.session import get_session
+from app.repositories.organizations import AsyncOrganizationRepository
+from app.repositories.organization_documents import (
+    AsyncOrganizationDocumentRepository,
+)
+from app.repositories.activities import AsyncActivityRepository
+from app.repositories.buildings import AsyncBuildingRepository
 from app.db import models
+from app.db.documents import MAX_IN_LIST
+from app.services.spatial import building_index
 
 
 class OrganizationService:
     def __init__(
         self,
-        org_repo: OrganizationRepository,
-        activity_repo: ActivityRepository,
-        building_repo: BuildingRepository,
+        org_repo: AsyncOrganizationRepository,
+        activity_repo: AsyncActivityRepository,
+        building_repo: AsyncBuildingRepository,
     ):
         self.org_repo = org_repo
         self.activity_repo = activity_repo
         self.building_repo = building_repo
 
-    def get_organization_by_id(self, organization_id: int):
-        organization = self.org_repo.get_by_id_with_details(organization_id)
+    async def get_organization_by_id(self, organization_id: int):
+        organization = await self.org_repo.get_by_id_with_details(
+            organization_id
+        )
         if not organization:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -27,64 +36,282 @@ class OrganizationService:
             )
         return organization
 
-    def get_organizations_in_building(self, building_id: int):
-        building = self.building_repo.get(building_id)
+    async def get_organizations_by_ids(
+        self,
+        organization_ids: list[int]
+    ) -> list[dict]:
+        """
+        Looks up many organizations with one query. Returns one
+        schemas.OrganizationLookup-shaped entry per requested id,
+        in request order.
+        """
+        organizations = {
+            organization.id: organization
+            for organization in await self.org_repo.get_by_ids(
+                list(set(organization_ids))
+            )
+        }
+        return [
+            {
+                "id": organization_id,
+                "found": organization_id in organizations,
+                "organization": organizations.get(organization_id),
+            }
+            for organization_id in organization_ids
+        ]
+
+    async def get_organizations_in_building(
+        self,
+        building_id: int,
+        after_id: int = 0,
+        limit: int | None = None
+    ):
+        building = await self.building_repo.get(building_id)
         if not building:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Building not found"
             )
-        return self.org_repo.get_by_building_id(building_id)
+        return await self.org_repo.get_by_building_id(
+            building_id,
+            after_id,
+            limit
+        )
 
-    def get_organizations_by_activity(self, activity_id: int):
-        activity = self.activity_repo.get(activity_id)
+    async def get_organizations_by_activity(
+        self,
+        activity_id: int,
+        after_id: int = 0,
+        limit: int | None = None
+    ):
+        activity = await self.activity_repo.get(activity_id)
         if not activity:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Activity not found"
             )
-        # Leveraging the pre-defined SQLAlchemy relationship for direct access
-        return activity.organizations
+        return await self.org_repo.get_by_activity_id(
+            activity_id,
+            after_id,
+            limit
+        )
+
+    async def search_by_name(
+        self,
+        name: str,
+        after_id: int = 0,
+        limit: int | None = None
+    ):
+        return await self.org_repo.search_by_name(name, after_id, limit)
 
-    def search_by_name(self, name: str):
-        return self.org_repo.search_by_name(name)
+    async def search_by_name_ranked(self, name: str, limit: int):
+        return await self.org_repo.search_by_name_ranked(name, limit)
 
-    def search_by_activity_tree(self, activity_id: int):
-        activity = self.activity_repo.get(activity_id)
+    async def search_by_activity_tree(
+        self,
+        activity_id: int,
+        after_id: int = 0,
+        limit: int | None = None
+    ):
+        activity = await self.activity_repo.get(activity_id)
         if not activity:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Activity not found"
             )
 
-        descendant_ids = self.activity_repo.get_descendant_ids(activity_id)
-        return self.org_repo.get_by_activity_ids(descendant_ids)
+        return await self.org_repo.get_by_activity_tree(
+            activity_id,
+            after_id,
+            limit
+        )
 
-    def search_by_location(
+    async def search_by_location(
         self,
         latitude: float,
         longitude: float,
         radius: float
     ) -> list[models.Organization]:
         """
-        Search for organizations within a given radius from a central point.
+        Search for organizations within a given radius from a central point,
+        nearest buildings first.
+        """
+        buildings = await self._buildings_within_radius(
+            latitude,
+            longitude,
+            radius
+        )
+        return await self._organizations_in_buildings(
+            [building_id for building_id, _ in buildings]
+        )
+
+    async def search(
+        self,
+        name: str | None = None,
+        activity_id: int | None = None,
+        location: tuple[float, float, float] | None = None,
+        order_by_distance: bool = False,
+        after_id: int = 0,
+        limit: int | None = None
+    ) -> list[models.Organization]:
+        """
+        Organizations matching all given filters, in one SQL query.
+        The activity tree and the radius are first resolved to ID sets
+        from in-process caches (descendant ids, building index), so an
+        empty set answers without touching the database and the query
+        itself only checks plain IN lists and the indexed name match.
+        `location` is (latitude, longitude, radius). In ID order
+        results are paged by `after_id`; ordered by distance, the
+        `limit` nearest matches are returned: looked up among the
+        nearest buildings first, and among all of them only when the
+        name or activity filter leaves too few matches there.
         """
-        building_ids = self.building_repo.get_ids_within_radius(
+        activity_ids = None
+        if activity_id is not None:
+            activity_ids = await self.activity_repo.get_descendant_ids(
+                activity_id
+            )
+            if not activity_ids:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Activity not found"
+                )
+
+        building_ids = None
+        if location is not None:
+            buildings = await self._buildings_within_radius(*location)
+            if not buildings:
+                return []
+            building_ids = [building_id for building_id, _ in buildings]
+
+        if not order_by_distance:
+            return await self.org_repo.search(
+                building_ids,
+                activity_ids,
+                name,
+                after_id,
+                limit
+            )
+
+        rank = {
+            building_id: position
+            for position, building_id in enumerate(building_ids)
+        }
+        nearest_building_ids = building_ids[:max(limit or 0, MAX_IN_LIST)]
+        matches = await self.org_repo.search_building_ids(
+            nearest_building_ids,
+            activity_ids,
+            name
+        )
+        # Matches among the nearest buildings are nearer than any other,
+        # so enough of them settle the result
+        if (
+            len(nearest_building_ids) < len(building_ids)
+            and (limit is None or len(matches) < limit)
+        ):
+            matches = await self.org_repo.search_building_ids(
+                building_ids,
+                activity_ids,
+                name
+            )
+        nearest = sorted(
+            matches,
+            key=lambda match: (rank[match[1]], match[0])
+        )[:limit]
+        if not nearest:
+            return []
+        position = {
+            organization_id: index
+            for index, (organization_id, _) in enumerate(nearest)
+        }
+        organizations = await self.org_repo.get_by_ids(list(position))
+        return sorted(organizations, key=lambda org: position[org.id])
+
+    async def search_nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        limit: int
+    ) -> list[models.Organization]:
+        """
+        Find the `limit` organizations closest to a point.
+        Buildings without organizations are skipped by widening the
+        building lookup until enough organizations are collected.
+        """
+        building_limit = limit
+        while True:
+            if building_index.ready:
+                buildings = building_index.nearest(
+                    latitude,
+                    longitude,
+                    building_limit
+                )
+            else:
+                buildings = await self.building_repo.get_nearest(
+                    latitude,
+                    longitude,
+                    building_limit
+                )
+            organizations = await self._organizations_in_buildings(
+                [building_id for building_id, _ in buildings]
+            )
+            if (
+                len(organizations) >= limit
+                or len(buildings) < building_limit
+            ):
+                return organizations[:limit]
+            building_limit *= 2
+
+    async def _buildings_within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius: float
+    ) -> list[tuple[int, float]]:
+        if building_index.ready:
+            return building_index.within_radius(latitude, longitude, radius)
+        return await self.building_repo.get_within_radius(
             latitude,
             longitude,
             radius
         )
-        return self.org_repo.get_by_building_ids(building_ids)
+
+    async def _organizations_in_buildings(
+        self,
+        building_ids: list[int]
+    ) -> list[models.Organization]:
+        """
+        Loads organizations of the given buildings, keeping the order
+        of `building_ids`.
+        """
+        if not building_ids:
+            return []
+
+        rank = {
+            building_id: position
+            for position, building_id in enumerate(building_ids)
+        }
+        organizations = await self.org_repo.get_by_building_ids(
+            building_ids
+        )
+        return sorted(
+            organizations,
+            key=lambda org: (rank[org.building_id], org.id)
+        )
 
 
 def get_organization_service(
-    db: Session = Depends(get_db),
+    db: Session | AsyncSession = Depends(get_session),
 ) -> OrganizationService:
     """
     Get an instance of the OrganizationService with the necessary repositories.
     """
+    if settings.ORGANIZATION_DOCUMENTS_READS:
+        org_repo = AsyncOrganizationDocumentRepository(db)
+    else:
+        org_repo = AsyncOrganizationRepository(db)
     return OrganizationService(
-        OrganizationRepository(db),
-        ActivityRepository(db),
-        BuildingRepository(db)
+        org_repo,
+        AsyncActivityRepository(db),
+        AsyncBuildingRepository(db)
     )
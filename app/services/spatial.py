@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from itertools import chain, count
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.spatial import SpatialIndex
+from app.db import models
+from app.db.session import SessionLocal
+from app.repositories.buildings import BuildingRepository
+
+logger = logging.getLogger(__name__)
+
+building_index = SpatialIndex(cell_size=settings.SPATIAL_INDEX_CELL_SIZE)
+
+# Session.info key picked up by the commit hooks below: building id ->
+# (latitude, longitude) of buildings written, None for deleted ones
+BUILDING_CHANGES = "building_changes"
+
+
+def refresh_building_index(full: bool = False) -> int:
+    """
+    Loads building coordinates into the in-memory index.
+    A full refresh replaces the index; otherwise only buildings added
+    since the last refresh are inserted, followed by a full refresh if
+    the index then differs from the table in size (buildings deleted
+    elsewhere). Returns the number of buildings loaded.
+    """
+    db = SessionLocal()
+    try:
+        repo = BuildingRepository(db)
+        if not full and building_index.ready:
+            points = repo.get_coordinates(after_id=building_index.max_id)
+            for building_id, latitude, longitude in points:
+                building_index.upsert(building_id, latitude, longitude)
+            if repo.count_with_coordinates() == len(building_index):
+                return len(points)
+        points = repo.get_coordinates()
+        building_index.load(points)
+        return len(points)
+    finally:
+        db.close()
+
+
+async def run_building_index_refresh() -> None:
+    """
+    Periodically picks up buildings changed by other processes until
+    cancelled: new ones on every refresh, edits on every
+    SPATIAL_INDEX_FULL_REFRESH_EVERY-th, which reloads the index.
+    """
+    for tick in count(1):
+        await asyncio.sleep(settings.SPATIAL_INDEX_REFRESH_SECONDS)
+        full = tick % settings.SPATIAL_INDEX_FULL_REFRESH_EVERY == 0
+        try:
+            await run_in_threadpool(refresh_building_index, full)
+        except Exception:
+            logger.exception("Building index refresh failed")
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_building_changes(session, flush_context):
+    changes = None
+    for instance in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(instance, models.Building):
+            continue
+        if changes is None:
+            changes = session.info.setdefault(BUILDING_CHANGES, {})
+        if instance in session.deleted:
+            changes[instance.id] = None
+        else:
+            changes[instance.id] = (instance.latitude, instance.longitude)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session):
+    changes = session.info.pop(BUILDING_CHANGES, None)
+    if not changes or not building_index.ready:
+        return
+    for building_id, coordinates in changes.items():
+        if coordinates is None:
+            building_index.remove(building_id)
+        else:
+            building_index.upsert(building_id, *coordinates)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(BUILDING_CHANGES, None)
@@ -0,0 +1,234 @@
+"""
+Generate a deterministic synthetic directory for load tests.
+
+Writes activities, buildings and organizations as ingest NDJSON (the
+format accepted by `python -m app.cli ingest` and POST /api/v1/ingest/),
+or loads them straight into the database in DATABASE_URL with --load.
+The same options and seed always produce the same data, and
+benchmarks.run derives its request parameters from them.
+
+    python -m benchmarks.generate --organizations 100000 -o data.ndjson.gz
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.generate \
+        --buildings 5000 --organizations 100000 --load
+
+Ids start at 1, so loading into a database with other data overwrites
+the rows with the same ids.
+"""
+import argparse
+import gzip
+import json
+import random
+import sys
+from dataclasses import asdict, dataclass
+from typing import Iterator
+
+CITIES = [
+    ("Москва", 55.7558, 37.6173),
+    ("Санкт-Петербург", 59.9343, 30.3351),
+    ("Новосибирск", 55.0084, 82.9357),
+    ("Екатеринбург", 56.8389, 60.6057),
+    ("Казань", 55.7961, 49.1064),
+]
+STREETS = [
+    "Ленина", "Мира", "Гагарина", "Советская", "Садовая",
+    "Лесная", "Школьная", "Набережная", "Заводская", "Блюхера",
+]
+LEGAL_FORMS = ["ООО", "АО", "ИП", "ПАО"]
+NAME_WORDS = [
+    "Рога", "Копыта", "Молоко", "Мясо", "Колесо", "Север", "Восток",
+    "Вектор", "Альфа", "Сфера", "Ресурс", "Партнер", "Сервис", "Торг",
+    "Снаб", "Логистика", "Маркет", "Плюс", "Групп", "Строй",
+]
+ACTIVITY_WORDS = [
+    "Еда", "Автомобили", "Одежда", "Строительство", "Медицина",
+    "Образование", "Транспорт", "Услуги", "Электроника", "Мебель",
+]
+# Spread of buildings around a city center, in degrees
+CITY_SPREAD = 0.3
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    buildings: int = 1000
+    organizations: int = 10000
+    activity_depth: int = 3
+    activity_fanout: int = 5
+    max_phones: int = 3
+    max_activities: int = 3
+    seed: int = 42
+
+    @property
+    def activities(self) -> int:
+        return sum(
+            self.activity_fanout ** level
+            for level in range(1, self.activity_depth + 1)
+        )
+
+
+def add_dataset_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = DatasetSpec()
+    parser.add_argument("--buildings", type=int, default=defaults.buildings)
+    parser.add_argument(
+        "--organizations",
+        type=int,
+        default=defaults.organizations
+    )
+    parser.add_argument(
+        "--activity-depth",
+        type=int,
+        default=defaults.activity_depth,
+        help="levels in the activity tree"
+    )
+    parser.add_argument(
+        "--activity-fanout",
+        type=int,
+        default=defaults.activity_fanout,
+        help="children per activity"
+    )
+    parser.add_argument(
+        "--max-phones",
+        type=int,
+        default=defaults.max_phones,
+        help="phone numbers per organization, 0 to N"
+    )
+    parser.add_argument(
+        "--max-activities",
+        type=int,
+        default=defaults.max_activities,
+        help="activities per organization, 1 to N"
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def dataset_spec(args: argparse.Namespace) -> DatasetSpec:
+    return DatasetSpec(
+        buildings=args.buildings,
+        organizations=args.organizations,
+        activity_depth=args.activity_depth,
+        activity_fanout=args.activity_fanout,
+        max_phones=args.max_phones,
+        max_activities=args.max_activities,
+        seed=args.seed,
+    )
+
+
+def activity_records(spec: DatasetSpec) -> Iterator[dict]:
+    """
+    A complete tree, level by level: ids 1..fanout are the roots.
+    """
+    next_id = 1
+    parents = [None]
+    for level in range(1, spec.activity_depth + 1):
+        children = []
+        for parent_id in parents:
+            for _ in range(spec.activity_fanout):
+                word = ACTIVITY_WORDS[next_id % len(ACTIVITY_WORDS)]
+                yield {
+                    "type": "activity",
+                    "id": next_id,
+                    "name": f"{word} {level}.{next_id}",
+                    "parent_id": parent_id,
+                }
+                children.append(next_id)
+                next_id += 1
+        parents = children
+
+
+def building_record(rng: random.Random, building_id: int) -> dict:
+    city, latitude, longitude = rng.choice(CITIES)
+    return {
+        "type": "building",
+        "id": building_id,
+        "address": (
+            f"г. {city}, ул. {rng.choice(STREETS)}, "
+            f"д. {rng.randint(1, 200)}"
+        ),
+        "latitude": round(
+            latitude + rng.uniform(-CITY_SPREAD, CITY_SPREAD),
+            6
+        ),
+        "longitude": round(
+            longitude + rng.uniform(-CITY_SPREAD, CITY_SPREAD),
+            6
+        ),
+    }
+
+
+def organization_record(
+    rng: random.Random,
+    spec: DatasetSpec,
+    organization_id: int
+) -> dict:
+    words = rng.sample(NAME_WORDS, 2)
+    return {
+        "id": organization_id,
+        "name": (
+            f"{rng.choice(LEGAL_FORMS)} \"{words[0]} и {words[1]}\" "
+            f"{organization_id}"
+        ),
+        "building_id": rng.randint(1, spec.buildings),
+        "phone_numbers": [
+            f"8-{rng.randint(900, 999)}-{rng.randint(100, 999)}-"
+            f"{rng.randint(10, 99)}-{rng.randint(10, 99)}"
+            for _ in range(rng.randint(0, spec.max_phones))
+        ],
+        "activities": rng.sample(
+            range(1, spec.activities + 1),
+            min(rng.randint(1, spec.max_activities), spec.activities)
+        ),
+    }
+
+
+def records(spec: DatasetSpec) -> Iterator[dict]:
+    rng = random.Random(spec.seed)
+    yield from activity_records(spec)
+    for building_id in range(1, spec.buildings + 1):
+        yield building_record(rng, building_id)
+    for organization_id in range(1, spec.organizations + 1):
+        yield organization_record(rng, spec, organization_id)
+
+
+def lines(spec: DatasetSpec) -> Iterator[str]:
+    for record in records(spec):
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    add_dataset_arguments(parser)
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="NDJSON file to write, gzipped if it ends with .gz "
+        "(default: stdout)"
+    )
+    parser.add_argument(
+        "--load",
+        action="store_true",
+        help="ingest into the database in DATABASE_URL instead"
+    )
+    args = parser.parse_args()
+    spec = dataset_spec(args)
+
+    if args.load:
+        from app.services.ingest import ingest
+
+        report = ingest(lines(spec), refresh_building_index_after=False)
+        print(json.dumps(asdict(report), ensure_ascii=False, indent=2))
+        return
+
+    if args.output is None:
+        sys.stdout.writelines(lines(spec))
+        return
+    opener = gzip.open if args.output.endswith(".gz") else open
+    with opener(args.output, "wt", encoding="utf-8") as output:
+        output.writelines(lines(spec))
+    print(
+        f"Wrote {spec.activities} activities, {spec.buildings} buildings "
+        f"and {spec.organizations} organizations to {args.output}",
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    main()
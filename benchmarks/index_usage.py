@@ -0,0 +1,120 @@
+"""
+Check that repository queries are served by indexes.
+
+Runs the reads of benchmarks.query_counts, plus the activity and
+spatial lookups, against the database in DATABASE_URL, EXPLAINs every
+SELECT they issue and reports the tables read by a full scan. Exits
+with status 1 when a query scans a table it should reach through an
+index, which catches dropped or unusable indexes.
+
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.index_usage
+
+PostgreSQL prefers sequential scans on small tables, so run it against
+a database loaded with benchmarks.generate rather than the seed data.
+On SQLite the same checks run as tests/test_index_usage.py.
+"""
+import re
+import sys
+
+from sqlalchemy import event
+
+from app.db.activity_tree import descendant_cache
+from app.db.instrumentation import query_plan
+from app.db.models import Base
+from app.db.session import SessionLocal, engine
+from app.repositories.activities import ActivityRepository
+from app.repositories.buildings import BuildingRepository
+from benchmarks.query_counts import checks as query_count_checks
+
+# Full table scans in EXPLAIN output: "SCAN organizations" (SQLite,
+# without USING INDEX) and "Seq Scan on organizations" (PostgreSQL)
+FULL_SCAN_PATTERNS = [
+    re.compile(r"^SCAN (\w+)$"),
+    re.compile(r"Seq Scan on (\w+)"),
+]
+
+# Scans that only the PostgreSQL trigram and GIN indexes avoid:
+# substring name matches and the id lists of the organization documents
+EXPECTED_SCANS = {
+    "search_by_name": {"organizations"},
+    "search_by_name_ranked": {"organizations"},
+    "search": {"organizations"},
+    "documents.search_by_name": {"organization_documents"},
+    "documents.search_by_name_ranked": {"organization_documents"},
+    "documents.get_by_activity_ids": {"organization_documents"},
+    "documents.get_by_activity_id": {"organization_documents"},
+    "documents.get_by_activity_tree": {"organization_documents"},
+    "documents.search": {"organization_documents"},
+}
+
+
+def checks(db):
+    activities = ActivityRepository(db)
+    buildings = BuildingRepository(db)
+
+    def descendant_ids():
+        descendant_cache.invalidate()
+        return activities.get_descendant_ids(1)
+
+    return [
+        (name, call) for name, _, call in query_count_checks(db)
+    ] + [
+        ("get_descendant_ids", descendant_ids),
+        ("get_within_radius",
+         lambda: buildings.get_within_radius(55.7558, 37.6173, 5)),
+        ("get_nearest",
+         lambda: buildings.get_nearest(55.7558, 37.6173, 10)),
+    ]
+
+
+def full_scans(plan: list[str]) -> set[str]:
+    tables = set()
+    for line in plan:
+        for pattern in FULL_SCAN_PATTERNS:
+            match = pattern.search(line.strip())
+            if match:
+                tables.add(match.group(1))
+    return tables
+
+
+def main() -> int:
+    failed = False
+    plans: list[list[str]] = []
+
+    def after_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        plan = None if executemany else query_plan(
+            conn,
+            statement,
+            parameters
+        )
+        if plan is not None:
+            plans.append(plan)
+
+    postgresql = engine.dialect.name == "postgresql"
+    table_names = set(Base.metadata.tables)
+    db = SessionLocal()
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    try:
+        for name, call in checks(db):
+            db.expunge_all()
+            plans.clear()
+            call()
+            scans = set().union(*map(full_scans, plans)) & table_names
+            allowed = set() if postgresql else EXPECTED_SCANS.get(name, set())
+            unexpected = scans - allowed
+            failed |= bool(unexpected)
+            status = (
+                f"FULL SCAN {', '.join(sorted(unexpected))}"
+                if unexpected else "ok"
+            )
+            print(f"{name:<36} queries={len(plans):<3} {status}")
+    finally:
+        event.remove(engine, "after_cursor_execute", after_cursor_execute)
+        db.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
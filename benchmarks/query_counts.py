@@ -0,0 +1,102 @@
+"""
+Check that repository queries stay within their SQL statement budget.
+
+Runs each OrganizationRepository / BuildingRepository read, and the
+organization reads again from OrganizationDocumentRepository, against
+the database in DATABASE_URL and reports statements and rows per call.
+Exits with status 1 when a call issues more statements than its budget,
+which catches eager-loading regressions (N+1 lazy loads, strategies that
+fan out per row) independently of the data size. The same budgets are
+enforced per endpoint by tests/test_statement_budgets.py; this script is
+for measuring them against a full-size database.
+
+    DATABASE_URL=sqlite:///./dev.db python -m benchmarks.query_counts
+"""
+import sys
+
+from app.db.instrumentation import count_statements
+from app.db.session import SessionLocal, engine
+from app.repositories.buildings import BuildingRepository
+from app.repositories.organization_documents import (
+    OrganizationDocumentRepository,
+)
+from app.repositories.organizations import OrganizationRepository
+
+# Main query plus one IN query per eager-loaded collection
+ORGANIZATION_BUDGET = 3
+# Documents hold everything an organization response needs in one row
+DOCUMENT_BUDGET = 1
+# Buildings, their organizations, then phones and activities
+BUILDING_BUDGET = 4
+
+
+def organization_checks(organizations, budget: int, prefix: str = ""):
+    return [
+        (prefix + name, budget, call)
+        for name, call in [
+            ("get_by_id_with_details",
+             lambda: organizations.get_by_id_with_details(1)),
+            ("get_by_ids",
+             lambda: organizations.get_by_ids(list(range(1, 101)))),
+            ("get_by_building_id",
+             lambda: organizations.get_by_building_id(1, limit=100)),
+            ("search_by_name",
+             lambda: organizations.search_by_name("a", limit=100)),
+            ("search_by_name_ranked",
+             lambda: organizations.search_by_name_ranked("a", 100)),
+            ("get_by_activity_ids",
+             lambda: organizations.get_by_activity_ids([1, 2, 3])),
+            ("get_by_activity_id",
+             lambda: organizations.get_by_activity_id(1, limit=100)),
+            ("get_by_activity_tree",
+             lambda: organizations.get_by_activity_tree(1, limit=100)),
+            ("search",
+             lambda: organizations.search(
+                 list(range(1, 101)), [1, 2, 3], "a", limit=100
+             )),
+            ("get_by_building_ids",
+             lambda: organizations.get_by_building_ids(
+                 list(range(1, 101))
+             )),
+        ]
+    ]
+
+
+def checks(db):
+    buildings = BuildingRepository(db)
+    return [
+        *organization_checks(
+            OrganizationRepository(db),
+            ORGANIZATION_BUDGET
+        ),
+        *organization_checks(
+            OrganizationDocumentRepository(db),
+            DOCUMENT_BUDGET,
+            "documents."
+        ),
+        ("get_all_with_organizations", BUILDING_BUDGET,
+         lambda: buildings.get_all_with_organizations(limit=100)),
+    ]
+
+
+def main() -> int:
+    failed = False
+    db = SessionLocal()
+    try:
+        for name, budget, call in checks(db):
+            db.expunge_all()
+            with count_statements(engine) as count:
+                call()
+            status = "ok" if count.statements <= budget else "OVER BUDGET"
+            failed |= count.statements > budget
+            print(
+                f"{name:<36} statements={count.statements:<3} "
+                f"budget={budget:<3} rows={count.rows:<6} {status}"
+            )
+    finally:
+        db.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
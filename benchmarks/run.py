@@ -0,0 +1,364 @@
+"""
+Load-test every API route at a fixed concurrency.
+
+Drives a running server (uvicorn against a local PostgreSQL or SQLite
+database loaded with benchmarks.generate) and reports latency
+percentiles and throughput per route. Request parameters are drawn
+deterministically from the same dataset options, so runs against
+different commits send the same requests. Results are written as JSON;
+pass an earlier results file to --compare to print the differences.
+
+    DATABASE_URL=sqlite:///./bench.db python -m benchmarks.generate --load
+    DATABASE_URL=sqlite:///./bench.db RATE_LIMIT_ENABLED=false \
+        uvicorn app.main:app --port 8000
+    python -m benchmarks.run --api-key secret --requests 500 \
+        --concurrency 16 --output results.json --compare baseline.json
+
+Requires httpx, installed by requirements-dev.txt. The ingest route
+re-posts generated organizations, so the data does not change; still,
+never point this at a production server. SQLite allows one writer at a
+time, so concurrent ingests against it mostly fail with "database is
+locked".
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import subprocess
+import time
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Callable
+
+import httpx
+
+from benchmarks.generate import (
+    CITIES,
+    CITY_SPREAD,
+    NAME_WORDS,
+    DatasetSpec,
+    add_dataset_arguments,
+    dataset_spec,
+    lines,
+)
+
+# name -> (method, path, request factory); the factory returns the query
+# parameters and body for one request
+Scenario = tuple[str, str, Callable[[random.Random], tuple[dict, bytes]]]
+
+
+def scenarios(spec: DatasetSpec) -> dict[str, Scenario]:
+    # Ingest bodies re-post generated organizations, so the data stays
+    # as loaded
+    first_organization = spec.activities + spec.buildings
+    organization_lines = list(itertools.islice(
+        lines(spec),
+        first_organization,
+        first_organization + min(1000, spec.organizations)
+    ))
+
+    def point(rng: random.Random) -> dict:
+        _, latitude, longitude = rng.choice(CITIES)
+        return {
+            "latitude": round(
+                latitude + rng.uniform(-CITY_SPREAD, CITY_SPREAD),
+                4
+            ),
+            "longitude": round(
+                longitude + rng.uniform(-CITY_SPREAD, CITY_SPREAD),
+                4
+            ),
+        }
+
+    def no_parameters(rng):
+        return {}, b""
+
+    return {
+        "buildings": ("GET", "/api/v1/buildings/", lambda rng: (
+            {"limit": 100}, b""
+        )),
+        "organization": ("GET", "/api/v1/organizations/{id}", lambda rng: (
+            {"id": rng.randint(1, spec.organizations)}, b""
+        )),
+        "organizations_batch": (
+            "POST",
+            "/api/v1/organizations/batch/",
+            lambda rng: ({}, json.dumps({"ids": rng.sample(
+                range(1, spec.organizations + 1),
+                min(100, spec.organizations)
+            )}).encode())
+        ),
+        "building_organizations": (
+            "GET",
+            "/api/v1/buildings/{id}/organizations/",
+            lambda rng: ({"id": rng.randint(1, spec.buildings)}, b"")
+        ),
+        "activity_organizations": (
+            "GET",
+            "/api/v1/activities/{id}/organizations/",
+            lambda rng: ({"id": rng.randint(1, spec.activities)}, b"")
+        ),
+        "activity_tree": ("GET", "/api/v1/activities/tree/", no_parameters),
+        "search_name": (
+            "GET",
+            "/api/v1/organizations/search/name/",
+            lambda rng: ({"name": rng.choice(NAME_WORDS)}, b"")
+        ),
+        "search_name_similarity": (
+            "GET",
+            "/api/v1/organizations/search/name/",
+            lambda rng: (
+                {"name": rng.choice(NAME_WORDS), "mode": "similarity"},
+                b""
+            )
+        ),
+        "search_activity": (
+            "GET",
+            "/api/v1/organizations/search/activity/",
+            # Roots have the largest subtrees
+            lambda rng: (
+                {"activity_id": rng.randint(1, spec.activity_fanout)},
+                b""
+            )
+        ),
+        "search_location": (
+            "GET",
+            "/api/v1/organizations/search/location/",
+            lambda rng: (dict(point(rng), radius=rng.choice([1, 5, 20])), b"")
+        ),
+        "search_nearest": (
+            "GET",
+            "/api/v1/organizations/search/nearest/",
+            lambda rng: (dict(point(rng), limit=10), b"")
+        ),
+        "search_combined": (
+            "GET",
+            "/api/v1/organizations/search/",
+            lambda rng: (
+                dict(
+                    point(rng),
+                    radius=rng.choice([5, 20]),
+                    activity_id=rng.randint(1, spec.activity_fanout),
+                    name=rng.choice(NAME_WORDS),
+                    order=rng.choice(["id", "distance"]),
+                ),
+                b""
+            )
+        ),
+        "export": (
+            "GET",
+            "/api/v1/export/organizations/",
+            lambda rng: ({"format": rng.choice(["ndjson", "csv"])}, b"")
+        ),
+        "ingest": ("POST", "/api/v1/ingest/", lambda rng: (
+            {"format": "ndjson"},
+            "".join(rng.sample(
+                organization_lines,
+                min(100, len(organization_lines))
+            )).encode()
+        )),
+        "system_pool": ("GET", "/api/v1/system/pool/", no_parameters),
+        "system_slow_queries": (
+            "GET",
+            "/api/v1/system/slow-queries/",
+            no_parameters
+        ),
+    }
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an ascending list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    rng: random.Random,
+    requests: int,
+    concurrency: int
+) -> dict:
+    method, path, make_request = scenario
+    queue = []
+    for _ in range(requests):
+        params, body = make_request(rng)
+        url = path.format(**params)
+        queue.append((
+            url,
+            {name: value for name, value in params.items()
+             if "{" + name + "}" not in path},
+            body,
+        ))
+    queue.reverse()
+    timings: list[float] = []
+    statuses: dict[str, int] = {}
+    cache_hits = 0
+
+    async def worker():
+        nonlocal cache_hits
+        while queue:
+            url, params, body = queue.pop()
+            headers = {"Content-Type": "application/json"} if body else {}
+            start = time.perf_counter()
+            try:
+                response = await client.request(
+                    method,
+                    url,
+                    params=params,
+                    content=body or None,
+                    headers=headers
+                )
+                await response.aread()
+                status = str(response.status_code)
+                cache_hits += response.headers.get("x-cache") == "HIT"
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            timings.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    timings.sort()
+    return {
+        "method": method,
+        "path": path,
+        "requests": requests,
+        "statuses": statuses,
+        "errors": requests - statuses.get("200", 0),
+        "cache_hits": cache_hits,
+        "throughput_rps": round(requests / elapsed, 2),
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "p50_ms": round(percentile(timings, 0.50), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+        "p99_ms": round(percentile(timings, 0.99), 3),
+        "max_ms": round(timings[-1], 3),
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict) -> None:
+    print(f"{'route':<24} {'p50 ms':>18} {'p95 ms':>18} {'rps':>18}")
+    for name, current in results["routes"].items():
+        previous = baseline.get("routes", {}).get(name)
+        if previous is None:
+            continue
+        cells = []
+        for metric in ("p50_ms", "p95_ms", "throughput_rps"):
+            before, after = previous[metric], current[metric]
+            change = (after - before) / before * 100 if before else 0.0
+            cells.append(f"{after:>9.2f} ({change:+6.1f}%)")
+        print(f"{name:<24} " + " ".join(cells))
+
+
+async def run(args: argparse.Namespace) -> dict:
+    spec = dataset_spec(args)
+    all_scenarios = scenarios(spec)
+    names = args.routes or list(all_scenarios)
+    unknown = set(names) - set(all_scenarios)
+    if unknown:
+        raise SystemExit(f"Unknown routes: {', '.join(sorted(unknown))}")
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "requests_per_route": args.requests,
+            "dataset": asdict(spec),
+            "python": platform.python_version(),
+        },
+        "routes": {},
+    }
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=args.base_url,
+        headers={"X-API-KEY": args.api_key},
+        limits=limits,
+        timeout=args.timeout
+    ) as client:
+        for name in names:
+            # One generator per route keeps its requests identical
+            # whichever routes are selected
+            rng = random.Random(f"{spec.seed}:{name}")
+            if args.warmup:
+                await run_scenario(
+                    client,
+                    all_scenarios[name],
+                    rng,
+                    args.warmup,
+                    args.concurrency
+                )
+            result = await run_scenario(
+                client,
+                all_scenarios[name],
+                rng,
+                args.requests,
+                args.concurrency
+            )
+            results["routes"][name] = result
+            print(
+                f"{name:<24} p50 {result['p50_ms']:>8.2f} ms  "
+                f"p95 {result['p95_ms']:>8.2f} ms  "
+                f"p99 {result['p99_ms']:>8.2f} ms  "
+                f"{result['throughput_rps']:>8.1f} req/s  "
+                f"errors {result['errors']}"
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    add_dataset_arguments(parser)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument(
+        "--api-key",
+        required=True,
+        help="needs the write and admin scopes for ingest and system routes"
+    )
+    parser.add_argument("--requests", type=int, default=200,
+                        help="measured requests per route")
+    parser.add_argument("--warmup", type=int, default=20,
+                        help="unmeasured requests per route before timing")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument(
+        "--routes",
+        nargs="*",
+        help="route names to run (default: all)"
+    )
+    parser.add_argument("-o", "--output", default="benchmark-results.json")
+    parser.add_argument("--compare", help="earlier results file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(results, output, ensure_ascii=False, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline:
+            compare(results, json.load(baseline))
+
+
+if __name__ == "__main__":
+    main()
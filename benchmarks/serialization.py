@@ -0,0 +1,131 @@
+"""
+Compare response serialization through the Pydantic response models
+with the direct path in app.api.serializers.
+
+Builds detached ORM objects in memory (no database needed), renders
+them both ways, checks that the JSON bytes are identical and reports
+the time per response.
+
+    DATABASE_URL=sqlite:// python -m benchmarks.serialization \
+        --buildings 100 --organizations-per-building 10
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.api.serializers import serialize_building, serialize_organization
+from app.db import models, schemas
+
+
+def make_buildings(count: int, per_building: int) -> list[models.Building]:
+    activities = [
+        models.Activity(id=i, name=f"Activity {i}") for i in range(1, 11)
+    ]
+    buildings = []
+    organization_id = 0
+    for building_id in range(1, count + 1):
+        building = models.Building(
+            id=building_id,
+            address=f"ул. Тестовая, д. {building_id}",
+            latitude=55.0 + building_id / 1000,
+            longitude=37.0 + building_id / 1000,
+        )
+        for _ in range(per_building):
+            organization_id += 1
+            building.organizations.append(models.Organization(
+                id=organization_id,
+                name=f"ООО \"Организация {organization_id}\"",
+                phone_numbers=[
+                    models.PhoneNumber(number=f"8-800-{organization_id:06d}"),
+                    models.PhoneNumber(number=f"2-{organization_id:06d}"),
+                ],
+                activities=activities[organization_id % 10:][:2],
+            ))
+        buildings.append(building)
+    return buildings
+
+
+def pydantic_path(adapter: TypeAdapter):
+    def render(objects) -> bytes:
+        return adapter.dump_json(
+            adapter.validate_python(objects, from_attributes=True)
+        )
+    return render
+
+
+def direct_path(serializer):
+    def render(objects) -> bytes:
+        return orjson.dumps([serializer(item) for item in objects])
+    return render
+
+
+def measure(render, objects, repeat: int) -> dict:
+    render(objects)  # warm up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(objects)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--buildings", type=int, default=100)
+    parser.add_argument("--organizations-per-building", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    buildings = make_buildings(
+        args.buildings,
+        args.organizations_per_building
+    )
+    organizations = [
+        organization
+        for building in buildings
+        for organization in building.organizations
+    ]
+    cases = {
+        "buildings": (
+            buildings,
+            TypeAdapter(List[schemas.Building]),
+            serialize_building,
+        ),
+        "organizations": (
+            organizations,
+            TypeAdapter(List[schemas.Organization]),
+            serialize_organization,
+        ),
+    }
+
+    report = {}
+    for name, (objects, adapter, serializer) in cases.items():
+        pydantic_render = pydantic_path(adapter)
+        direct_render = direct_path(serializer)
+        if pydantic_render(objects) != direct_render(objects):
+            raise SystemExit(f"{name}: serializers produce different JSON")
+        pydantic_result = measure(pydantic_render, objects, args.repeat)
+        direct_result = measure(direct_render, objects, args.repeat)
+        report[name] = {
+            "items": len(objects),
+            "pydantic": pydantic_result,
+            "direct": direct_result,
+            "speedup": round(
+                pydantic_result["median_ms"] / direct_result["median_ms"],
+                2
+            ),
+        }
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
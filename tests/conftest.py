@@ -0,0 +1,43 @@
+"""
+Shared fixtures: a throwaway SQLite database migrated to head (the seed
+migration fills it with a few buildings, activities and organizations)
+and a client for the application with response caching and rate
+limiting off, so that every request reaches the database.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+API_KEY = "test-api-key"
+
+# Settings are read when app.core.config is first imported, so the
+# environment has to be in place before any test module imports the app.
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{Path(tempfile.mkdtemp()) / 'test.db'}",
+    API_KEY=API_KEY,
+    RATE_LIMIT_ENABLED="false",
+    RESPONSE_CACHE_ENABLED="false",
+)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    command.upgrade(config, "head")
+
+
+@pytest.fixture(scope="session")
+def client(database):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app, headers={"X-API-KEY": API_KEY}) as client:
+        yield client
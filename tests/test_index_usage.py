@@ -0,0 +1,77 @@
+"""
+Index usage of the repository reads.
+
+Every SELECT a read issues is EXPLAINed on the fixture database; the
+reads that motivated the organization indexes must be planned through
+them, and no read may scan a table it should reach through an index.
+"""
+import pytest
+from sqlalchemy import event
+
+from app.db.instrumentation import query_plan
+from app.db.models import Base
+from app.db.session import SessionLocal, engine
+from app.repositories.organizations import OrganizationRepository
+from benchmarks.index_usage import EXPECTED_SCANS, checks, full_scans
+
+
+@pytest.fixture
+def db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def plans():
+    plans: list[list[str]] = []
+
+    def after_cursor_execute(
+        conn, cursor, statement, parameters, context, executemany
+    ):
+        plan = None if executemany else query_plan(
+            conn,
+            statement,
+            parameters
+        )
+        if plan is not None:
+            plans.append(plan)
+
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    try:
+        yield plans
+    finally:
+        event.remove(engine, "after_cursor_execute", after_cursor_execute)
+
+
+def plan_text(plans: list[list[str]]) -> str:
+    return "\n".join(line for plan in plans for line in plan)
+
+
+@pytest.mark.parametrize("index, read", [
+    ("ix_organizations_building_id_id",
+     lambda organizations: organizations.get_by_building_id(2, limit=100)),
+    ("ix_organization_activity_association_activity_id",
+     lambda organizations: organizations.get_by_activity_id(3, limit=100)),
+    ("ix_phone_numbers_organization_id",
+     lambda organizations: organizations.get_by_id_with_details(1)),
+])
+def test_reads_use_index(db, plans, index, read):
+    assert read(OrganizationRepository(db))
+    assert index in plan_text(plans)
+
+
+def test_no_unexpected_full_scans(db, plans):
+    table_names = set(Base.metadata.tables)
+    unexpected = {}
+    for name, call in checks(db):
+        db.expunge_all()
+        plans.clear()
+        call()
+        scans = set().union(*map(full_scans, plans)) & table_names
+        scans -= EXPECTED_SCANS.get(name, set())
+        if scans:
+            unexpected[name] = sorted(scans)
+    assert not unexpected
@@ -0,0 +1,89 @@
+"""
+Statement budgets of the list and detail endpoints.
+
+Every request runs with the statement counter on the engine and fails
+when it issues more statements than its budget, which catches
+eager-loading regressions (N+1 lazy loads, strategies that fan out per
+row) that the small fixture data would otherwise hide. The repository
+budgets are the ones benchmarks.query_counts reports against; routes
+that first look up their building or activity get one statement more.
+"""
+import pytest
+
+from app.core.config import settings
+from app.db.documents import rebuild_organization_documents
+from app.db.instrumentation import count_statements
+from app.db.session import engine
+from benchmarks.query_counts import (
+    BUILDING_BUDGET,
+    DOCUMENT_BUDGET,
+    ORGANIZATION_BUDGET,
+)
+
+# Descendant ids come from the in-process activity tree, which checks
+# its version row at most once per refresh interval
+TREE_CHECK = 1
+
+ORGANIZATION_ENDPOINTS = [
+    ("/api/v1/organizations/1", 0),
+    ("/api/v1/buildings/2/organizations/", 1),
+    ("/api/v1/activities/3/organizations/", 1),
+    ("/api/v1/organizations/search/name/?name=Мясо", 0),
+    ("/api/v1/organizations/search/name/?name=Мясо&mode=similarity", 0),
+    ("/api/v1/organizations/search/activity/?activity_id=1", TREE_CHECK),
+    ("/api/v1/organizations/search/location/"
+     "?latitude=55.75&longitude=37.61&radius=10", 0),
+    ("/api/v1/organizations/search/nearest/"
+     "?latitude=55.75&longitude=37.61&limit=2", 0),
+    ("/api/v1/organizations/search/?name=Мясо&activity_id=1", TREE_CHECK),
+]
+
+
+@pytest.fixture(params=[False, True], ids=["models", "documents"])
+def organization_budget(request, monkeypatch):
+    if not request.param:
+        return ORGANIZATION_BUDGET
+    with engine.begin() as connection:
+        rebuild_organization_documents(connection)
+    monkeypatch.setattr(settings, "ORGANIZATION_DOCUMENTS_READS", True)
+    return DOCUMENT_BUDGET
+
+
+def assert_within_budget(client, path: str, budget: int, **kwargs):
+    method = kwargs.pop("method", "GET")
+    with count_statements(engine) as count:
+        response = client.request(method, path, **kwargs)
+    assert response.status_code == 200, response.text
+    assert response.json(), f"{path} returned nothing to load"
+    assert count.statements <= budget, (
+        f"{method} {path} issued {count.statements} statements, "
+        f"budget {budget}"
+    )
+
+
+@pytest.mark.parametrize("path, lookups", ORGANIZATION_ENDPOINTS)
+def test_organization_endpoints(
+    client,
+    organization_budget,
+    path,
+    lookups
+):
+    assert_within_budget(client, path, organization_budget + lookups)
+
+
+def test_organizations_batch(client, organization_budget):
+    assert_within_budget(
+        client,
+        "/api/v1/organizations/batch/",
+        organization_budget,
+        method="POST",
+        json={"ids": [1, 2, 3, 4, 404]}
+    )
+
+
+def test_buildings(client):
+    assert_within_budget(client, "/api/v1/buildings/", BUILDING_BUDGET)
+
+
+def test_activity_tree(client):
+    assert_within_budget(client, "/api/v1/activities/tree/", TREE_CHECK)